@@ -0,0 +1,57 @@
+import importlib
+
+# Public names and the submodule each comes from. Submodules are imported on
+# first use, so `import codemod.lexer` stays light and `python -m codemod.index`
+# runs a module that is not already imported. The watch loop is
+# codemod.watch.watch: a package attribute of that name would be replaced by
+# the submodule as soon as it is imported.
+_EXPORTS = {
+    'CLIENT_SRC': 'engine',
+    'CompiledRules': 'compiler',
+    'DiagnosticIndex': 'diagnostics',
+    'FIX_SEQUENCE': 'rules',
+    'Profile': 'profile',
+    'REGISTRY': 'rules',
+    'Rule': 'rules',
+    'RouteIndex': 'routes',
+    'RouteMap': 'routes',
+    'RuleFileError': 'rulefiles',
+    'RuleTimeout': 'profile',
+    'SymbolIndex': 'index',
+    'WriteBatch': 'journal',
+    'apply_rules': 'engine',
+    'changed_files': 'discovery',
+    'compile_rules': 'compiler',
+    'discover': 'discovery',
+    'fix_file': 'engine',
+    'iter_files': 'engine',
+    'latest_journal': 'journal',
+    'load_compiled': 'precompiled',
+    'load_diagnostics': 'diagnostics',
+    'load_route_map': 'routes',
+    'parse_diagnostics': 'diagnostics',
+    'parse_rule_file': 'rulefiles',
+    'register': 'rules',
+    'register_rule_files': 'rulefiles',
+    'rollback': 'journal',
+    'route_rules': 'routes',
+    'rule_set': 'rules',
+    'run': 'engine',
+    'select': 'rules',
+    'walk_files': 'discovery',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
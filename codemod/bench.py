@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for the fix pipeline on synthetic client trees.
+
+A corpus of TSX pages modelled on client/src/pages (tRPC hooks with stale and
+valid paths, useForm/zodResolver, .mutate({...}), typed .map callbacks, Arabic
+strings and JSX text) is generated deterministically at the requested sizes.
+Each mode runs on a fresh copy of the corpus in a child process so its peak
+RSS is its own. Results are appended to .codemod/bench/results.jsonl and
+compared with the last run of the same mode and size.
+
+    python -m codemod.bench --files 1000 10000 --modes legacy engine jobs
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+from .cache import REPO_ROOT, Manifest
+from .compiler import DEFAULT_MAX_ITERATIONS
+from .engine import iter_files, run
+from .rules import FIX_SEQUENCE, REGISTRY, select
+
+BENCH_DIR = os.path.join(REPO_ROOT, '.codemod', 'bench')
+DEFAULT_RESULTS = os.path.join(BENCH_DIR, 'results.jsonl')
+CORPUS_VERSION = 1
+DEFAULT_SIZES = (1000,)
+DEFAULT_SEED = 6666
+# A mode this much slower than its last recorded run is flagged
+DEFAULT_THRESHOLD = 10.0
+# Differences smaller than this are timer noise, whatever the percentage
+MIN_REGRESSION_SECONDS = 0.05
+PER_RULE_SAMPLE = 200
+
+MODES = {
+    'legacy': 'one read/write pass per rule set, re.sub per rule (the old fix_*.py scripts)',
+    'engine': 'single-pass compiled engine',
+    'jobs': 'single-pass engine on one worker process per CPU',
+    'cached': 'rerun over an unchanged tree with the incremental cache',
+    'converge': 'single-pass engine re-applied to a fixed point',
+}
+
+ENTITIES = [
+    ('Tank', 'diesel', 'getDieselTanks', 'tanks.list'),
+    ('Pipe', 'diesel', 'getDieselPipes', 'assets.pipes.list'),
+    ('Supplier', 'diesel', 'getDieselSuppliers', 'suppliers.list'),
+    ('ReceivingTask', 'diesel', 'getDieselReceivingTasks', 'receivingTasks.list'),
+    ('Station', 'organization', 'getStations', 'stations.list'),
+    ('Customer', 'billing', 'customers.list', 'getCustomers'),
+    ('Asset', 'assets', 'stats', 'dashboardStats'),
+    ('WorkOrder', 'maintenance', 'stats', 'dashboardStats'),
+    ('Account', 'accounting', 'journals.list', 'journalEntries.list'),
+    ('Alert', 'scada', 'dashboard', 'alerts.list'),
+]
+FIELDS = ['code', 'nameAr', 'nameEn', 'status', 'amount', 'accountNumber', 'invoiceNo', 'balanceDue']
+ARABIC = ['خزان استلام', 'إضافة جديد', 'تم الحفظ بنجاح', 'حذف السجل', 'الرصيد المستحق', 'رقم الحساب']
+
+HEADER = '''import {{ useState }} from "react";
+import {{ useForm }} from "react-hook-form";
+import {{ zodResolver }} from "@hookform/resolvers/zod";
+import {{ z }} from "zod";
+import {{ useParams }} from "wouter";
+import {{ trpc }} from "@/lib/trpc";
+import {{ Button }} from "@/components/ui/button";
+import {{ Table, TableBody, TableCell, TableRow }} from "@/components/ui/table";
+
+interface {entity} {{
+  id: number;
+{fields}
+}}
+
+const {lower}Schema = z.object({{
+  nameAr: z.string({{ required_error: "{arabic}" }}),
+  code: z.string().min(1),
+}});
+'''
+
+COMPONENT = '''
+export function {entity}Page{index}() {{
+  const {{ id }} = useParams();
+  const utils = trpc.useUtils();
+  const [editing{entity}, setEditing{entity}] = useState<{entity} | null>(null);
+  const {{ data: {lower}Data }} = trpc.{namespace}.{procedure}.useQuery({{ businessId: 1 }});
+  const createMutation = trpc.{namespace}.{procedure}.useMutation({{
+    onSuccess: (_, variables) => {{
+      utils.{namespace}.{procedure}.invalidate();
+    }},
+  }});
+  const form = useForm({{
+    resolver: zodResolver({lower}Schema),
+  }});
+
+  // {arabic}: {lower}Data.items is typed as unknown[]
+  const handleSave = (data: {entity}) => {{
+    createMutation.mutate({{ ...data, businessId: 1 }});
+    setEditing{entity}(data);
+  }};
+
+  const rows = ({lower}Data?.items || []).filter(({var}: {entity}) => {var}.{field} !== null);
+  return (
+    <form onSubmit={{form.handleSubmit(handleSave)}}>
+      <p>{arabic} - {lower}.{field}</p>
+      <Table>
+        <TableBody>
+          {{rows.map(({var}: {entity}) => (
+            <TableRow key={{{var}.id}}>
+              <TableCell>{{{var}.{field}}}</TableCell>
+              <TableCell>{{{var}.type === "asset" ? "{arabic}" : {var}.code}}</TableCell>
+            </TableRow>
+          ))}}
+        </TableBody>
+      </Table>
+      <Button onClick={{() => createMutation.mutate({{ id: {var}Id, status: "active" }})}}>{arabic}</Button>
+    </form>
+  );
+}}
+'''
+
+
+def _page(rng):
+    entity, namespace, stale, valid = rng.choice(ENTITIES)
+    lower = entity[0].lower() + entity[1:]
+    fields = '\n'.join(f'  {field}: string | null;' for field in rng.sample(FIELDS, 4))
+    parts = [HEADER.format(entity=entity, lower=lower, fields=fields, arabic=rng.choice(ARABIC))]
+    for index in range(rng.randint(1, 4)):
+        parts.append(COMPONENT.format(
+            entity=entity, lower=lower, namespace=namespace, index=index,
+            # Roughly a third of the call sites still use a stale path
+            procedure=stale if rng.random() < 0.35 else valid,
+            var=lower[:1] + str(index), field=rng.choice(FIELDS), arabic=rng.choice(ARABIC),
+        ))
+    return ''.join(parts)
+
+
+def generate_corpus(dest, files, seed=DEFAULT_SEED):
+    """Write files synthetic pages under dest/pages/<module>/, reusing a matching corpus"""
+    marker = os.path.join(dest, '.corpus')
+    stamp = f'{CORPUS_VERSION} {files} {seed}'
+    try:
+        with open(marker, 'r', encoding='utf-8') as f:
+            if f.read() == stamp:
+                return dest
+    except OSError:
+        pass
+    shutil.rmtree(dest, ignore_errors=True)
+    rng = random.Random(seed)
+    modules = sorted({namespace for _, namespace, _, _ in ENTITIES})
+    for index in range(files):
+        module = modules[index % len(modules)]
+        directory = os.path.join(dest, 'pages', module, f'batch{index // 500}')
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'Page{index}.tsx'), 'w', encoding='utf-8') as f:
+            f.write(_page(rng))
+    with open(marker, 'w', encoding='utf-8') as f:
+        f.write(stamp)
+    return dest
+
+
+def _corpus_bytes(root):
+    return sum(os.path.getsize(path) for path in iter_files(root))
+
+
+def _run_legacy(root):
+    for name in FIX_SEQUENCE:
+        rules = REGISTRY[name]
+        for filepath in iter_files(root):
+            with open(filepath, 'r', encoding='utf-8') as f:
+                content = f.read()
+            original = content
+            for rule in rules:
+                if not rule.applies_to(filepath):
+                    continue
+                if rule.requires and not all(text in content for text in rule.requires):
+                    continue
+                if rule.literal:
+                    content = content.replace(rule.pattern, rule.replacement)
+                else:
+                    content = re.sub(rule.pattern, rule.replacement, content)
+            if content != original:
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    f.write(content)
+
+
+def _run_mode(mode, root):
+    """Run one mode in this process; returns its wall time in seconds"""
+    rules = select()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == 'cached':
+            manifest_path = os.path.join(root, '.manifest.json')
+            run(rules, root=root, manifest=Manifest(manifest_path))
+        start = time.perf_counter()
+        if mode == 'legacy':
+            _run_legacy(root)
+        elif mode == 'engine':
+            run(rules, root=root)
+        elif mode == 'jobs':
+            run(rules, root=root, jobs=0)
+        elif mode == 'cached':
+            run(rules, root=root, manifest=Manifest(manifest_path))
+        elif mode == 'converge':
+            run(rules, root=root, max_iterations=DEFAULT_MAX_ITERATIONS)
+        return time.perf_counter() - start
+
+
+def _peak_rss_kb():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children)
+
+
+def per_rule_times(root, sample=PER_RULE_SAMPLE):
+    """Seconds each rule's regex takes over a sample of the corpus, slowest first"""
+    contents = []
+    for filepath in iter_files(root):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            contents.append(f.read())
+        if len(contents) >= sample:
+            break
+    times = []
+    for rule in select():
+        if rule.literal:
+            continue
+        regex = re.compile(rule.pattern)
+        start = time.perf_counter()
+        for content in contents:
+            regex.sub(rule.replacement, content)
+        times.append((time.perf_counter() - start, rule))
+    times.sort(key=lambda item: -item[0])
+    return [{'rule_set': rule.rule_set, 'pattern': rule.pattern, 'seconds': round(seconds, 6)}
+            for seconds, rule in times]
+
+
+def measure(mode, corpus):
+    """Copy the corpus, run mode on it in a child process and return its metrics"""
+    work = os.path.join(BENCH_DIR, 'work')
+    shutil.rmtree(work, ignore_errors=True)
+    shutil.copytree(corpus, work)
+    try:
+        output = subprocess.run(
+            [sys.executable, '-m', 'codemod.bench', '--child', mode, work],
+            cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+        ).stdout
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_results(path):
+    records = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    except OSError:
+        pass
+    return records
+
+
+def _previous(records, mode, files):
+    for record in reversed(records):
+        if record['mode'] == mode and record['files'] == files:
+            return record
+    return None
+
+
+def benchmark(sizes, modes, results_path=DEFAULT_RESULTS, seed=DEFAULT_SEED,
+              threshold=DEFAULT_THRESHOLD, per_rule=10):
+    history = load_results(results_path)
+    revision = _git_revision()
+    regressions = 0
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    for files in sizes:
+        corpus = generate_corpus(os.path.join(BENCH_DIR, f'corpus-{files}'), files, seed)
+        total_bytes = _corpus_bytes(corpus)
+        print(f"\n{files} files, {total_bytes / 1e6:.1f} MB")
+        if per_rule:
+            print(f"  slowest rules over {min(files, PER_RULE_SAMPLE)} files:")
+            for entry in per_rule_times(corpus)[:per_rule]:
+                print(f"    {entry['seconds'] * 1000:8.2f} ms  {entry['rule_set']}: {entry['pattern']}")
+        for mode in modes:
+            metrics = measure(mode, corpus)
+            seconds = metrics['seconds']
+            record = {
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'revision': revision,
+                'mode': mode,
+                'files': files,
+                'bytes': total_bytes,
+                'seconds': round(seconds, 4),
+                'files_per_sec': round(files / seconds, 1),
+                'mb_per_sec': round(total_bytes / 1e6 / seconds, 2),
+                'peak_rss_kb': metrics['peak_rss_kb'],
+            }
+            line = (f"  {mode:<9} {seconds:8.3f}s {record['files_per_sec']:10.1f} files/s "
+                    f"{record['mb_per_sec']:8.2f} MB/s {record['peak_rss_kb'] / 1024:7.1f} MB RSS")
+            previous = _previous(history, mode, files)
+            if previous is not None:
+                change = (seconds - previous['seconds']) / previous['seconds'] * 100
+                line += f"  {change:+.1f}% vs {previous.get('revision') or previous['time']}"
+                if change > threshold and seconds - previous['seconds'] > MIN_REGRESSION_SECONDS:
+                    line += '  REGRESSION'
+                    regressions += 1
+            print(line)
+            history.append(record)
+            with open(results_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m codemod.bench',
+        description='Benchmark the fix pipeline on synthetic TSX corpora.',
+    )
+    parser.add_argument('--files', type=int, nargs='+', default=list(DEFAULT_SIZES), metavar='N',
+                        help='corpus sizes to benchmark (default: 1000)')
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=list(MODES), metavar='MODE',
+                        help=f"modes to run (default: all of {', '.join(MODES)})")
+    parser.add_argument('--results', default=DEFAULT_RESULTS, metavar='PATH',
+                        help='JSON lines file results are appended to (default: .codemod/bench/results.jsonl)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help='corpus generator seed')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, metavar='PCT',
+                        help='flag modes slower than their last run by more than PCT percent')
+    parser.add_argument('--per-rule', type=int, default=10, metavar='N',
+                        help='show the N slowest rules per corpus (0 to skip)')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'ROOT'), help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.child:
+        mode, root = args.child
+        seconds = _run_mode(mode, root)
+        print(json.dumps({'seconds': seconds, 'peak_rss_kb': _peak_rss_kb()}))
+        return 0
+    regressions = benchmark(args.files, args.modes, args.results, args.seed,
+                            args.threshold, args.per_rule)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
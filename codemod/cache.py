@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Incremental cache of files already processed with a given rule set.
+
+The manifest maps each file path to the stat, content hash and rule
+fingerprint recorded after its last clean run. A file whose size and mtime
+are unchanged is skipped without being read; a file that was touched but
+still has the same content is skipped without running any regex.
+"""
+import hashlib
+import json
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MANIFEST = os.path.join(REPO_ROOT, '.codemod', 'manifest.json')
+MANIFEST_VERSION = 1
+
+
+def content_hash(content):
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def rules_fingerprint(rules, mode=''):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(mode.encode('utf-8'))
+    for rule in rules:
+        digest.update(repr((rule.pattern, rule.replacement, rule.literal,
+                            rule.files, rule.requires, rule.scope)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def make_entry(filepath, content, fingerprint):
+    st = os.stat(filepath)
+    return {
+        'hash': content_hash(content),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'rules': fingerprint,
+    }
+
+
+def stat_matches(filepath, entry):
+    st = os.stat(filepath)
+    return st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime_ns']
+
+
+class Manifest:
+    def __init__(self, path=DEFAULT_MANIFEST):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            pass
+
+    def get(self, filepath, fingerprint):
+        entry = self.entries.get(filepath)
+        if entry is not None and entry.get('rules') == fingerprint:
+            return entry
+        return None
+
+    def record(self, filepath, entry):
+        if self.entries.get(filepath) != entry:
+            self.entries[filepath] = entry
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'entries': self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
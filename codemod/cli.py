@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+import argparse
+
+from .cache import DEFAULT_MANIFEST, Manifest
+from .compiler import DEFAULT_MAX_ITERATIONS
+from .diagnostics import load_diagnostics
+from .discovery import GitError, changed_files, git_toplevel
+from .engine import CLIENT_SRC, REPO_ROOT, iter_files, run
+from .index import DEFAULT_INDEX, SymbolIndex
+from .journal import DEFAULT_JOURNAL_DIR, latest_journal, rollback
+from .precompiled import DEFAULT_COMPILED_DIR, load_compiled
+from .profile import DEFAULT_RULE_BUDGET, Profile
+from .rulefiles import DEFAULT_RULE_DIR, RuleFileError, register_rule_files, rule_file_paths
+from .routes import HOOK_KINDS, RouteIndex, route_rules, unresolved_call_sites
+from .rules import FIX_SEQUENCE, REGISTRY, select
+from .watch import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL, watch
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m codemod',
+        description='Apply the registered TypeScript fix rule sets in a single pass.',
+    )
+    parser.add_argument('rule_sets', nargs='*', metavar='RULE_SET',
+                        help='rule sets to apply, in order (default: the full fix sequence)')
+    parser.add_argument('--root', default=CLIENT_SRC,
+                        help='directory to process (default: client/src)')
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument('--since', metavar='REF',
+                       help='only process files changed on this branch since it left REF '
+                            '(committed, modified or untracked)')
+    scope.add_argument('--staged', action='store_true',
+                       help='only process files staged in the git index')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='worker processes to use (0: one per CPU, default: 1)')
+    parser.add_argument('--converge', type=int, nargs='?', const=DEFAULT_MAX_ITERATIONS,
+                        default=0, metavar='N',
+                        help='re-apply the rules until each file reaches a fixed point '
+                             f'(at most N iterations, default {DEFAULT_MAX_ITERATIONS}); '
+                             'files that do not converge are reported and left untouched')
+    parser.add_argument('--diagnostics', metavar='FILE',
+                        help='saved `tsc --noEmit` output; only the files, lines and rules '
+                             'matching the reported error codes are processed')
+    parser.add_argument('--tsc-root', default=REPO_ROOT, metavar='DIR',
+                        help='directory tsc ran from, to resolve its relative paths '
+                             '(default: the repository root)')
+    parser.add_argument('--context', type=int, default=0, metavar='N',
+                        help='with --diagnostics, also match N lines around each error')
+    parser.add_argument('--routes', action='store_true',
+                        help='first rewrite tRPC call sites missing from the server route '
+                             'map to their nearest valid procedure')
+    parser.add_argument('--list-routes', action='store_true',
+                        help='print the server route map and the unresolved client call sites, and exit')
+    parser.add_argument('--rule-budget', type=float, default=DEFAULT_RULE_BUDGET, metavar='SECONDS',
+                        help='abort a file when one rule runs longer than this on it and report '
+                             f'the pattern (default: {DEFAULT_RULE_BUDGET:g}, 0 disables)')
+    parser.add_argument('--profile', action='store_true',
+                        help='print per-rule time, matches and replacements after the run')
+    parser.add_argument('--profile-json', metavar='PATH',
+                        help='write per-rule and per-file counters as JSON')
+    parser.add_argument('--profile-flame', metavar='PATH',
+                        help='write collapsed stacks (rule set;pattern;file) for flamegraph tools')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='write nothing; stream the unified diff of every file that would change '
+                             '(apply it with `git apply`)')
+    parser.add_argument('--stats', action='store_true',
+                        help='write nothing; only print how many files, hunks and lines would change')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and apply the rules to each file as soon as it is saved')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE, metavar='SECONDS',
+                        help='with --watch, wait for this long without events before processing '
+                             f'(default: {DEFAULT_DEBOUNCE:g})')
+    parser.add_argument('--poll', type=float, nargs='?', const=DEFAULT_POLL_INTERVAL, metavar='SECONDS',
+                        help='with --watch, poll the tree instead of using inotify '
+                             f'(default interval: {DEFAULT_POLL_INTERVAL:g})')
+    parser.add_argument('--cache', default=DEFAULT_MANIFEST, metavar='PATH',
+                        help='incremental cache manifest (default: .codemod/manifest.json)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='process every file even if it is unchanged since the last run')
+    parser.add_argument('--index', default=DEFAULT_INDEX, metavar='PATH',
+                        help='symbol index used to skip files no rule can match '
+                             '(default: .codemod/index.sqlite)')
+    parser.add_argument('--no-index', action='store_true',
+                        help='read every file instead of narrowing them with the index')
+    parser.add_argument('--journal-dir', default=DEFAULT_JOURNAL_DIR, metavar='DIR',
+                        help='where undo journals are written (default: .codemod/journal)')
+    parser.add_argument('--no-journal', action='store_true',
+                        help='do not write an undo journal for this run')
+    parser.add_argument('--rollback', nargs='?', const='latest', metavar='JOURNAL',
+                        help='restore the files changed by a run (default: the latest run) and exit')
+    parser.add_argument('--rules-dir', default=DEFAULT_RULE_DIR, metavar='DIR',
+                        help='directory of TOML rule files, registered after the built-in rule sets '
+                             '(default: codemod/rulesets)')
+    parser.add_argument('--rules', action='append', default=[], metavar='FILE', dest='rule_files',
+                        help='also register the rule set declared in this TOML file (repeatable)')
+    parser.add_argument('--compiled-cache', default=DEFAULT_COMPILED_DIR, metavar='DIR',
+                        help='where compiled rule plans are cached (default: .codemod/compiled)')
+    parser.add_argument('--no-compiled-cache', action='store_true',
+                        help='compile the rules on every run')
+    parser.add_argument('--list', action='store_true',
+                        help='list the registered rule sets and exit')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        register_rule_files(rule_file_paths(args.rules_dir) + args.rule_files)
+    except (OSError, RuleFileError) as e:
+        print(f"Cannot load rule files: {e}")
+        return 2
+
+    if args.list:
+        for name in FIX_SEQUENCE:
+            print(f"{name}: {len(REGISTRY[name])} rules")
+        return 0
+
+    if args.list_routes:
+        return list_routes(args.root)
+
+    if args.rollback:
+        return rollback_run(args.rollback, args.journal_dir)
+
+    try:
+        rules = select(args.rule_sets)
+    except KeyError as e:
+        print(e.args[0])
+        return 2
+
+    if args.routes:
+        index = RouteIndex()
+        route_map = index.load()
+        generated = route_rules(route_map, iter_files(args.root))
+        print(f"Route map: {len(route_map)} procedures ({len(index.reparsed)} router files re-parsed), "
+              f"{len(generated)} call site rewrites")
+        rules = list(generated) + rules
+
+    diagnostics = None
+    if args.diagnostics:
+        try:
+            diagnostics = load_diagnostics(args.diagnostics, args.tsc_root, args.context)
+        except OSError as e:
+            print(f"Cannot read diagnostics: {e}")
+            return 2
+        print(f"{len(diagnostics)} diagnostics in {len(diagnostics.files)} files")
+
+    if not args.no_compiled_cache:
+        rules = load_compiled(rules, args.compiled_cache)
+    journal_dir = None if args.no_journal else args.journal_dir
+    preview = 'diff' if args.dry_run else 'stats' if args.stats else None
+    if args.watch:
+        if preview:
+            print("--dry-run and --stats cannot be combined with --watch")
+            return 2
+        return watch(rules, root=args.root, debounce=args.debounce, poll=args.poll,
+                     budget=args.rule_budget or None, journal_dir=journal_dir)
+
+    files = None
+    if args.since is not None or args.staged:
+        try:
+            files = changed_files(args.root, since=args.since, staged=args.staged)
+        except GitError as e:
+            print(f"Cannot list changed files: {e}")
+            return 2
+        print(f"{len(files)} changed files " + ('staged' if args.staged else f'since {args.since}'))
+
+    profile = Profile() if args.profile or args.profile_json or args.profile_flame else None
+    manifest = None if args.no_cache else Manifest(args.cache)
+    symbol_index = None if args.no_index else SymbolIndex(args.index)
+    run(rules, root=args.root, files=files, jobs=args.jobs, manifest=manifest, max_iterations=args.converge,
+        diagnostics=diagnostics, profile=profile, budget=args.rule_budget or None,
+        journal_dir=journal_dir, index=symbol_index, preview=preview,
+        preview_root=preview_root(args.root) if preview else None)
+    if profile is not None:
+        if args.profile:
+            print(profile.summary())
+        if args.profile_json:
+            profile.write_json(args.profile_json)
+        if args.profile_flame:
+            profile.write_folded(args.profile_flame, args.root)
+    return 0
+
+
+def preview_root(root):
+    """Directory the paths of a dry run's diff are relative to, as `git apply` expects"""
+    try:
+        return git_toplevel(root)
+    except GitError:
+        return REPO_ROOT
+
+
+def rollback_run(journal, journal_dir):
+    path = latest_journal(journal_dir) if journal == 'latest' else journal
+    if path is None:
+        print("No run to roll back")
+        return 2
+    try:
+        restored, skipped = rollback(path)
+    except (OSError, ValueError) as e:
+        print(f"Cannot roll back {path}: {e}")
+        return 2
+    for message in skipped:
+        print(f"Skipped {message}")
+    print(f"Restored {restored} files from {path}")
+    return 1 if skipped else 0
+
+
+def list_routes(root):
+    index = RouteIndex()
+    route_map = index.load()
+    for path, kind in sorted(route_map.procedures.items()):
+        print(f"{path} ({kind})")
+    print(f"\n{len(route_map)} procedures, {len(index.reparsed)} router files re-parsed")
+    for site in unresolved_call_sites(route_map, iter_files(root)):
+        target = route_map.nearest(site.path, HOOK_KINDS[site.hook])
+        print(f"{site.filepath}: {site.obj}.{site.path}.{site.hook} -> {target or '?'}")
+    return 0
+
+
+def run_rule_set(name):
+    """Entry point kept for the legacy fix_*.py scripts"""
+    return run(select([name]))
@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+"""Compile rule lists into as few scans per file as possible.
+
+Runs of consecutive literal-anchored rules (patterns that only ever match one
+fixed string, such as the tRPC rename tables) are merged into one compiled
+alternation. Each match is dispatched to its rule's replacement, so a whole
+rename table costs a single scan no matter how many entries it has. Rules
+whose literals overlap or whose output another rule in the run could match
+depend on order; they start a new pass instead, exactly like the sequential
+re.sub calls the scripts made.
+
+Every rule also gets an anchor: the longest literal any match must contain.
+All anchors are found with one multi-literal scan per file, and passes whose
+anchors do not occur in the file are skipped without running their regex.
+"""
+import re
+import time
+from collections import namedtuple
+
+from .lexer import CodeMap
+from .lines import LineIndex
+from .profile import RuleTimeout, time_budget
+
+# iterations: rule-set passes that changed the file; culprits: [(rule, reason)]
+Convergence = namedtuple('Convergence', 'converged iterations culprits')
+DEFAULT_MAX_ITERATIONS = 5
+
+REGEX_META = set('.^$*+?{}[]|()')
+
+
+def literal_text(pattern):
+    """Return the text a regex matches if it is a plain literal, else None"""
+    chars = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            if i + 1 >= len(pattern):
+                return None
+            escaped = pattern[i + 1]
+            # \w, \s, \d, \b, \1 ... are classes, anchors or backreferences
+            if escaped.isalnum():
+                return None
+            chars.append(escaped)
+            i += 2
+            continue
+        if char in REGEX_META:
+            return None
+        chars.append(char)
+        i += 1
+    return ''.join(chars)
+
+
+# Shorter anchors match almost everywhere and are not worth scanning for
+MIN_ANCHOR = 3
+# (?i), (?x), (?i:...) and the like: an unescaped group that sets flags
+INLINE_FLAGS = re.compile(r'(?<!\\)(?:\\\\)*\(\?[aiLmsux-]+[:)]')
+
+
+def _skip_class(pattern, i):
+    """Index just past the character class starting at pattern[i] == '['"""
+    i += 1
+    if i < len(pattern) and pattern[i] == '^':
+        i += 1
+    if i < len(pattern) and pattern[i] == ']':
+        i += 1
+    while i < len(pattern) and pattern[i] != ']':
+        i += 2 if pattern[i] == '\\' else 1
+    return i + 1
+
+
+def _skip_group(pattern, i):
+    """Index just past the group starting at pattern[i] == '('"""
+    depth = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '[':
+            i = _skip_class(pattern, i)
+            continue
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _has_top_level_alternation(pattern):
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 2
+        elif char == '[':
+            i = _skip_class(pattern, i)
+        elif char == '(':
+            i = _skip_group(pattern, i)
+        elif char == '|':
+            return True
+        else:
+            i += 1
+    return False
+
+
+QUANTIFIER_BRACES = re.compile(r'\{\d*(,\d*)?\}')
+
+
+def _skip_quantifier(pattern, i):
+    """Index just past the quantifier at pattern[i], or i if there is none"""
+    if i >= len(pattern):
+        return i
+    if pattern[i] in '*+?':
+        end = i + 1
+    else:
+        match = QUANTIFIER_BRACES.match(pattern, i)
+        if match is None or match.group(0) == '{}':
+            return i
+        end = match.end()
+    # Lazy and possessive suffixes
+    if end < len(pattern) and pattern[end] in '?+':
+        end += 1
+    return end
+
+
+def _optional_quantifier(pattern, i):
+    """True if the quantifier at pattern[i] allows zero repetitions"""
+    if _skip_quantifier(pattern, i) == i:
+        return False
+    return pattern[i] in '*?' or pattern[i + 1:i + 2] in ('0', ',')
+
+
+def required_literals(pattern):
+    """Literal runs that every match of pattern must contain"""
+    if _has_top_level_alternation(pattern):
+        return []
+    literals = []
+    run = []
+
+    def end_run():
+        if run:
+            literals.append(''.join(run))
+            run.clear()
+
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        literal = None
+        if char == '(':
+            end = _skip_group(pattern, i)
+            inner = pattern[i + 1:end - 1]
+            end_run()
+            if not _optional_quantifier(pattern, end) and not inner.startswith(('?=', '?!', '?<=', '?<!')):
+                if inner.startswith('?P<'):
+                    inner = inner[inner.index('>') + 1:]
+                elif inner.startswith('?:'):
+                    inner = inner[2:]
+                literals.extend(required_literals(inner))
+            i = _skip_quantifier(pattern, end)
+            continue
+        if char == '[':
+            end = _skip_class(pattern, i)
+        elif char == '\\':
+            end = i + 2
+            if end <= len(pattern) and not pattern[i + 1].isalnum():
+                literal = pattern[i + 1]
+        else:
+            end = i + 1
+            if char not in REGEX_META:
+                literal = char
+        after = _skip_quantifier(pattern, end)
+        if literal is None:
+            end_run()
+        elif after == end:
+            run.append(literal)
+        else:
+            # The quantified character may repeat or vanish, so the run ends here
+            if not _optional_quantifier(pattern, end):
+                run.append(literal)
+            end_run()
+        i = after
+    end_run()
+    return literals
+
+
+def rule_anchor(rule):
+    """Longest literal every match of rule must contain, or None if too weak to prefilter on"""
+    if rule.literal:
+        candidates = [rule.pattern]
+    elif INLINE_FLAGS.search(rule.pattern):
+        # Under (?i) or (?x) the pattern's text is not the text it matches
+        candidates = []
+    else:
+        candidates = required_literals(rule.pattern)
+    # requires is checked with a plain `in`, whatever the pattern's flags
+    candidates.extend(rule.requires)
+    best = max(candidates, key=len, default='')
+    return best if len(best) >= MIN_ANCHOR else None
+
+
+def _overlaps(a, b):
+    """True if a and b can share characters in some text (containment or a suffix/prefix overlap)"""
+    if a in b or b in a:
+        return True
+    shortest = min(len(a), len(b))
+    for size in range(1, shortest):
+        if a.endswith(b[:size]) or b.endswith(a[:size]):
+            return True
+    return False
+
+
+class LiteralRule:
+    def __init__(self, rule, text, output):
+        self.rule = rule
+        self.text = text
+        self.output = output
+
+    def feeds(self, later):
+        # Sequential re.sub would let the later rule match this rule's output
+        return _overlaps(self.output, later.text)
+
+    def overlaps(self, later):
+        return _overlaps(self.text, later.text)
+
+    def duplicates(self, later):
+        # Same text and scope: the earlier rule already rewrote every occurrence
+        return (self.text == later.text and self.rule.files == later.rule.files
+                and self.rule.scope == later.rule.scope)
+
+
+class FileContext:
+    """Per-file state shared by the passes: path, present anchors, lazy code map
+
+    targets, when set, maps line numbers to the tsc error codes reported on
+    them; a rule then only rewrites matches starting on a line with one of
+    its codes. profile, when set, is the FileProfile the passes report their
+    matches and replacements to. changes, when set, is the EditTracker every
+    pass's edits are folded into.
+    """
+
+    def __init__(self, filepath, targets=None, profile=None, changes=None):
+        self.filepath = str(filepath)
+        self.jsx = self.filepath.endswith('.tsx')
+        self.present = None
+        self.targets = targets
+        self.codes = None if targets is None else set().union(*targets.values())
+        self.profile = profile
+        self.changes = changes
+        self._applies = {}
+        self._code_map = None
+        self._code_map_content = None
+        self._lines = None
+        self._lines_content = None
+        self._edits = []
+
+    def applies(self, rule):
+        # Glob matching is slow enough to be worth memoizing per file
+        if not rule.files:
+            return True
+        result = self._applies.get(rule.files)
+        if result is None:
+            result = self._applies[rule.files] = rule.applies_to(self.filepath)
+        return result
+
+    def is_code(self, content, offset):
+        # The map is only built once a scoped rule actually matches
+        if self._code_map_content is not content:
+            self._code_map = CodeMap(content, jsx=self.jsx)
+            self._code_map_content = content
+        return self._code_map.is_code(offset)
+
+    def line_of(self, content, offset):
+        if self._lines_content is not content:
+            self._lines = LineIndex(content)
+            self._lines_content = content
+        return self._lines.line_of(offset)
+
+    def targeted(self, rule):
+        """True if the rule has any of the error codes reported in this file"""
+        return self.codes is None or not self.codes.isdisjoint(rule.codes)
+
+    def restricts(self, rule):
+        """True if matches of rule must be checked one by one"""
+        # Tracked edits need every match recorded, not just the restricted ones
+        return rule.scope == 'code' or self.targets is not None or self.changes is not None
+
+    def accepts(self, rule, content, offset):
+        if rule.scope == 'code' and not self.is_code(content, offset):
+            return False
+        if self.targets is not None:
+            codes = self.targets.get(self.line_of(content, offset))
+            return codes is not None and not codes.isdisjoint(rule.codes)
+        return True
+
+    def begin_pass(self):
+        self._edits = []
+        if self.profile is not None:
+            self.profile.begin_pass()
+
+    def note(self, rule, match, output):
+        """Record a match; output is None when the match was left as it is"""
+        if self.profile is not None:
+            self.profile.count(rule, output is not None)
+        if output is not None:
+            self._edits.append((match.start(), match.end(), len(output)))
+
+    def note_all(self, rule, count):
+        """Record count matches replaced without a callback"""
+        if self.profile is not None:
+            for _ in range(count):
+                self.profile.count(rule, True)
+
+    def end_pass(self, content, updated):
+        """Called after a pass changed content into updated"""
+        if self.changes is not None:
+            self.changes.follow(self._edits)
+        if self._code_map_content is not content:
+            return
+        # Replacements are whole tokens, so the code map of the input stays
+        # valid for the output once offsets are mapped back through the edits;
+        # a pass that rewrote without recording its edits forces a re-lex
+        if self._edits and self._code_map.follow(self._edits):
+            self._code_map_content = updated
+        else:
+            self._code_map_content = None
+
+
+def _scoped_sub(regex, content, ctx, rule, expand):
+    """regex.sub() that leaves matches the context does not accept untouched"""
+    def replace(match):
+        if not ctx.accepts(rule, content, match.start()):
+            ctx.note(rule, match, None)
+            return match.group(0)
+        output = expand(match)
+        ctx.note(rule, match, output)
+        return output
+
+    return regex.sub(replace, content)
+
+
+TEMPLATE_PART = re.compile(r'\\(\d{1,2})|\\g<(\w+)>|\\.', re.DOTALL)
+
+
+def _expander(regex, template):
+    """match -> expanded template, parsed once instead of on every match.expand()"""
+    parts = []
+    last = 0
+    for part in TEMPLATE_PART.finditer(template):
+        group = part.group(1) or part.group(2)
+        if group is None:
+            # Character escapes keep re's own handling
+            return lambda match: match.expand(template)
+        parts.append(template[last:part.start()])
+        parts.append(int(group) if group.isdigit() else regex.groupindex[group])
+        last = part.end()
+    parts.append(template[last:])
+    if len(parts) == 1:
+        return lambda match: template
+
+    def expand(match):
+        return ''.join(part if isinstance(part, str) else (match.group(part) or '') for part in parts)
+
+    return expand
+
+
+class RegexPass:
+    def __init__(self, rule):
+        self.rule = rule
+        self.rules = (rule,)
+        self.regex = re.compile(rule.pattern)
+        self.expand = _expander(self.regex, rule.replacement)
+        anchor = rule_anchor(rule)
+        self.anchors = None if anchor is None else {anchor}
+
+    def __getstate__(self):
+        # The expander is a closure; it is rebuilt from the regex when loaded
+        state = self.__dict__.copy()
+        del state['expand']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.expand = _expander(self.regex, self.rule.replacement)
+
+    def apply(self, content, ctx):
+        if not ctx.applies(self.rule):
+            return content
+        if self.rule.requires and not all(text in content for text in self.rule.requires):
+            return content
+        if not ctx.restricts(self.rule):
+            updated, count = self.regex.subn(self.rule.replacement, content)
+            ctx.note_all(self.rule, count)
+            return updated
+        return _scoped_sub(self.regex, content, ctx, self.rule, self.expand)
+
+
+class ReplacePass:
+    def __init__(self, member):
+        self.rule = member.rule
+        self.rules = (member.rule,)
+        self.text = member.text
+        self.output = member.output
+        self.anchors = {member.text} if len(member.text) >= MIN_ANCHOR else None
+        self.regex = re.compile(re.escape(member.text))
+
+    def apply(self, content, ctx):
+        if not ctx.applies(self.rule):
+            return content
+        if self.rule.requires and not all(text in content for text in self.rule.requires):
+            return content
+        if not ctx.restricts(self.rule):
+            if ctx.profile is not None:
+                ctx.note_all(self.rule, content.count(self.text))
+            return content.replace(self.text, self.output)
+        output = self.output
+        return _scoped_sub(self.regex, content, ctx, self.rule, lambda match: output)
+
+
+def _trie_pattern(texts):
+    """Build an alternation that shares common prefixes, one empty named group per leaf
+
+    Longer continuations are tried before a leaf, so at any position the
+    longest matching text wins.
+    """
+    trie = {}
+    for index, text in enumerate(texts):
+        node = trie
+        for char in text:
+            node = node.setdefault(char, {})
+        node[''] = index
+
+    def render(node):
+        branches = []
+        for char, child in node.items():
+            if char != '':
+                branches.append(re.escape(char) + render(child))
+        if '' in node:
+            branches.append(f'(?P<r{node[""]}>)')
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    return render(trie)
+
+
+class LiteralGroupPass:
+    def __init__(self, members):
+        self.members = members
+        self.rules = tuple(member.rule for member in members)
+        self.regex = re.compile(_trie_pattern([member.text for member in members]))
+        # Group number -> member, so dispatch is a single list lookup
+        self.dispatch = [None] * (self.regex.groups + 1)
+        for name, number in self.regex.groupindex.items():
+            self.dispatch[number] = members[int(name[1:])]
+        if all(len(member.text) >= MIN_ANCHOR for member in members):
+            self.anchors = {member.text for member in members}
+        else:
+            self.anchors = None
+
+    def apply(self, content, ctx):
+        present = ctx.present
+        active = {
+            id(member) for member in self.members
+            if ctx.applies(member.rule) and ctx.targeted(member.rule)
+            and (present is None or len(member.text) < MIN_ANCHOR or member.text in present)
+        }
+        if not active:
+            return content
+        dispatch = self.dispatch
+
+        def replace(match):
+            member = dispatch[match.lastindex]
+            if id(member) not in active:
+                return match.group(0)
+            if ctx.restricts(member.rule) and not ctx.accepts(member.rule, content, match.start()):
+                ctx.note(member.rule, match, None)
+                return match.group(0)
+            ctx.note(member.rule, match, member.output)
+            return member.output
+
+        return self.regex.sub(replace, content)
+
+
+class LiteralScanner:
+    """Find which of a set of literals occur in a text with one compiled scan
+
+    The literals are compiled into a single prefix-sharing alternation that
+    prefers the longest match, Aho-Corasick style. Searching again from the
+    position after each hit also finds literals that overlap or are nested
+    in one another; literals that are prefixes of a hit are implied by it.
+    """
+
+    def __init__(self, literals):
+        self.literals = sorted(set(literals))
+        self.regex = re.compile(_trie_pattern(self.literals)) if self.literals else None
+        self.implied = [None] * (self.regex.groups + 1 if self.regex else 1)
+        if self.regex:
+            for name, number in self.regex.groupindex.items():
+                text = self.literals[int(name[1:])]
+                self.implied[number] = {
+                    literal for literal in self.literals if text.startswith(literal)
+                }
+
+    def scan(self, content):
+        found = set()
+        if self.regex is None:
+            return found
+        search = self.regex.search
+        implied = self.implied
+        total = len(self.literals)
+        match = search(content)
+        while match is not None:
+            found |= implied[match.lastindex]
+            if len(found) == total:
+                break
+            match = search(content, match.start() + 1)
+        return found
+
+
+class CompiledRules:
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self._passes = None
+        self._scanner = None
+
+    @property
+    def passes(self):
+        # Planned and compiled on first use, so fully cached runs never compile a regex
+        if self._passes is None:
+            self._passes = _plan_passes(self.rules)
+            anchors = set()
+            for rule_pass in self._passes:
+                anchors |= rule_pass.anchors or set()
+            self._scanner = LiteralScanner(anchors)
+        return self._passes
+
+    def apply(self, content, filepath='', fired=None, targets=None, profile=None, budget=None,
+              changes=None):
+        """Apply every pass in order
+
+        profile is a FileProfile to record per-rule counters in; budget is
+        the number of seconds any one pass may run before RuleTimeout;
+        changes is an EditTracker to fold the edits of the passes into.
+        """
+        passes = self.passes
+        scan = self._scanner.scan
+        ctx = FileContext(filepath, targets, profile, changes)
+        ctx.present = scan(content)
+        for rule_pass in passes:
+            if rule_pass.anchors is not None and rule_pass.anchors.isdisjoint(ctx.present):
+                continue
+            if targets is not None and not any(ctx.targeted(rule) for rule in rule_pass.rules):
+                continue
+            ctx.begin_pass()
+            if profile is None and not budget:
+                updated = rule_pass.apply(content, ctx)
+            else:
+                updated = _measured(rule_pass, content, ctx, budget)
+            if updated != content:
+                ctx.end_pass(content, updated)
+                content = updated
+                if fired is not None:
+                    fired.append(rule_pass)
+                # Replacements can introduce literals later rules are anchored on
+                ctx.present = scan(content)
+        return content
+
+    def converge(self, content, filepath='', max_iterations=DEFAULT_MAX_ITERATIONS, targets=None,
+                 profile=None, budget=None, changes=None):
+        """Apply the rules until the content stops changing
+
+        Returns (content, Convergence). If a previous state comes back or the
+        iteration limit is hit, the rules that kept firing are diagnosed and
+        the content of the last iteration is returned.
+        """
+        seen = {content}
+        for iteration in range(max_iterations):
+            fired = []
+            updated = self.apply(content, filepath, fired, targets, profile, budget, changes)
+            if updated == content:
+                return content, Convergence(True, iteration, [])
+            if updated in seen or iteration == max_iterations - 1:
+                culprits = _diagnose(content, filepath, fired, targets)
+                return updated, Convergence(False, iteration + 1, culprits)
+            seen.add(updated)
+            content = updated
+        return content, Convergence(True, max_iterations, [])
+
+
+def _measured(rule_pass, content, ctx, budget):
+    start = time.perf_counter()
+    try:
+        with time_budget(budget, rule_pass.rules):
+            updated = rule_pass.apply(content, ctx)
+        if budget and time.perf_counter() - start > budget:
+            raise RuleTimeout(rule_pass.rules, budget)
+    finally:
+        # Runaway passes are recorded too, with the time they ran for
+        if ctx.profile is not None:
+            ctx.profile.end_pass(rule_pass.rules, time.perf_counter() - start, len(content))
+    return updated
+
+
+def _diagnose(content, filepath, fired, targets=None):
+    """Find the rules that still rewrite content and whether each one re-triggers itself"""
+    culprits = []
+    for rule_pass in fired:
+        for rule in rule_pass.rules:
+            single = CompiledRules([rule])
+            once = single.apply(content, filepath, targets=targets)
+            if once == content:
+                continue
+            twice = single.apply(once, filepath, targets=targets)
+            reason = 'not idempotent' if twice != once else 'oscillates with other rules'
+            culprits.append((rule, reason))
+    return culprits
+
+
+def _literal_member(rule):
+    if rule.requires:
+        return None
+    text = rule.pattern if rule.literal else literal_text(rule.pattern)
+    if not text:
+        return None
+    output = rule.replacement if rule.literal else re.sub(rule.pattern, rule.replacement, text)
+    return LiteralRule(rule, text, output)
+
+
+def _group_pass(members):
+    if len(members) == 1:
+        member = members[0]
+        return ReplacePass(member) if member.rule.literal else RegexPass(member.rule)
+    return LiteralGroupPass(members)
+
+
+def _plan_passes(rules):
+    passes = []
+    group = []
+
+    def flush():
+        if group:
+            passes.append(_group_pass(list(group)))
+            group.clear()
+
+    for rule in rules:
+        member = _literal_member(rule)
+        if member is None:
+            flush()
+            # A literal rule with requires cannot join a group, but its
+            # pattern and replacement are still plain text
+            if rule.literal and rule.pattern:
+                passes.append(ReplacePass(LiteralRule(rule, rule.pattern, rule.replacement)))
+            else:
+                passes.append(RegexPass(rule))
+            continue
+        if any(existing.feeds(member) for existing in group):
+            flush()
+        elif any(existing.duplicates(member) for existing in group):
+            continue
+        elif any(existing.overlaps(member) for existing in group):
+            flush()
+        group.append(member)
+    flush()
+    return passes
+
+
+def compile_rules(rules):
+    return CompiledRules(rules)
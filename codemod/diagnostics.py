@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Parse saved `tsc --noEmit` output into a file -> line -> error code index.
+
+Both output styles are understood:
+
+    client/src/pages/diesel/DieselTanks.tsx(45,23): error TS2339: Property ...
+    client/src/pages/diesel/DieselTanks.tsx:45:23 - error TS2339: Property ...
+
+Continuation lines of multi-line messages and the summary are ignored.
+"""
+import os
+import re
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+DIAGNOSTIC_LINE = re.compile(
+    r'^(?P<path>.+?)(?:\((?P<line>\d+),(?P<col>\d+)\): |:(?P<line2>\d+):(?P<col2>\d+) - )'
+    r'error (?P<code>TS\d+):'
+)
+
+
+class DiagnosticIndex:
+    def __init__(self, context=0):
+        # Lines around each error that rules may still match on
+        self.context = context
+        self.files = {}
+
+    def add(self, filepath, line, code):
+        self.files.setdefault(filepath, {}).setdefault(line, set()).add(code)
+
+    @property
+    def codes(self):
+        return {code for lines in self.files.values() for codes in lines.values() for code in codes}
+
+    def __len__(self):
+        return sum(len(codes) for lines in self.files.values() for codes in lines.values())
+
+    def targets(self, filepath):
+        """{line: codes} for filepath, widened by the context window"""
+        lines = self.files.get(filepath)
+        if lines is None:
+            return {}
+        if not self.context:
+            return lines
+        widened = {}
+        for line, codes in lines.items():
+            for near in range(max(1, line - self.context), line + self.context + 1):
+                widened.setdefault(near, set()).update(codes)
+        return widened
+
+
+def parse_diagnostics(text, root, context=0):
+    """Build a DiagnosticIndex from tsc output; relative paths are resolved against root"""
+    index = DiagnosticIndex(context)
+    for raw in text.splitlines():
+        match = DIAGNOSTIC_LINE.match(ANSI_ESCAPE.sub('', raw))
+        if match is None:
+            continue
+        path = match.group('path').strip()
+        line = int(match.group('line') or match.group('line2'))
+        filepath = os.path.normpath(os.path.join(root, path))
+        index.add(filepath, line, match.group('code'))
+    return index
+
+
+def load_diagnostics(path, root, context=0):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return parse_diagnostics(f.read(), root, context)
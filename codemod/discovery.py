@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Find the files a run has to read.
+
+Three scopes are supported:
+
+- the full tree, walked with os.scandir; ignored directories (node_modules,
+  build output, VCS metadata) are pruned before they are entered;
+- the files changed since a git ref: `git diff --name-only` against the merge
+  base of the ref and HEAD, plus untracked files, so a branch that touches ten
+  files only reads those ten;
+- the files staged in the index (`git diff --cached --name-only`).
+
+Git scopes only return files that still exist under the requested root and
+have one of the processed extensions.
+"""
+import os
+import subprocess
+
+EXTENSIONS = ('.tsx', '.ts')
+SKIP_DIRS = {'node_modules', '.git', '.codemod', 'dist', 'build', 'coverage'}
+
+
+class GitError(Exception):
+    pass
+
+
+def walk_files(root, extensions=EXTENSIONS, skip_dirs=SKIP_DIRS):
+    """Files under root in os.walk order (files of a directory, then its subdirectories)"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        files = []
+        dirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in skip_dirs:
+                            dirs.append(entry.name)
+                    elif entry.name.endswith(extensions):
+                        files.append(entry.name)
+        except OSError:
+            continue
+        for name in sorted(files):
+            yield os.path.join(directory, name)
+        stack.extend(os.path.join(directory, name) for name in sorted(dirs, reverse=True))
+
+
+def _git(args, cwd):
+    try:
+        completed = subprocess.run(['git', *args], cwd=cwd, capture_output=True, check=True)
+    except FileNotFoundError:
+        raise GitError("git is not installed")
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode('utf-8', 'replace').strip()
+        raise GitError(f"git {' '.join(args)}: {message}")
+    return os.fsdecode(completed.stdout)
+
+
+def git_toplevel(path):
+    return _git(['rev-parse', '--show-toplevel'], path).strip()
+
+
+def _merge_base(ref, toplevel):
+    """Where the current branch left ref, so changes made on ref since are not included"""
+    try:
+        return _git(['merge-base', ref, 'HEAD'], toplevel).strip()
+    except GitError:
+        # Unrelated history or a tree-ish that is not a commit: diff against it directly
+        try:
+            _git(['rev-parse', '--verify', '--quiet', ref], toplevel)
+        except GitError:
+            raise GitError(f"unknown revision {ref!r}")
+        return ref
+
+
+def _selected(names, toplevel, root, extensions, skip_dirs):
+    files = set()
+    for name in names:
+        if not name.endswith(extensions):
+            continue
+        parts = name.split('/')
+        if skip_dirs.intersection(parts[:-1]):
+            continue
+        path = os.path.join(toplevel, *parts)
+        if path.startswith(root) and os.path.isfile(path):
+            files.add(path)
+    return sorted(files)
+
+
+def changed_files(root, since=None, staged=False, extensions=EXTENSIONS, skip_dirs=SKIP_DIRS):
+    """Files under root changed since the ref since, or staged in the index"""
+    root = os.path.realpath(root)
+    toplevel = git_toplevel(root)
+    pathspec = os.path.relpath(root, toplevel)
+    if staged:
+        diff = ['diff', '--cached', '--name-only', '-z', '--diff-filter=d']
+    else:
+        diff = ['diff', '--name-only', '-z', '--diff-filter=d', _merge_base(since, toplevel)]
+    names = _git([*diff, '--', pathspec], toplevel).split('\0')
+    if not staged:
+        names += _git(['ls-files', '--others', '--exclude-standard', '-z', '--', pathspec],
+                      toplevel).split('\0')
+    return _selected(names, toplevel, os.path.join(root, ''), extensions, skip_dirs)
+
+
+def discover(root, since=None, staged=False):
+    """The files of a run: changed since a ref, staged, or (by default) the full tree"""
+    if since is not None or staged:
+        return changed_files(root, since, staged)
+    return walk_files(root)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""Single-pass codemod engine.
+
+Each file is read once, every selected rule is applied in order in memory,
+and the file is written back at most once.
+"""
+import os
+import sys
+from collections import namedtuple
+
+from .cache import make_entry, content_hash, rules_fingerprint, stat_matches
+from .compiler import CompiledRules, compile_rules
+from .discovery import EXTENSIONS, SKIP_DIRS, walk_files
+from .journal import WriteBatch, stage, undo_record
+from .lines import LineIndex
+from .patch import EditTracker, unified_diff
+from .profile import FileProfile, RuleTimeout
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLIENT_SRC = os.path.join(REPO_ROOT, "client", "src")
+
+
+def ensure_compiled(rules):
+    return rules if isinstance(rules, CompiledRules) else compile_rules(rules)
+
+
+def apply_rules(content, rules, filepath=''):
+    return ensure_compiled(rules).apply(content, filepath)
+
+
+# entry is the manifest record for a clean run (None on error or without a cache);
+# profile is the file's FileProfile when profiling; staged is the temp file
+# holding the new content until the batch commits, undo its journal record;
+# preview is the Preview of a dry run
+FileResult = namedtuple('FileResult', 'fixed error entry skipped profile staged undo preview',
+                        defaults=(None, None, None, None))
+
+# diff is the text of the file's unified diff (None for --stats alone)
+Preview = namedtuple('Preview', 'diff hunks added removed')
+
+
+def _not_converged(convergence):
+    culprits = '; '.join(f"{rule.rule_set}: {rule.pattern} ({reason})"
+                         for rule, reason in convergence.culprits)
+    return f"no fixed point after {convergence.iterations} iterations: {culprits or 'unknown rule'}"
+
+
+def process_file(filepath, rules, fingerprint=None, cached=None, max_iterations=0, targets=None,
+                 profile=False, budget=None, batch=False, journal=False, preview=None, preview_root=None):
+    """Rewrite one file; returns a FileResult instead of printing
+
+    With max_iterations > 0 the rules are re-applied until the content stops
+    changing. A file that does not converge is left untouched and reported.
+    targets ({line: tsc error codes}) restricts each rule to the lines
+    reporting one of its codes. A rule that runs longer than budget seconds
+    on the file aborts it, leaving it untouched.
+
+    The new content is always written to a temp file first. With batch=True
+    it is left staged for the caller's WriteBatch to commit; otherwise it
+    replaces the file right away.
+
+    A preview ('diff' or 'stats') is a dry run: nothing is written and the
+    result carries the file's Preview, with paths relative to preview_root.
+    """
+    file_profile = FileProfile(filepath) if profile else None
+    try:
+        if cached is not None and stat_matches(filepath, cached):
+            return FileResult(False, None, cached, True)
+
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        if cached is not None and content_hash(content) == cached['hash']:
+            entry = make_entry(filepath, content, fingerprint)
+            return FileResult(False, None, entry, True)
+
+        changes = EditTracker() if preview else None
+        if max_iterations:
+            updated, convergence = ensure_compiled(rules).converge(
+                content, filepath, max_iterations, targets, file_profile, budget, changes)
+            if not convergence.converged:
+                return FileResult(False, _not_converged(convergence), None, False, file_profile)
+        else:
+            updated = ensure_compiled(rules).apply(
+                content, filepath, targets=targets, profile=file_profile, budget=budget, changes=changes)
+
+        if updated == content:
+            entry = make_entry(filepath, content, fingerprint) if fingerprint else None
+            return FileResult(False, None, entry, False, file_profile)
+        if preview:
+            name = os.path.relpath(os.path.abspath(filepath), preview_root or REPO_ROOT).replace(os.sep, '/')
+            return FileResult(True, None, None, False, file_profile,
+                              preview=_preview(content, changes.result(content, updated), name, preview))
+        undo = undo_record(filepath, content, updated) if journal else None
+        staged = stage(filepath, updated)
+        # One pass can create new matches, so its output is only recorded as
+        # clean when the rules converged on it; os.replace() keeps the staged
+        # file's stat, so the entry stays valid
+        entry = make_entry(staged, updated, fingerprint) if fingerprint and max_iterations else None
+        if not batch:
+            os.replace(staged, filepath)
+            staged = None
+        return FileResult(True, None, entry, False, file_profile, staged, undo)
+    except RuleTimeout as e:
+        if file_profile is not None:
+            file_profile.timeout = str(e)
+        return FileResult(False, str(e), None, False, file_profile)
+    except Exception as e:
+        return FileResult(False, str(e), None, False, file_profile)
+
+
+def _preview(content, edits, name, mode):
+    """Preview of a file's edits; the diff lines are only kept for mode 'diff'"""
+    diff = [] if mode == 'diff' else None
+    hunks = added = removed = 0
+    for line in unified_diff(content, edits, f'a/{name}', f'b/{name}', lines=LineIndex(content)):
+        if diff is not None:
+            diff.append(line)
+        first = line[0]
+        if first == '@':
+            hunks += 1
+        elif first == '+' and not line.startswith('+++ '):
+            added += 1
+        elif first == '-' and not line.startswith('--- '):
+            removed += 1
+    return Preview(None if diff is None else ''.join(diff), hunks, added, removed)
+
+
+def fix_file(filepath, rules):
+    result = process_file(filepath, rules)
+    if result.error is not None:
+        print(f"Error processing {filepath}: {result.error}")
+    return result.fixed
+
+
+def iter_files(root=CLIENT_SRC):
+    return walk_files(root)
+
+
+# Rules compiled once per pool worker by _init_worker, with the run options
+_worker_rules = None
+_worker_options = {}
+
+
+def _init_worker(rules, options):
+    global _worker_rules, _worker_options
+    _worker_rules = compile_rules(rules)
+    _worker_options = options
+
+
+def _process_in_worker(task):
+    filepath, fingerprint, cached, targets = task
+    return process_file(filepath, _worker_rules, fingerprint, cached, targets=targets, **_worker_options)
+
+
+def _process_parallel(rules, tasks, jobs, options):
+    from concurrent.futures import ProcessPoolExecutor
+
+    tasks = list(tasks)
+    if not tasks:
+        return
+    # A few chunks per worker keeps the pool busy without per-file IPC overhead
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(rules.rules, options)) as pool:
+        # map() yields in submission order, so output is deterministic
+        results = pool.map(_process_in_worker, tasks, chunksize=chunksize)
+        yield from zip((task[0] for task in tasks), results)
+
+
+def _targeted(rules, root, files, diagnostics):
+    """Narrow a run to the files, rules and lines named in a DiagnosticIndex"""
+    codes = diagnostics.codes
+    rules = [rule for rule in rules if not codes.isdisjoint(rule.codes)]
+    root = os.path.join(os.path.abspath(root), '')
+    if files is None:
+        files = (path for path in sorted(diagnostics.files)
+                 if path.startswith(root) and path.endswith(EXTENSIONS))
+    else:
+        files = (path for path in files if os.path.abspath(path) in diagnostics.files)
+    return compile_rules(rules), [path for path in files if os.path.isfile(path)]
+
+
+def run(rules, root=CLIENT_SRC, files=None, jobs=1, manifest=None, max_iterations=0,
+        diagnostics=None, profile=None, budget=None, journal_dir=None, index=None,
+        preview=None, preview_root=None):
+    """Apply rules to every file under root and print what changed
+
+    profile is a Profile that collects per-rule counters for the run; budget
+    is the per-rule time limit in seconds for each file. Changed files are
+    committed together at the end of the run, after an undo journal is
+    written to journal_dir (if given). index is a SymbolIndex used to skip
+    the files none of the rules can match without opening them.
+
+    preview makes it a dry run: 'diff' streams each file's unified diff to
+    stdout as soon as it is computed, 'stats' only totals them. Nothing is
+    written; with diffs, messages go to stderr so stdout can be piped to
+    `git apply`.
+    """
+    rules = ensure_compiled(rules)
+    if diagnostics is not None:
+        # A targeted run only fixes the reported lines, so it must not mark
+        # whole files as clean in the cache
+        rules, files = _targeted(rules.rules, root, files, diagnostics)
+        manifest = None
+    if files is None and index is not None:
+        files = index.candidates(rules, root)
+    files = files if files is not None else iter_files(root)
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+
+    fingerprint = None
+    if manifest is not None:
+        fingerprint = rules_fingerprint(rules.rules, mode=f'converge={max_iterations}')
+    tasks = (
+        (filepath, fingerprint,
+         manifest.get(filepath, fingerprint) if manifest is not None else None,
+         diagnostics.targets(os.path.abspath(filepath)) if diagnostics is not None else None)
+        for filepath in files
+    )
+    options = {'max_iterations': max_iterations, 'profile': profile is not None, 'budget': budget,
+               'batch': True, 'journal': journal_dir is not None and not preview,
+               'preview': preview, 'preview_root': preview_root}
+    if jobs == 1:
+        results = ((task[0], process_file(task[0], rules, task[1], task[2], targets=task[3], **options))
+                   for task in tasks)
+    else:
+        results = _process_parallel(rules, tasks, jobs, options)
+    if preview:
+        return _report_preview(results, profile, show_diffs=preview == 'diff')
+
+    batch = WriteBatch(journal_dir, description=f'{len(rules.rules)} rules under {root}')
+    fixed_count = 0
+    try:
+        for filepath, result in results:
+            if result.error is not None:
+                print(f"Error processing {filepath}: {result.error}")
+            if result.fixed:
+                print(f"Fixed: {filepath}")
+                fixed_count += 1
+                batch.add(filepath, result.staged, result.undo)
+            if manifest is not None and result.entry is not None:
+                manifest.record(filepath, result.entry)
+            if profile is not None:
+                profile.add(result.profile)
+    except BaseException:
+        # Interrupted: nothing has been renamed yet, so the tree is untouched
+        batch.discard()
+        raise
+    journal = batch.commit()
+    if manifest is not None:
+        manifest.save()
+    print(f"\nTotal files fixed: {fixed_count}")
+    if journal is not None:
+        print(f"Undo journal: {journal}")
+    return fixed_count
+
+
+def _report_preview(results, profile, show_diffs):
+    """Stream the diffs of a dry run; the manifest and tree are left alone"""
+    # Keep stdout a clean patch when it carries the diffs
+    messages = sys.stderr if show_diffs else sys.stdout
+    read = changed = hunks = added = removed = 0
+    for filepath, result in results:
+        if result.error is not None:
+            print(f"Error processing {filepath}: {result.error}", file=messages)
+        if not result.skipped:
+            read += 1
+        if result.fixed:
+            changed += 1
+            hunks += result.preview.hunks
+            added += result.preview.added
+            removed += result.preview.removed
+            if show_diffs:
+                sys.stdout.write(result.preview.diff)
+                sys.stdout.flush()
+        if profile is not None:
+            profile.add(result.profile)
+    print(f"\nDry run: {changed} files would change ({read} read), {hunks} hunks, "
+          f"+{added} -{removed} lines", file=messages)
+    return changed
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""Persistent symbol and call-site index of the client and server sources.
+
+The index is a SQLite database (.codemod/index.sqlite) holding, per file:
+
+- its stat and content hash, so updates only re-read files whose size or
+  mtime changed and only re-index files whose content changed;
+- the words it contains (maximal runs of \\w), as postings per word;
+- its symbols: tRPC call sites (`trpc.billing.getCustomers.useQuery`), hook
+  calls, `as any` casts, imports and exports, each with its line.
+
+Symbol queries are single indexed lookups. Literal searches (`form.control`)
+first narrow the files with the word postings and only read the few files
+that can contain the text. The engine uses the same narrowing to pick the
+files a run has to read: a file none of whose passes' anchors can occur in is
+never opened.
+
+    python -m codemod.index calls billing.getCustomers
+    python -m codemod.index hooks useMutation
+    python -m codemod.index search form.control
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+
+from .cache import REPO_ROOT, content_hash
+from .discovery import walk_files
+from .lexer import code_only
+from .lines import LineIndex
+from .routes import CALL_SITE
+
+DEFAULT_INDEX = os.path.join(REPO_ROOT, '.codemod', 'index.sqlite')
+DEFAULT_ROOTS = (os.path.join(REPO_ROOT, 'client', 'src'), os.path.join(REPO_ROOT, 'server'))
+INDEX_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE words (
+    id INTEGER PRIMARY KEY,
+    word TEXT NOT NULL UNIQUE,
+    reversed TEXT NOT NULL
+);
+CREATE INDEX words_reversed ON words (reversed);
+CREATE TABLE postings (
+    word_id INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (word_id, file_id)
+) WITHOUT ROWID;
+CREATE INDEX postings_file ON postings (file_id);
+CREATE TABLE symbols (
+    file_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    detail TEXT NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE INDEX symbols_name ON symbols (kind, name);
+CREATE INDEX symbols_file ON symbols (file_id);
+"""
+
+WORD = re.compile(r'\w+')
+# Past the last code point, so word < prefix + LAST_CHAR bounds a prefix range
+LAST_CHAR = '\U0010ffff'
+
+# Patterns start with a literal so the regex engine can jump between
+# candidates; the word boundary is checked by a lookbehind after it
+HOOK_CALL = re.compile(r'(use(?<![\w$]use)[A-Z][\w$]*)\s*[(<]')
+AS_ANY = re.compile(r'as(?<!\was)\s+any\b')
+IMPORT = re.compile(
+    r'^[ \t]*(?:import|export)\s+(?:type\s+)?(?:([\w$*{},\s]+?)\s+from\s*)?["\']([^"\']+)["\']',
+    re.MULTILINE,
+)
+EXPORT = re.compile(
+    r'export(?<!\wexport)\s+(default\s+)?(?:declare\s+)?(?:async\s+)?'
+    r'(function\*?|const|let|var|class|interface|type|enum|abstract\s+class)\s+([\w$]+)'
+)
+EXPORT_DEFAULT_NAME = re.compile(r'export(?<!\wexport)\s+default\s+([\w$]+)\s*;?\s*$', re.MULTILINE)
+NOT_DECLARATION = {'function', 'class', 'async', 'abstract', 'interface', 'enum'}
+SPACES = re.compile(r'\s+')
+
+SYMBOL_KINDS = ('call', 'hook', 'cast', 'import', 'export')
+
+
+def extract_symbols(filepath, content):
+    """[(kind, name, detail, line)] for one file; only code is considered"""
+    code = code_only(content, jsx=filepath.endswith('.tsx'))
+    lines = LineIndex(content)
+    symbols = []
+    for match in CALL_SITE.finditer(code):
+        symbols.append(('call', match.group(2), f'{match.group(1)} {match.group(3)}',
+                        lines.line_of(match.start())))
+    for match in HOOK_CALL.finditer(code):
+        symbols.append(('hook', match.group(1), '', lines.line_of(match.start())))
+    for match in AS_ANY.finditer(code):
+        symbols.append(('cast', 'any', '', lines.line_of(match.start())))
+    for match in IMPORT.finditer(content):
+        # The specifier is a string, so match the source and check the keyword is code
+        keyword = match.start() + len(match.group(0)) - len(match.group(0).lstrip())
+        if code[keyword] == ' ':
+            continue
+        names = SPACES.sub(' ', match.group(1) or '').strip()
+        symbols.append(('import', match.group(2), names, lines.line_of(keyword)))
+    for match in EXPORT.finditer(code):
+        kind = SPACES.sub(' ', match.group(2))
+        detail = f'default {kind}' if match.group(1) else kind
+        symbols.append(('export', match.group(3), detail, lines.line_of(match.start())))
+    for match in EXPORT_DEFAULT_NAME.finditer(code):
+        if match.group(1) not in NOT_DECLARATION:
+            symbols.append(('export', match.group(1), 'default', lines.line_of(match.start())))
+    return symbols
+
+
+def _fragments(literal):
+    """Words of literal with whether they may continue past its left and right edges"""
+    for match in WORD.finditer(literal):
+        yield match.group(), match.start() == 0, match.end() == len(literal)
+
+
+class SymbolIndex:
+    def __init__(self, path=DEFAULT_INDEX):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION:
+            self._reset()
+        self._word_ids = None
+
+    def _reset(self):
+        with self.db:
+            for (name,) in self.db.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+                self.db.execute(f'DROP TABLE {name}')
+            self.db.executescript(SCHEMA)
+            self.db.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+
+    def close(self):
+        self.db.close()
+
+    # Updating
+
+    def update(self, roots=DEFAULT_ROOTS):
+        """Bring the files under roots up to date; returns their paths in walk order
+
+        Sets self.reindexed and self.removed to the counts of the last update.
+        """
+        db = self.db
+        known = {path: (file_id, size, mtime_ns, digest) for file_id, path, size, mtime_ns, digest
+                 in db.execute('SELECT id, path, size, mtime_ns, hash FROM files')}
+        paths = []
+        self.reindexed = self.removed = 0
+        with db:
+            for root in roots:
+                root = os.path.abspath(root)
+                prefix = os.path.join(root, '')
+                seen = set()
+                for filepath in walk_files(root):
+                    seen.add(filepath)
+                    try:
+                        st = os.stat(filepath)
+                    except OSError:
+                        continue
+                    paths.append(filepath)
+                    row = known.get(filepath)
+                    if row is not None and row[1] == st.st_size and row[2] == st.st_mtime_ns:
+                        continue
+                    try:
+                        with open(filepath, 'r', encoding='utf-8') as f:
+                            content = f.read()
+                    except (OSError, UnicodeDecodeError):
+                        continue
+                    digest = content_hash(content)
+                    if row is not None and row[3] == digest:
+                        db.execute('UPDATE files SET size = ?, mtime_ns = ? WHERE id = ?',
+                                   (st.st_size, st.st_mtime_ns, row[0]))
+                        continue
+                    self._index_file(row[0] if row is not None else None, filepath, content, digest, st)
+                    self.reindexed += 1
+                for filepath, row in known.items():
+                    if filepath.startswith(prefix) and filepath not in seen:
+                        self._forget(row[0])
+                        self.removed += 1
+        return paths
+
+    def _word_id(self, word):
+        if self._word_ids is None:
+            self._word_ids = dict(self.db.execute('SELECT word, id FROM words'))
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self.db.execute('INSERT INTO words (word, reversed) VALUES (?, ?)',
+                                      (word, word[::-1])).lastrowid
+            self._word_ids[word] = word_id
+        return word_id
+
+    def _forget(self, file_id, keep_file=False):
+        self.db.execute('DELETE FROM postings WHERE file_id = ?', (file_id,))
+        self.db.execute('DELETE FROM symbols WHERE file_id = ?', (file_id,))
+        if not keep_file:
+            self.db.execute('DELETE FROM files WHERE id = ?', (file_id,))
+
+    def _index_file(self, file_id, filepath, content, digest, st):
+        db = self.db
+        if file_id is None:
+            file_id = db.execute('INSERT INTO files (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)',
+                                 (filepath, st.st_size, st.st_mtime_ns, digest)).lastrowid
+        else:
+            self._forget(file_id, keep_file=True)
+            db.execute('UPDATE files SET size = ?, mtime_ns = ?, hash = ? WHERE id = ?',
+                       (st.st_size, st.st_mtime_ns, digest, file_id))
+        words = set(WORD.findall(content))
+        db.executemany('INSERT INTO postings (word_id, file_id) VALUES (?, ?)',
+                       [(self._word_id(word), file_id) for word in words])
+        db.executemany('INSERT INTO symbols (file_id, kind, name, detail, line) VALUES (?, ?, ?, ?, ?)',
+                       [(file_id, *symbol) for symbol in extract_symbols(filepath, content)])
+
+    # Queries
+
+    def symbols(self, kind, name='*', under=None):
+        """[(path, line, name, detail)] of symbols whose name matches the glob name"""
+        query = ('SELECT f.path, s.line, s.name, s.detail FROM symbols s JOIN files f ON f.id = s.file_id '
+                 'WHERE s.kind = ? AND s.name GLOB ?')
+        params = [kind, name]
+        if under is not None:
+            query += ' AND f.path GLOB ?'
+            params.append(os.path.join(os.path.abspath(under), '*'))
+        return self.db.execute(query + ' ORDER BY f.path, s.line', params).fetchall()
+
+    def _files_with_word(self, word, left_open, right_open, cache):
+        key = (word, left_open, right_open)
+        if key in cache:
+            return cache[key]
+        select = 'SELECT DISTINCT p.file_id FROM postings p JOIN words w ON w.id = p.word_id WHERE '
+        if left_open and right_open:
+            rows = self.db.execute(select + 'instr(w.word, ?) > 0', (word,))
+        elif right_open:
+            rows = self.db.execute(select + 'w.word >= ? AND w.word < ?', (word, word + LAST_CHAR))
+        elif left_open:
+            reversed_word = word[::-1]
+            rows = self.db.execute(select + 'w.reversed >= ? AND w.reversed < ?',
+                                   (reversed_word, reversed_word + LAST_CHAR))
+        else:
+            rows = self.db.execute(select + 'w.word = ?', (word,))
+        files = cache[key] = {file_id for (file_id,) in rows}
+        return files
+
+    def files_containing(self, literal, cache=None):
+        """Ids of the files that may contain literal, or None if its words cannot narrow them"""
+        cache = {} if cache is None else cache
+        files = None
+        for word, left_open, right_open in _fragments(literal):
+            found = self._files_with_word(word, left_open, right_open, cache)
+            files = found if files is None else files & found
+            if not files:
+                break
+        return files
+
+    def _paths(self, file_ids):
+        rows = self.db.execute('SELECT id, path FROM files')
+        return {path for file_id, path in rows if file_id in file_ids}
+
+    def search(self, literal, under=None):
+        """[(path, line, text)] of the lines containing literal"""
+        file_ids = self.files_containing(literal)
+        if file_ids is None:
+            paths = [path for (path,) in self.db.execute('SELECT path FROM files')]
+        else:
+            paths = self._paths(file_ids)
+        if under is not None:
+            prefix = os.path.join(os.path.abspath(under), '')
+            paths = [path for path in paths if path.startswith(prefix)]
+        results = []
+        for filepath in sorted(paths):
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except OSError:
+                continue
+            lines = None
+            start = content.find(literal)
+            while start >= 0:
+                lines = lines or LineIndex(content)
+                line = lines.line_of(start)
+                text = content[lines.line_start(line):lines.line_end(line)].rstrip('\n')
+                results.append((filepath, line, text.strip()))
+                start = content.find(literal, lines.line_end(line))
+        return results
+
+    def candidates(self, rules, root):
+        """Files under root the compiled rules can change, in walk order
+
+        A file is a candidate when the anchor of at least one pass may occur
+        in it (or a pass has no anchor). A file containing none of the
+        anchors cannot match the first pass that fires, so no pass fires.
+        """
+        paths = self.update([root])
+        cache = {}
+        file_ids = set()
+        for rule_pass in rules.passes:
+            if rule_pass.anchors is None:
+                return paths
+            for anchor in rule_pass.anchors:
+                found = self.files_containing(anchor, cache)
+                if found is None:
+                    return paths
+                file_ids |= found
+        selected = self._paths(file_ids)
+        return [path for path in paths if path in selected]
+
+
+def open_index(path=DEFAULT_INDEX, roots=DEFAULT_ROOTS, update=True):
+    index = SymbolIndex(path)
+    if update:
+        index.update(roots)
+    return index
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m codemod.index',
+                                     description='Query the symbol and call-site index.')
+    parser.add_argument('--db', default=DEFAULT_INDEX, help='index database (default: .codemod/index.sqlite)')
+    parser.add_argument('--no-update', action='store_true',
+                        help='query the index as it is, without checking for changed files')
+    parser.add_argument('--under', metavar='DIR', help='only report files under DIR')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('update', help='bring the index up to date and print what changed')
+    for kind, help_text in (('calls', 'tRPC call sites of a procedure path (trpc. prefix optional)'),
+                            ('hooks', 'calls of a React hook'),
+                            ('imports', 'imports of a module'),
+                            ('exports', 'exported names')):
+        command = commands.add_parser(kind, help=help_text)
+        command.add_argument('name', nargs='?', default='*', help='name or glob (default: all)')
+    commands.add_parser('casts', help='`as any` casts')
+    search = commands.add_parser('search', help='lines containing a literal text')
+    search.add_argument('text')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    index = SymbolIndex(args.db)
+    if not args.no_update:
+        paths = index.update()
+        if args.command == 'update':
+            print(f"{len(paths)} files, {index.reindexed} re-indexed, {index.removed} removed "
+                  f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+            return 0
+    if args.command == 'search':
+        results = index.search(args.text, args.under)
+    else:
+        kind = {'calls': 'call', 'hooks': 'hook', 'casts': 'cast',
+                'imports': 'import', 'exports': 'export'}[args.command]
+        name = getattr(args, 'name', '*')
+        if kind == 'call':
+            name = re.sub(r'^(?:trpc|utils)\.', '', name)
+        results = [(path, line, f'{found} {detail}'.strip())
+                   for path, line, found, detail in index.symbols(kind, name, args.under)]
+    for path, line, text in results:
+        print(f"{os.path.relpath(path, REPO_ROOT)}:{line}: {text}")
+    files = len({path for path, _, _ in results})
+    print(f"{len(results)} results in {files} files ({(time.perf_counter() - start) * 1000:.1f} ms)",
+          file=sys.stderr)
+    index.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Atomic, batched write-back with an undo journal.
+
+Rewritten files are first staged to a temp file next to the original. Once
+every file of the run has been processed, the journal is written and all
+staged files are committed with os.replace() in one batch. An interrupted
+run (Ctrl-C, an exception) discards its staged files and leaves the tree as
+it was.
+
+The journal records, for every committed file, the content hash before and
+after the run and the changed regions as (offset, old text, new text) hunks.
+Rolling back re-applies the hunks in reverse and checks both hashes, so
+files edited by hand since the run are reported instead of clobbered.
+"""
+import difflib
+import json
+import os
+import tempfile
+import time
+
+from .cache import REPO_ROOT, content_hash
+
+DEFAULT_JOURNAL_DIR = os.path.join(REPO_ROOT, '.codemod', 'journal')
+JOURNAL_VERSION = 1
+STAGED_SUFFIX = '.codemod-tmp'
+
+
+def stage(filepath, content):
+    """Write content to a temp file beside filepath and return its path"""
+    directory, name = os.path.split(filepath)
+    fd, staged = tempfile.mkstemp(dir=directory or '.', prefix=f'.{name}.', suffix=STAGED_SUFFIX)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.chmod(staged, os.stat(filepath).st_mode & 0o7777)
+    except BaseException:
+        os.unlink(staged)
+        raise
+    return staged
+
+
+def write_atomic(filepath, content):
+    os.replace(stage(filepath, content), filepath)
+
+
+def hunks(before, after):
+    """[(offset in after, old text, new text), ...] turning before into after"""
+    old_lines = before.splitlines(keepends=True)
+    new_lines = after.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    result = []
+    offset = 0
+    new_offsets = [0]
+    for line in new_lines:
+        offset += len(line)
+        new_offsets.append(offset)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            result.append((new_offsets[j1], ''.join(old_lines[i1:i2]), ''.join(new_lines[j1:j2])))
+    return result
+
+
+def undo_record(filepath, before, after):
+    return {
+        'path': filepath,
+        'before': content_hash(before),
+        'after': content_hash(after),
+        'hunks': hunks(before, after),
+    }
+
+
+def revert(content, record):
+    """Content before the run, given the content it produced"""
+    for offset, old, new in reversed(record['hunks']):
+        content = content[:offset] + old + content[offset + len(new):]
+    return content
+
+
+class WriteBatch:
+    """Staged files of one run, committed together"""
+
+    def __init__(self, journal_dir=None, description=''):
+        self.journal_dir = journal_dir
+        self.description = description
+        self.staged = []
+        self.records = []
+
+    def add(self, filepath, staged, record=None):
+        self.staged.append((filepath, staged))
+        if record is not None:
+            self.records.append(record)
+
+    def discard(self):
+        for _, staged in self.staged:
+            try:
+                os.unlink(staged)
+            except OSError:
+                pass
+        self.staged = []
+
+    def commit(self):
+        """Rename every staged file over its original; returns the journal path or None"""
+        if not self.staged:
+            return None
+        journal = None
+        if self.journal_dir is not None and self.records:
+            journal = self._write_journal('pending')
+        for filepath, staged in self.staged:
+            os.replace(staged, filepath)
+        self.staged = []
+        if journal is not None:
+            _set_status(journal, 'committed')
+        return journal
+
+    def _write_journal(self, status):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        path = _new_journal(self.journal_dir)
+        _dump(path, {
+            'version': JOURNAL_VERSION,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'description': self.description,
+            'status': status,
+            'files': self.records,
+        })
+        return path
+
+
+def _new_journal(journal_dir):
+    """Create an empty journal file whose name sorts after every earlier one
+
+    Watch mode commits a batch per save, often several in one second, so the
+    name carries nanoseconds; a name already taken is retried one nanosecond
+    later rather than overwritten.
+    """
+    now = time.time_ns()
+    while True:
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now // 10 ** 9))
+        path = os.path.join(journal_dir, f'{stamp}.{now % 10 ** 9:09d}-{os.getpid()}.json')
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+        except FileExistsError:
+            now += 1
+            continue
+        return path
+
+
+def _dump(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_journal(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != JOURNAL_VERSION:
+        raise ValueError(f"Unsupported journal version in {path}")
+    return data
+
+
+def _set_status(path, status):
+    data = load_journal(path)
+    data['status'] = status
+    _dump(path, data)
+
+
+def list_journals(journal_dir=DEFAULT_JOURNAL_DIR):
+    """Journal paths, oldest first"""
+    try:
+        names = sorted(name for name in os.listdir(journal_dir) if name.endswith('.json'))
+    except OSError:
+        return []
+    return [os.path.join(journal_dir, name) for name in names]
+
+
+def latest_journal(journal_dir=DEFAULT_JOURNAL_DIR):
+    """The most recent journal that has not been rolled back"""
+    for path in reversed(list_journals(journal_dir)):
+        if load_journal(path)['status'] != 'rolled back':
+            return path
+    return None
+
+
+def rollback(path):
+    """Restore the files a journal recorded; returns (restored, skipped messages)"""
+    data = load_journal(path)
+    batch = WriteBatch()
+    skipped = []
+    try:
+        for record in data['files']:
+            filepath = record['path']
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except OSError as e:
+                skipped.append(f"{filepath}: {e}")
+                continue
+            current = content_hash(content)
+            if current == record['before']:
+                # Never committed (the run was interrupted mid-batch)
+                continue
+            if current != record['after']:
+                skipped.append(f"{filepath}: modified since the run, left as it is")
+                continue
+            original = revert(content, record)
+            if content_hash(original) != record['before']:
+                skipped.append(f"{filepath}: journal does not reproduce the original, left as it is")
+                continue
+            batch.add(filepath, stage(filepath, original))
+        restored = len(batch.staged)
+        batch.commit()
+    except BaseException:
+        batch.discard()
+        raise
+    _set_status(path, 'rolled back')
+    return restored, skipped
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""Linear-time TS/TSX lexer that splits a file into code and non-code spans.
+
+The lexer does not build tokens; it only tracks enough context (template
+literals, JSX tags and children, braces) to tell code apart from string,
+template, comment and JSX text spans. Each state jumps to its next
+interesting character with a compiled regex, so a file is lexed in a single
+left-to-right pass.
+"""
+import re
+from bisect import bisect_right
+
+CODE = 'code'
+STRING = 'string'
+TEMPLATE = 'template'
+COMMENT = 'comment'
+JSX_TEXT = 'jsx_text'
+
+CODE_INTEREST = re.compile(r'[\'"`/<{}]')
+TAG_INTEREST = re.compile(r'[\'"{>/]')
+CHILD_INTEREST = re.compile(r'[<{]')
+TEMPLATE_INTEREST = re.compile(r'\\.|`|\$\{', re.DOTALL)
+STRING_END = {
+    "'": re.compile(r"(?:[^'\\\n]|\\.)*'?", re.DOTALL),
+    '"': re.compile(r'(?:[^"\\\n]|\\.)*"?', re.DOTALL),
+}
+BLOCK_COMMENT_END = re.compile(r'\*/')
+REGEX_BODY = re.compile(r'(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])*/[a-z]*')
+PREVIOUS_WORD = re.compile(r'[A-Za-z_$][\w$]*$')
+# A tag name ends at whitespace, '>' or '/'; `<T,>` and `<T extends U>` are
+# the type parameters of a generic arrow function, which .tsx spells that way
+TAG_NAME = re.compile(r'[A-Za-z_$][\w$.:-]*(?=[\s>/])')
+TYPE_PARAMETERS = re.compile(r'[A-Za-z_$][\w$]*\s*(?:,|extends\s)')
+
+# After these characters a '/' starts a regex and a '<' can start JSX
+EXPRESSION_START = set('(,=:[!&|?{};+-*%~^')
+KEYWORDS_BEFORE_EXPRESSION = {
+    'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete',
+    'void', 'throw', 'instanceof', 'yield', 'await',
+}
+
+
+def _previous_significant(content, i):
+    """Index of the last non-whitespace character before i, or -1"""
+    i -= 1
+    while i >= 0 and content[i] in ' \t\r\n':
+        i -= 1
+    return i
+
+
+def _expression_expected(content, i):
+    prev = _previous_significant(content, i)
+    if prev < 0:
+        return True
+    char = content[prev]
+    if char in EXPRESSION_START:
+        return True
+    if char == '>':
+        # Only an arrow; any other '>' ends a comparison or a type
+        return prev > 0 and content[prev - 1] == '='
+    match = PREVIOUS_WORD.search(content, max(0, prev - 15), prev + 1)
+    return match is not None and match.group(0) in KEYWORDS_BEFORE_EXPRESSION
+
+
+def _jsx_starts(content, i):
+    if content[i + 1:i + 2] != '>':
+        if TAG_NAME.match(content, i + 1) is None or TYPE_PARAMETERS.match(content, i + 1):
+            return False
+    return _expression_expected(content, i)
+
+
+def scan_spans(content, jsx=True):
+    """Return [(kind, start, end), ...] covering content, adjacent kinds merged"""
+    spans = []
+
+    def emit(kind, start, end):
+        if end <= start:
+            return
+        if spans and spans[-1][0] == kind and spans[-1][2] == start:
+            spans[-1] = (kind, spans[-1][1], end)
+        else:
+            spans.append((kind, start, end))
+
+    # Each frame is [state, brace depth]; code frames pop on an unmatched '}'
+    stack = [['code', 0]]
+    n = len(content)
+    i = 0
+    while i < n:
+        frame = stack[-1]
+        state = frame[0]
+
+        if state == 'code':
+            match = CODE_INTEREST.search(content, i)
+            if match is None:
+                emit(CODE, i, n)
+                break
+            j = match.start()
+            emit(CODE, i, j)
+            char = content[j]
+            if char in '\'"':
+                end = STRING_END[char].match(content, j + 1).end()
+                emit(STRING, j, end)
+                i = end
+            elif char == '`':
+                emit(TEMPLATE, j, j + 1)
+                stack.append(['template', 0])
+                i = j + 1
+            elif char == '/':
+                nxt = content[j + 1:j + 2]
+                if nxt == '/':
+                    end = content.find('\n', j)
+                    end = n if end < 0 else end
+                    emit(COMMENT, j, end)
+                    i = end
+                elif nxt == '*':
+                    found = BLOCK_COMMENT_END.search(content, j + 2)
+                    end = n if found is None else found.end()
+                    emit(COMMENT, j, end)
+                    i = end
+                elif _expression_expected(content, j):
+                    found = REGEX_BODY.match(content, j + 1)
+                    end = j + 1 if found is None else found.end()
+                    emit(STRING if found else CODE, j, end)
+                    i = end
+                else:
+                    emit(CODE, j, j + 1)
+                    i = j + 1
+            elif char == '<':
+                emit(CODE, j, j + 1)
+                if jsx and _jsx_starts(content, j):
+                    stack.append(['tag', 0])
+                i = j + 1
+            elif char == '{':
+                emit(CODE, j, j + 1)
+                frame[1] += 1
+                i = j + 1
+            else:  # '}'
+                if frame[1] > 0 or len(stack) == 1:
+                    frame[1] = max(0, frame[1] - 1)
+                    emit(CODE, j, j + 1)
+                else:
+                    stack.pop()
+                    emit(TEMPLATE if stack[-1][0] == 'template' else CODE, j, j + 1)
+                i = j + 1
+
+        elif state == 'template':
+            match = TEMPLATE_INTEREST.search(content, i)
+            while match is not None and match.group(0)[0] == '\\':
+                match = TEMPLATE_INTEREST.search(content, match.end())
+            if match is None:
+                emit(TEMPLATE, i, n)
+                break
+            emit(TEMPLATE, i, match.end())
+            if match.group(0) == '`':
+                stack.pop()
+            else:
+                stack.append(['code', 0])
+            i = match.end()
+
+        elif state in ('tag', 'closing'):
+            # Tag names and attribute names are code
+            match = TAG_INTEREST.search(content, i)
+            if match is None:
+                emit(CODE, i, n)
+                break
+            j = match.start()
+            emit(CODE, i, j)
+            char = content[j]
+            if char in '\'"':
+                end = content.find(char, j + 1)
+                end = n if end < 0 else end + 1
+                emit(STRING, j, end)
+                i = end
+            elif char == '{':
+                emit(CODE, j, j + 1)
+                stack.append(['code', 0])
+                i = j + 1
+            elif char == '/':
+                if content[j + 1:j + 2] == '>':
+                    # Self-closing element
+                    emit(CODE, j, j + 2)
+                    stack.pop()
+                    i = j + 2
+                else:
+                    emit(CODE, j, j + 1)
+                    i = j + 1
+            else:  # '>'
+                emit(CODE, j, j + 1)
+                stack.pop()
+                if state == 'closing':
+                    if stack[-1][0] == 'children':
+                        stack.pop()
+                else:
+                    stack.append(['children', 0])
+                i = j + 1
+
+        else:  # children
+            match = CHILD_INTEREST.search(content, i)
+            if match is None:
+                emit(JSX_TEXT, i, n)
+                break
+            j = match.start()
+            emit(JSX_TEXT, i, j)
+            emit(CODE, j, j + 1)
+            if content[j] == '{':
+                stack.append(['code', 0])
+            elif content[j + 1:j + 2] == '/':
+                emit(CODE, j + 1, j + 2)
+                stack.append(['closing', 0])
+                j += 1
+            else:
+                stack.append(['tag', 0])
+            i = j + 1
+
+    return spans
+
+
+NOT_NEWLINE = re.compile(r'[^\n]')
+
+
+def code_only(content, jsx=True):
+    """content with every non-code span blanked out; offsets and line numbers are preserved"""
+    pieces = []
+    for kind, start, end in scan_spans(content, jsx=jsx):
+        text = content[start:end]
+        if kind == CODE:
+            pieces.append(text)
+        elif '\n' in text:
+            pieces.append(NOT_NEWLINE.sub(' ', text))
+        else:
+            pieces.append(' ' * len(text))
+    return ''.join(pieces)
+
+
+# Edit layers a CodeMap follows before a fresh lex is cheaper than the lookups
+MAX_EDIT_LAYERS = 64
+
+
+class EditLayer:
+    """Maps offsets in the output of one rewrite pass back to its input
+
+    edits are (start, end, replacement length) in input offsets, in order.
+    An offset inside a replacement maps to the start of the text it replaced.
+    """
+
+    def __init__(self, edits):
+        self.new_starts = []
+        self.new_ends = []
+        self.old_starts = []
+        self.old_ends = []
+        delta = 0
+        for start, end, size in edits:
+            self.new_starts.append(start + delta)
+            self.new_ends.append(start + delta + size)
+            self.old_starts.append(start)
+            self.old_ends.append(end)
+            delta += size - (end - start)
+
+    def original(self, offset):
+        index = bisect_right(self.new_starts, offset) - 1
+        if index < 0:
+            return offset
+        if offset < self.new_ends[index]:
+            return self.old_starts[index]
+        return self.old_ends[index] + offset - self.new_ends[index]
+
+
+class CodeMap:
+    """Answers "is offset i inside code?" with a binary search over the spans"""
+
+    def __init__(self, content, jsx=True):
+        self.spans = scan_spans(content, jsx=jsx)
+        self.starts = [start for _, start, _ in self.spans]
+        self.layers = []
+
+    def follow(self, edits):
+        """Keep answering for the content after edits; False once a re-lex is due"""
+        if len(self.layers) >= MAX_EDIT_LAYERS:
+            return False
+        self.layers.append(EditLayer(edits))
+        return True
+
+    def kind_at(self, offset):
+        for layer in reversed(self.layers):
+            offset = layer.original(offset)
+        index = bisect_right(self.starts, offset) - 1
+        if index < 0:
+            return CODE
+        return self.spans[index][0]
+
+    def is_code(self, offset):
+        return self.kind_at(offset) == CODE
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Offset <-> line number mapping for a file's content."""
+from bisect import bisect_right
+
+
+class LineIndex:
+    """Newline offsets computed once; each lookup is a binary search"""
+
+    def __init__(self, content):
+        starts = [0]
+        find = content.find
+        pos = find('\n')
+        while pos >= 0:
+            starts.append(pos + 1)
+            pos = find('\n', pos + 1)
+        self.starts = starts
+        self.length = len(content)
+
+    def line_of(self, offset):
+        """1-based line number containing offset"""
+        return bisect_right(self.starts, offset)
+
+    def line_start(self, line):
+        """Offset of the first character of a 1-based line"""
+        return self.starts[line - 1]
+
+    def line_end(self, line):
+        """Offset just past the end of a 1-based line, including its newline"""
+        return self.starts[line] if line < len(self.starts) else self.length
+
+    @property
+    def line_count(self):
+        return len(self.starts)
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""Find duplicate, redundant and interacting rules, and the minimal rule list.
+
+The fix scripts were written one after another, so the registry repeats rules
+verbatim (the same tRPC path fixes appear in half a dozen sets), shadows
+narrow rules with broad ones (`(\\w+)\\.accountNumber` after
+`customer\\.accountNumber`) and has rules that rewrite each other's output
+(`.accountNumber` -> `?.accountNumber` against `(\\w+).accountNumber` ->
+`(\\1 as any).accountNumber`).
+
+Every rule gets witnesses: the lines it matches in the tree, and examples
+generated from its pattern. The rule sequence is simulated on the witnesses,
+which is cheap because they are single lines:
+
+- a rule is redundant when removing it leaves the result of the sequence on
+  every witness it fires on unchanged (exact duplicates, rules subsumed by
+  an earlier or later one, rewrites that are overwritten anyway);
+- two rules compete when both match the same text with different rewrites,
+  so their order decides the result;
+- a rule feeds another when its output creates a match for it; a rule that
+  feeds one running before it needs --converge, and two rules feeding each
+  other oscillate.
+
+The reduced list is then checked against the tree with the real engine, and
+any removal that changes a file is put back.
+
+    python -m codemod.overlap
+    python -m codemod.overlap --write .codemod/minimal.toml
+"""
+import argparse
+import os
+import re
+import sys
+from collections import namedtuple
+from itertools import islice
+
+try:
+    from re import _constants as sre, _parser
+except ImportError:  # Python < 3.11
+    import sre_constants as sre
+    import sre_parse as _parser
+
+from .compiler import compile_rules, rule_anchor
+from .discovery import walk_files
+from .engine import CLIENT_SRC
+from .rulefiles import DEFAULT_RULE_DIR, RuleFileError, register_rule_files, rule_file_paths
+from .rules import select
+
+# Lines of the tree kept per rule as witnesses
+WITNESSES_PER_RULE = 8
+EXAMPLE_VARIANTS = 4
+EXAMPLE_PATH = os.path.join(CLIENT_SRC, 'pages', 'Example.tsx')
+# Characters picked for classes and wildcards, one per variant
+WORD_CHARS = 'axvd'
+OTHER_CHARS = ' ;:#'
+
+Witness = namedtuple('Witness', 'text filepath content')
+# kind is 'duplicate', 'subsumed', 'overwritten', 'competes', 'feeds', 'late feed'
+# or 'oscillates'; rule and other are indexes into the analysed rule list
+Finding = namedtuple('Finding', 'kind rule other')
+
+
+def _class_char(items, variant):
+    """A character matched by a character class (IN), or None"""
+    negate = any(op is sre.NEGATE for op, _ in items)
+    candidates = []
+    for op, value in items:
+        if op is sre.LITERAL:
+            candidates.append(chr(value))
+        elif op is sre.RANGE:
+            candidates.append(chr(value[0]))
+        elif op is sre.CATEGORY:
+            candidates.append(_category_char(value, variant))
+    if not negate:
+        return candidates[variant % len(candidates)] if candidates else None
+    pattern = re.compile(_class_pattern(items))
+    for char in WORD_CHARS[variant:] + WORD_CHARS + OTHER_CHARS + '0_-':
+        if pattern.fullmatch(char):
+            return char
+    return None
+
+
+def _class_pattern(items):
+    # Rebuild the class as a pattern, only to test characters against it
+    parts = []
+    for op, value in items:
+        if op is sre.NEGATE:
+            parts.insert(0, '^')
+        elif op is sre.LITERAL:
+            parts.append(re.escape(chr(value)))
+        elif op is sre.RANGE:
+            parts.append(f'{re.escape(chr(value[0]))}-{re.escape(chr(value[1]))}')
+        elif op is sre.CATEGORY:
+            parts.append(CATEGORY_CLASSES.get(value, ''))
+    return '[' + ''.join(parts) + ']'
+
+
+CATEGORY_CLASSES = {
+    sre.CATEGORY_DIGIT: r'\d', sre.CATEGORY_NOT_DIGIT: r'\D',
+    sre.CATEGORY_SPACE: r'\s', sre.CATEGORY_NOT_SPACE: r'\S',
+    sre.CATEGORY_WORD: r'\w', sre.CATEGORY_NOT_WORD: r'\W',
+}
+
+
+def _category_char(category, variant):
+    if category is sre.CATEGORY_DIGIT:
+        return '1'
+    if category is sre.CATEGORY_SPACE:
+        return ' '
+    if category in (sre.CATEGORY_WORD, sre.CATEGORY_NOT_DIGIT, sre.CATEGORY_NOT_SPACE):
+        return WORD_CHARS[variant % len(WORD_CHARS)]
+    return OTHER_CHARS[variant % len(OTHER_CHARS)]
+
+
+def _generate(parsed, variant, groups):
+    """One string the parsed pattern matches (lookarounds are ignored), or None"""
+    out = []
+    for op, value in parsed:
+        if op is sre.LITERAL:
+            out.append(chr(value))
+        elif op is sre.NOT_LITERAL:
+            out.append('a' if value != ord('a') else 'b')
+        elif op is sre.ANY:
+            out.append(WORD_CHARS[variant % len(WORD_CHARS)])
+        elif op is sre.IN:
+            char = _class_char(value, variant)
+            if char is None:
+                return None
+            out.append(char)
+        elif op is sre.CATEGORY:
+            out.append(_category_char(value, variant))
+        elif op in (sre.MAX_REPEAT, sre.MIN_REPEAT, sre.POSSESSIVE_REPEAT):
+            low, high, item = value
+            count = max(low, 1)
+            if variant % 2 and (high is sre.MAXREPEAT or high > count):
+                count += 1
+            for _ in range(count):
+                text = _generate(item, variant, groups)
+                if text is None:
+                    return None
+                out.append(text)
+        elif op is sre.SUBPATTERN:
+            group, _, _, item = value
+            text = _generate(item, variant, groups)
+            if text is None:
+                return None
+            if group is not None:
+                groups[group] = text
+            out.append(text)
+        elif op is sre.ATOMIC_GROUP:
+            text = _generate(value, variant, groups)
+            if text is None:
+                return None
+            out.append(text)
+        elif op is sre.BRANCH:
+            branches = value[1]
+            text = _generate(branches[variant % len(branches)], variant, groups)
+            if text is None:
+                return None
+            out.append(text)
+        elif op is sre.GROUPREF:
+            out.append(groups.get(value, ''))
+        elif op in (sre.AT, sre.ASSERT, sre.ASSERT_NOT):
+            continue
+        else:
+            return None
+    return ''.join(out)
+
+
+def examples(rule, variants=EXAMPLE_VARIANTS):
+    """Distinct strings containing a match of the rule, generated from its pattern"""
+    if rule.literal:
+        return [rule.pattern]
+    regex = re.compile(rule.pattern)
+    try:
+        parsed = _parser.parse(rule.pattern)
+    except re.error:
+        return []
+    found = []
+    for variant in range(variants):
+        text = _generate(parsed, variant, {})
+        if text is None:
+            continue
+        # Surrounding text satisfies most lookarounds and word boundaries
+        for candidate in (text, f' {text} ', f'({text})', f'{text};'):
+            if regex.search(candidate) and candidate not in found:
+                found.append(candidate)
+                break
+    return found
+
+
+def _example_path(rule):
+    if not rule.files:
+        return EXAMPLE_PATH
+    return os.path.join(CLIENT_SRC, 'pages', rule.files[0].replace('*', 'Example'))
+
+
+def collect_witnesses(rules, files=(), per_rule=WITNESSES_PER_RULE):
+    """[witness indexes] per rule, and the witnesses"""
+    witnesses = []
+    by_rule = [[] for _ in rules]
+    # Most patterns appear in several sets: search each one once per file
+    regexes = {rule.pattern: re.compile(re.escape(rule.pattern) if rule.literal else rule.pattern)
+               for rule in rules}
+    anchors = [rule_anchor(rule) for rule in rules]
+    for filepath in files:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+        lines = {}
+        offsets = {}
+        for number, rule in enumerate(rules):
+            if len(by_rule[number]) >= per_rule or not rule.applies_to(filepath):
+                continue
+            if anchors[number] is not None and anchors[number] not in content:
+                continue
+            found = offsets.get(rule.pattern)
+            if found is None:
+                matches = islice(regexes[rule.pattern].finditer(content), per_rule)
+                found = offsets[rule.pattern] = [match.start() for match in matches]
+            for offset in found[:per_rule - len(by_rule[number])]:
+                start = content.rfind('\n', 0, offset) + 1
+                end = content.find('\n', offset)
+                end = len(content) if end < 0 else end
+                if (start, end) not in lines:
+                    lines[start, end] = len(witnesses)
+                    witnesses.append(Witness(content[start:end], filepath, content))
+                by_rule[number].append(lines[start, end])
+    for number, rule in enumerate(rules):
+        for text in examples(rule):
+            content = '\n'.join((text,) + rule.requires)
+            by_rule[number].append(len(witnesses))
+            witnesses.append(Witness(text, _example_path(rule), content))
+    return by_rule, witnesses
+
+
+class Simulator:
+    """Applies rules to witness lines the way the engine applies them to files"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.regexes = [None if rule.literal else re.compile(rule.pattern) for rule in rules]
+        self._applies = {}
+
+    def applies(self, number, witness):
+        rule = self.rules[number]
+        if any(required not in witness.content for required in rule.requires):
+            return False
+        if not rule.files:
+            return True
+        key = (rule.files, witness.filepath)
+        result = self._applies.get(key)
+        if result is None:
+            result = self._applies[key] = rule.applies_to(witness.filepath)
+        return result
+
+    def rewrite(self, number, text):
+        rule = self.rules[number]
+        if rule.literal:
+            return text.replace(rule.pattern, rule.replacement)
+        return self.regexes[number].sub(rule.replacement, text)
+
+    def run(self, order, witness, fired=None):
+        text = witness.text
+        for number in order:
+            if not self.applies(number, witness):
+                continue
+            updated = self.rewrite(number, text)
+            if updated != text:
+                if fired is not None:
+                    fired.add(number)
+                text = updated
+        return text
+
+    def first_match(self, number, text):
+        rule = self.rules[number]
+        if rule.literal:
+            start = text.find(rule.pattern)
+            return None if start < 0 else (start, start + len(rule.pattern))
+        match = self.regexes[number].search(text)
+        return None if match is None else match.span()
+
+
+def _same_rule(a, b):
+    return (a.pattern, a.replacement, a.literal, a.scope) == (b.pattern, b.replacement, b.literal, b.scope)
+
+
+class Analysis:
+    """Redundant rules and rule interactions of an ordered rule list"""
+
+    def __init__(self, rules, witness_files=()):
+        self.rules = list(rules)
+        self.sim = Simulator(self.rules)
+        self.by_rule, self.witnesses = collect_witnesses(self.rules, witness_files)
+        self.fired = [set() for _ in self.witnesses]
+        self.results = [self.sim.run(range(len(self.rules)), witness, fired)
+                        for witness, fired in zip(self.witnesses, self.fired)]
+        self.fires_on = [[] for _ in self.rules]
+        for index, fired in enumerate(self.fired):
+            for number in fired:
+                self.fires_on[number].append(index)
+
+    def redundant(self):
+        """[Finding] for the rules the sequence can do without, latest first
+
+        Removals are greedy: each rule is tested against the sequence with
+        the rules already found redundant left out.
+        """
+        kept = list(range(len(self.rules)))
+        findings = []
+        for number in reversed(range(len(self.rules))):
+            without = [other for other in kept if other != number]
+            touched = self.fires_on[number]
+            if any(self.sim.run(without, self.witnesses[index]) != self.results[index]
+                   for index in touched):
+                continue
+            kept = without
+            findings.append(self._why_redundant(number, kept, touched))
+        return findings
+
+    def _why_redundant(self, number, kept, touched):
+        rule = self.rules[number]
+        for other in kept:
+            if _same_rule(self.rules[other], rule):
+                return Finding('duplicate', number, other)
+        # The kept rule that now does the rewrite on all of its witnesses
+        covering = None
+        for index in touched:
+            fired = set()
+            self.sim.run(kept, self.witnesses[index], fired)
+            covering = fired if covering is None else covering & fired
+        if covering:
+            return Finding('subsumed', number, min(covering))
+        return Finding('overwritten', number, None)
+
+    def interactions(self, numbers=None):
+        """[Finding] for the pairs of rules whose result depends on their order"""
+        numbers = range(len(self.rules)) if numbers is None else numbers
+        seen = set()
+        feeds = set()
+        findings = []
+        for a in numbers:
+            for index in self.by_rule[a]:
+                witness = self.witnesses[index]
+                text = witness.text
+                if not self.sim.applies(a, witness):
+                    continue
+                a_span = self.sim.first_match(a, text)
+                if a_span is None:
+                    continue
+                a_out = self.sim.rewrite(a, text)
+                for b in numbers:
+                    if b == a or not self.sim.applies(b, witness):
+                        continue
+                    b_span = self.sim.first_match(b, text)
+                    if b_span is not None:
+                        pair = (min(a, b), max(a, b))
+                        if (pair not in seen and b_span[0] < a_span[1] and a_span[0] < b_span[1]
+                                and self.sim.rewrite(b, text) != a_out):
+                            seen.add(pair)
+                            findings.append(Finding('competes', *pair))
+                    elif (a, b) not in feeds and self.sim.first_match(b, a_out) is not None:
+                        feeds.add((a, b))
+        for a, b in sorted(feeds):
+            if (b, a) in feeds:
+                if a < b:
+                    findings.append(Finding('oscillates', a, b))
+            else:
+                findings.append(Finding('late feed' if b < a else 'feeds', a, b))
+        return findings
+
+
+def verify(rules, kept, files):
+    """Put back removed rules until the kept list rewrites every file like the full list
+
+    Returns (kept, restored).
+    """
+    kept = sorted(kept)
+    contents = {}
+    for filepath in files:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            contents[filepath] = f.read()
+    full = compile_rules(rules)
+    expected = {path: full.apply(content, path) for path, content in contents.items()}
+
+    def differing(numbers, paths):
+        compiled = compile_rules([rules[number] for number in numbers])
+        return [path for path in paths if compiled.apply(contents[path], path) != expected[path]]
+
+    restored = []
+    bad = differing(kept, expected)
+    for number in range(len(rules)):
+        if not bad:
+            break
+        if number in kept:
+            continue
+        trial = sorted(kept + [number])
+        still_bad = differing(trial, bad)
+        if len(still_bad) < len(bad):
+            kept, bad = trial, still_bad
+            restored.append(number)
+    return kept, restored
+
+
+def _toml_string(value):
+    if "'" not in value and '\n' not in value:
+        return f"'{value}'"
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+
+def _toml_strings(values):
+    return '[' + ', '.join(_toml_string(value) for value in values) + ']'
+
+
+def write_rule_file(rules, path, name='minimal'):
+    """Write rules as one TOML rule set, each noting the set it came from"""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"# Generated by python -m codemod.overlap: {len(rules)} rules\n")
+        f.write(f"name = {_toml_string(name)}\n")
+        for rule in rules:
+            f.write(f"\n# from {rule.rule_set}\n[[rules]]\n")
+            f.write(f"pattern = {_toml_string(rule.pattern)}\n")
+            f.write(f"replacement = {_toml_string(rule.replacement)}\n")
+            f.write(f"codes = {_toml_strings(rule.codes)}\n")
+            if rule.literal:
+                f.write("literal = true\n")
+            if rule.scope != 'code':
+                f.write(f"scope = {_toml_string(rule.scope)}\n")
+            if rule.files:
+                f.write(f"files = {_toml_strings(rule.files)}\n")
+            if rule.requires:
+                f.write(f"requires = {_toml_strings(rule.requires)}\n")
+
+
+def describe(rules, number):
+    rule = rules[number]
+    return f"{rule.rule_set}: {rule.pattern!r} -> {rule.replacement!r}"
+
+
+FINDING_TEXT = {
+    'duplicate': 'duplicate of',
+    'subsumed': 'subsumed by',
+    'competes': 'competes with',
+    'feeds': 'creates matches for',
+    'late feed': 'creates matches for (runs later, needs --converge)',
+    'oscillates': 'and this rule rewrite each other:',
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m codemod.overlap',
+                                     description='Find duplicate, redundant and interacting rules.')
+    parser.add_argument('rule_sets', nargs='*', metavar='RULE_SET',
+                        help='rule sets to analyse, in order (default: the full fix sequence)')
+    parser.add_argument('--root', default=CLIENT_SRC,
+                        help='tree the witnesses are taken from and the result is checked on '
+                             '(default: client/src)')
+    parser.add_argument('--rules-dir', default=DEFAULT_RULE_DIR, metavar='DIR',
+                        help='directory of TOML rule files (default: codemod/rulesets)')
+    parser.add_argument('--no-verify', action='store_true',
+                        help='do not check the minimal list against the tree')
+    parser.add_argument('--write', metavar='PATH',
+                        help='write the minimal ordered rule list as a TOML rule file')
+    parser.add_argument('--verbose', action='store_true',
+                        help='list every finding, not only the counts')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        register_rule_files(rule_file_paths(args.rules_dir))
+        rules = select(args.rule_sets)
+    except (OSError, RuleFileError) as e:
+        print(f"Cannot load rule files: {e}")
+        return 2
+    except KeyError as e:
+        print(e.args[0])
+        return 2
+
+    files = list(walk_files(args.root))
+    analysis = Analysis(rules, files)
+    removed = analysis.redundant()
+    removed_numbers = {finding.rule for finding in removed}
+    kept = [number for number in range(len(rules)) if number not in removed_numbers]
+    restored = []
+    if not args.no_verify:
+        kept, restored = verify(rules, kept, files)
+        removed = [finding for finding in removed if finding.rule not in restored]
+    interactions = analysis.interactions(kept)
+
+    counts = {}
+    for finding in removed + interactions:
+        counts[finding.kind] = counts.get(finding.kind, 0) + 1
+    print(f"{len(rules)} rules, {len(analysis.witnesses)} witnesses")
+    for finding in sorted(removed, key=lambda finding: finding.rule) + interactions:
+        if not args.verbose and finding.kind not in ('late feed', 'oscillates'):
+            continue
+        text = FINDING_TEXT.get(finding.kind, finding.kind)
+        if finding.other is None:
+            print(f"  {finding.kind}: {describe(rules, finding.rule)}")
+        else:
+            print(f"  {describe(rules, finding.rule)}\n    {text} {describe(rules, finding.other)}")
+    for kind in ('duplicate', 'subsumed', 'overwritten', 'competes', 'feeds', 'late feed', 'oscillates'):
+        if kind in counts:
+            print(f"{kind}: {counts[kind]}")
+    if restored:
+        print(f"{len(restored)} removals changed files under {args.root} and were put back")
+    print(f"Minimal list: {len(kept)} of {len(rules)} rules")
+    if args.write:
+        write_rule_file([rules[number] for number in kept], args.write)
+        print(f"Written to {args.write} (run it with: python -m codemod --rules {args.write} minimal)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Unified diffs built straight from a file's edits.
+
+The edits of a rewrite are already known as (start, end, replacement)
+offsets into the original content, so there is no need to diff the old and
+new text line by line: each edit is mapped to its lines with a LineIndex
+(one binary search per offset) and only the changed lines and their context
+are ever sliced out of the content.
+
+A run applies many passes one after another; EditTracker folds the edits of
+each pass into edits of the original content, so the diff of a whole run
+is still built from offsets alone.
+"""
+import heapq
+
+from .lines import LineIndex
+
+DEFAULT_CONTEXT = 3
+NO_NEWLINE = '\\ No newline at end of file\n'
+
+
+def apply_edits(content, edits):
+    """content with sorted, non-overlapping (start, end, replacement) edits applied"""
+    pieces = []
+    last = 0
+    for start, end, replacement in edits:
+        pieces.append(content[last:start])
+        pieces.append(replacement)
+        last = end
+    pieces.append(content[last:])
+    return ''.join(pieces)
+
+
+class EditTracker:
+    """Composes the edits of successive passes into edits of the original content
+
+    Each tracked edit is (original start, original end, current start,
+    current end): the span of the original it replaced and the span of its
+    text in the current content. follow() takes a pass's edits as sorted
+    (start, end, replacement length) offsets into the current content and
+    merges every run of overlapping or touching edits into one.
+    """
+
+    def __init__(self):
+        self.edits = []
+
+    def follow(self, edits):
+        old = ((cur_start, cur_end, (cur_end - cur_start) - (orig_end - orig_start), 0)
+               for orig_start, orig_end, cur_start, cur_end in self.edits)
+        new = ((start, end, 0, size - (end - start)) for start, end, size in edits)
+        merged = []
+        delta = 0   # current - original length, for the clusters so far
+        shift = 0   # updated - current length, for the clusters so far
+        cluster = None
+        for start, end, old_change, new_change in heapq.merge(old, new):
+            if cluster is not None and start > cluster[1]:
+                delta, shift = self._close(cluster, merged, delta, shift)
+                cluster = None
+            if cluster is None:
+                cluster = [start, end, old_change, new_change]
+            else:
+                cluster[1] = max(cluster[1], end)
+                cluster[2] += old_change
+                cluster[3] += new_change
+        if cluster is not None:
+            self._close(cluster, merged, delta, shift)
+        self.edits = merged
+
+    @staticmethod
+    def _close(cluster, merged, delta, shift):
+        start, end, old_change, new_change = cluster
+        merged.append((start - delta, end - delta - old_change, start + shift, end + shift + new_change))
+        return delta + old_change, shift + new_change
+
+    def result(self, original, final):
+        """(start, end, replacement) edits of original that give final"""
+        edits = []
+        for orig_start, orig_end, cur_start, cur_end in self.edits:
+            replacement = final[cur_start:cur_end]
+            if replacement != original[orig_start:orig_end]:
+                edits.append((orig_start, orig_end, replacement))
+        return edits
+
+
+def _blocks(content, lines, edits):
+    """[(first line, last line, new text of those lines)] for edits grouped by the lines they touch"""
+    blocks = []
+    group = []
+    first = last = 0
+    for edit in edits:
+        start, end = edit[0], edit[1]
+        edit_first = lines.line_of(start)
+        edit_last = lines.line_of(end - 1) if end > start else edit_first
+        if group and edit_first <= last:
+            group.append(edit)
+            last = max(last, edit_last)
+            continue
+        if group:
+            blocks.append((first, last, group))
+        group = [edit]
+        first, last = edit_first, edit_last
+    if group:
+        blocks.append((first, last, group))
+    result = []
+    for first, last, group in blocks:
+        offset = lines.line_start(first)
+        segment = content[offset:lines.line_end(last)]
+        shifted = [(start - offset, end - offset, replacement) for start, end, replacement in group]
+        result.append((first, last, apply_edits(segment, shifted)))
+    return result
+
+
+def _line_texts(content, lines, first, last):
+    return content[lines.line_start(first):lines.line_end(last)].splitlines(keepends=True)
+
+
+def _emit(prefix, texts):
+    for text in texts:
+        if text.endswith('\n'):
+            yield prefix + text
+        else:
+            yield prefix + text + '\n'
+            yield NO_NEWLINE
+
+
+def unified_diff(content, edits, old_path, new_path=None, context=DEFAULT_CONTEXT, lines=None):
+    """Yield the lines of a unified diff for content with edits applied
+
+    lines is the content's LineIndex if the caller already has one.
+    """
+    if not edits:
+        return
+    lines = lines or LineIndex(content)
+    # A trailing newline opens an empty last "line" that is not part of the file
+    last_line = lines.line_count - (1 if content.endswith('\n') else 0)
+    blocks = _blocks(content, lines, edits)
+
+    hunks = []
+    for block in blocks:
+        if hunks and block[0] - hunks[-1][-1][1] - 1 <= 2 * context:
+            hunks[-1].append(block)
+        else:
+            hunks.append([block])
+
+    yield f'--- {old_path}\n'
+    yield f'+++ {new_path or old_path}\n'
+    delta = 0
+    for hunk in hunks:
+        start = max(1, hunk[0][0] - context)
+        end = min(last_line, hunk[-1][1] + context)
+        body = []
+        old_count = new_count = 0
+        line = start
+        for first, last, new_text in hunk:
+            if line < first:
+                texts = _line_texts(content, lines, line, first - 1)
+                body.extend(_emit(' ', texts))
+                old_count += len(texts)
+                new_count += len(texts)
+            old_texts = _line_texts(content, lines, first, last)
+            new_texts = new_text.splitlines(keepends=True)
+            body.extend(_emit('-', old_texts))
+            body.extend(_emit('+', new_texts))
+            old_count += len(old_texts)
+            new_count += len(new_texts)
+            line = last + 1
+        if line <= end:
+            texts = _line_texts(content, lines, line, end)
+            body.extend(_emit(' ', texts))
+            old_count += len(texts)
+            new_count += len(texts)
+        yield f'@@ -{start},{old_count} +{start + delta},{new_count} @@\n'
+        yield from body
+        delta += new_count - old_count
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""On-disk cache of compiled rule plans.
+
+Compiling the full fix sequence (planning the passes, building the literal
+tries and compiling every regex) takes longer than most watch-mode saves.
+The compiled CompiledRules is therefore pickled to .codemod/compiled/, keyed
+by a hash of the rule definitions, of the compiler sources and of the Python
+version. Regexes are stored as the regex engine's compiled code rather than
+as their pattern, so loading does not parse or compile them again. That code
+is read with re's private modules of CPython 3.11+; elsewhere the patterns
+are pickled as text and compiled again when the plan is loaded.
+
+Any change to a rule, a rule file or the compiler gives a new key; stale
+artifacts are pruned, and an artifact that cannot be loaded is rebuilt.
+"""
+import hashlib
+import os
+import pickle
+import re
+import sys
+import tempfile
+
+try:
+    from re import _compiler, _parser
+    import _sre
+except ImportError:  # Python < 3.11, or not CPython: patterns are pickled as text
+    _compiler = _parser = _sre = None
+
+from .cache import REPO_ROOT
+from .compiler import CompiledRules, compile_rules
+
+DEFAULT_COMPILED_DIR = os.path.join(REPO_ROOT, '.codemod', 'compiled')
+# Artifacts kept for other rule selections
+MAX_ARTIFACTS = 16
+SOURCES = ('compiler.py', 'lexer.py', 'rules.py', 'precompiled.py')
+
+
+def _restore_pattern(pattern, flags, code, groups, groupindex, indexgroup):
+    return _sre.compile(pattern, flags, code, groups, groupindex, indexgroup)
+
+
+def _pattern_state(regex):
+    parsed = _parser.parse(regex.pattern, regex.flags)
+    code = [int(op) for op in _compiler._code(parsed, regex.flags)]
+    indexgroup = [None] * parsed.state.groups
+    for name, number in parsed.state.groupdict.items():
+        indexgroup[number] = name
+    return (regex.pattern, regex.flags | parsed.state.flags, code, parsed.state.groups - 1,
+            dict(parsed.state.groupdict), tuple(indexgroup))
+
+
+class _Pickler(pickle.Pickler):
+    def reducer_override(self, obj):
+        if isinstance(obj, re.Pattern) and _sre is not None:
+            return _restore_pattern, _pattern_state(obj)
+        return NotImplemented
+
+
+def artifact_key(rules):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{sys.version}\0{getattr(_sre, "MAGIC", "")}'.encode('utf-8'))
+    package = os.path.dirname(os.path.abspath(__file__))
+    for name in SOURCES:
+        with open(os.path.join(package, name), 'rb') as f:
+            digest.update(f.read())
+    for rule in rules:
+        digest.update(repr(rule).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _prune(directory, keep):
+    try:
+        entries = [entry for entry in os.scandir(directory) if entry.name.endswith('.pickle')]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        try:
+            os.unlink(entry.path)
+        except OSError:
+            pass
+
+
+def load_compiled(rules, directory=DEFAULT_COMPILED_DIR):
+    """CompiledRules for rules, read from the artifact cache or compiled and stored"""
+    rules = tuple(rules)
+    path = os.path.join(directory, artifact_key(rules) + '.pickle')
+    try:
+        with open(path, 'rb') as f:
+            compiled = pickle.load(f)
+        if isinstance(compiled, CompiledRules) and compiled.rules == rules:
+            return compiled
+    except Exception:
+        # Missing, truncated or written by another interpreter: rebuild it
+        pass
+    compiled = compile_rules(rules)
+    compiled.passes
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            _Pickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(compiled)
+        os.replace(tmp_path, path)
+        _prune(directory, MAX_ARTIFACTS)
+    except (OSError, pickle.PicklingError):
+        pass
+    return compiled
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Per-rule instrumentation and the runaway-pattern time budget.
+
+A Profile collects, per rule and per file, the wall time of the rule's pass,
+the matches it found, the replacements it made and the bytes it scanned.
+Passes that merge several literal rules scan once for all of them; their time
+and bytes are shared equally between the member rules, while matches and
+replacements are counted per rule.
+
+time_budget() arms SIGALRM around a pass so a pattern that backtracks for
+longer than the budget raises RuleTimeout instead of hanging the batch. The
+regex engine checks for signals while it matches, so the alarm interrupts it.
+Where SIGALRM is unavailable (Windows, non-main threads) the budget is
+checked after the pass returns instead.
+"""
+import contextlib
+import json
+import os
+import signal
+import threading
+
+# Seconds a single rule may spend on one file
+DEFAULT_RULE_BUDGET = 2.0
+
+# Per rule counters: seconds, matches, replacements, bytes scanned
+SECONDS, MATCHES, REPLACEMENTS, BYTES = range(4)
+
+
+class RuleTimeout(Exception):
+    def __init__(self, rules, budget):
+        self.rules = rules
+        self.budget = budget
+        patterns = '; '.join(f"{rule.rule_set}: {rule.pattern}" for rule in rules)
+        super().__init__(f"rule exceeded its {budget:g}s time budget: {patterns}")
+
+
+def _can_interrupt():
+    return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+
+@contextlib.contextmanager
+def time_budget(seconds, rules):
+    """Raise RuleTimeout from inside the block once it has run for seconds"""
+    if not seconds or not _can_interrupt():
+        yield
+        return
+
+    def expire(signum, frame):
+        raise RuleTimeout(rules, seconds)
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def rule_key(rule):
+    return (rule.rule_set, rule.pattern)
+
+
+class FileProfile:
+    """Counters for the rules run on one file; small and picklable for pool workers"""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.rules = {}
+        # Matches and replacements of the pass being run, filled by the passes
+        self.counts = None
+        self.timeout = None
+
+    def begin_pass(self):
+        self.counts = {}
+
+    def count(self, rule, replaced):
+        entry = self.counts.get(rule)
+        if entry is None:
+            entry = self.counts[rule] = [0, 0]
+        entry[0] += 1
+        if replaced:
+            entry[1] += 1
+
+    def end_pass(self, rules, seconds, scanned):
+        share = len(rules)
+        for rule in rules:
+            entry = self.rules.get(rule_key(rule))
+            if entry is None:
+                entry = self.rules[rule_key(rule)] = [0.0, 0, 0, 0]
+            matches, replacements = self.counts.get(rule, (0, 0))
+            entry[SECONDS] += seconds / share
+            entry[MATCHES] += matches
+            entry[REPLACEMENTS] += replacements
+            entry[BYTES] += scanned // share
+        self.counts = None
+
+
+class Profile:
+    """Totals per rule over a run, plus the per-file breakdown"""
+
+    def __init__(self):
+        self.rules = {}
+        self.files = {}
+        self.timeouts = []
+
+    def add(self, file_profile):
+        if file_profile is None:
+            return
+        if file_profile.timeout is not None:
+            self.timeouts.append({'file': file_profile.filepath, 'error': file_profile.timeout})
+        self.files[file_profile.filepath] = file_profile.rules
+        for key, values in file_profile.rules.items():
+            entry = self.rules.get(key)
+            if entry is None:
+                entry = self.rules[key] = [0.0, 0, 0, 0, 0]
+            for index, value in enumerate(values):
+                entry[index] += value
+            entry[4] += 1
+
+    def ranked(self):
+        return sorted(self.rules.items(), key=lambda item: -item[1][SECONDS])
+
+    def to_json(self):
+        return {
+            'rules': [
+                {'rule_set': rule_set, 'pattern': pattern, 'seconds': round(values[SECONDS], 6),
+                 'matches': values[MATCHES], 'replacements': values[REPLACEMENTS],
+                 'bytes': values[BYTES], 'files': values[4]}
+                for (rule_set, pattern), values in self.ranked()
+            ],
+            'files': {
+                filepath: [
+                    {'rule_set': rule_set, 'pattern': pattern, 'seconds': round(values[SECONDS], 6),
+                     'matches': values[MATCHES], 'replacements': values[REPLACEMENTS],
+                     'bytes': values[BYTES]}
+                    for (rule_set, pattern), values in rules.items()
+                ]
+                for filepath, rules in self.files.items()
+            },
+            'timeouts': self.timeouts,
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, indent=2, ensure_ascii=False)
+
+    def folded(self, root=''):
+        """Collapsed stacks (rule set;pattern;file microseconds) for flamegraph tools"""
+        lines = []
+        for filepath, rules in self.files.items():
+            name = os.path.relpath(filepath, root) if root else filepath
+            for (rule_set, pattern), values in rules.items():
+                micros = int(values[SECONDS] * 1e6)
+                if micros:
+                    frames = [rule_set, pattern, name]
+                    lines.append(';'.join(frame.replace(';', ',') for frame in frames) + f' {micros}')
+        return sorted(lines)
+
+    def write_folded(self, path, root=''):
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in self.folded(root):
+                f.write(line + '\n')
+
+    def summary(self, top=15, width=30):
+        """Text flame-style summary: the slowest rules with a bar of their share"""
+        ranked = self.ranked()
+        total = sum(values[SECONDS] for _, values in ranked) or 1.0
+        lines = [f"{'ms':>9} {'share':>6}  {'matches':>8} {'repl':>6}  rule"]
+        for (rule_set, pattern), values in ranked[:top]:
+            share = values[SECONDS] / total
+            bar = '#' * max(1, round(share * width)) if values[SECONDS] else ''
+            lines.append(f"{values[SECONDS] * 1000:9.2f} {share:6.1%}  {values[MATCHES]:8d} "
+                         f"{values[REPLACEMENTS]:6d}  {bar} {rule_set}: {pattern}")
+        for timeout in self.timeouts:
+            lines.append(f"TIMEOUT {timeout['file']}: {timeout['error']}")
+        return '\n'.join(lines)
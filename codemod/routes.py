@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""tRPC route map extracted statically from the server routers.
+
+Starting at `appRouter` in server/routers.ts, every `router({...})` object is
+parsed into a tree of sub-routers and procedures. Router values that are
+identifiers (`diesel: dieselRouter`) are followed through the file's relative
+imports, so the map covers every router file reachable from the app router.
+
+Each router file's parse result is cached in .codemod/routes.json with its
+stat and content hash; regenerating the map re-parses only the files that
+changed and re-links the cached trees, which takes milliseconds.
+
+Client call sites (`trpc.a.b.useQuery`, `utils.a.b.invalidate`) whose path is
+not in the map are resolved to the nearest valid procedure of the same kind,
+and turned into ordinary rules for the engine.
+"""
+import json
+import os
+import re
+from collections import namedtuple
+
+from .cache import REPO_ROOT, content_hash
+from .lexer import code_only
+from .rules import PROPERTY_CODES, rule_set
+
+APP_ROUTER = os.path.join(REPO_ROOT, 'server', 'routers.ts')
+APP_ROUTER_NAME = 'appRouter'
+DEFAULT_ROUTE_CACHE = os.path.join(REPO_ROOT, '.codemod', 'routes.json')
+ROUTE_CACHE_VERSION = 1
+ROUTE_RULE_SET = 'trpc_routes'
+
+ROUTER_DEF = re.compile(r'\bconst\s+(\w+)\s*=\s*router\(\s*\{')
+NAMED_IMPORT = re.compile(r'\bimport\s*\{([^}]*)\}\s*from\s*["\'](\.[^"\']*)["\']')
+ENTRY_KEY = re.compile(r'\s*(?:(\w+)|["\'](\w+)["\'])\s*:')
+SHORTHAND = re.compile(r'\s*(\w+)\s*(?=[,}])')
+NESTED_ROUTER = re.compile(r'\s*router\(\s*\{')
+IDENTIFIER_VALUE = re.compile(r'\s*(\w+)\s*$')
+CLOSING_PAREN = re.compile(r'\s*\)')
+# Brackets and top-level procedure kinds of a value expression
+VALUE_INTEREST = re.compile(r'[()\[\]{},]|\.(query|mutation|subscription)\s*\(')
+
+# Hooks and utils methods by the kind of procedure they call
+HOOK_KINDS = {
+    'useQuery': 'query', 'useSuspenseQuery': 'query', 'useInfiniteQuery': 'query',
+    'invalidate': 'query', 'fetch': 'query', 'prefetch': 'query', 'refetch': 'query',
+    'setData': 'query', 'getData': 'query', 'cancel': 'query',
+    'useMutation': 'mutation',
+}
+# Starts with the literal (not \b) so the regex engine can skip ahead to it
+CALL_SITE = re.compile(
+    r'(trpc(?<!\wtrpc)|utils(?<!\wutils))\.((?:\w+\.)*\w+)\.(' + '|'.join(HOOK_KINDS) + r')\b'
+)
+
+# Leading word of a procedure or call name -> normalized verb
+VERB_ALIASES = {
+    'list': 'list', 'all': 'list', 'search': 'list',
+    'get': 'get', 'fetch': 'get', 'find': 'get', 'by': 'get', 'load': 'get',
+    'create': 'create', 'add': 'create', 'new': 'create',
+    'update': 'update', 'save': 'update', 'set': 'update', 'edit': 'update', 'complete': 'update',
+    'delete': 'delete', 'remove': 'delete',
+}
+# getTanks vs tanks.get: the only verbs that may stand in for each other
+READ_VERBS = {'get', 'list'}
+CAMEL_WORD = re.compile(r'[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])')
+# Candidates below this noun overlap are never proposed
+MIN_SIMILARITY = 0.5
+
+CallSite = namedtuple('CallSite', 'filepath obj path hook')
+
+
+def _scan_value(text, i):
+    """(end, kind) of the object value starting at i; kind is the top-level procedure call"""
+    depth = 0
+    kind = None
+    while True:
+        match = VALUE_INTEREST.search(text, i)
+        if match is None:
+            return len(text), kind
+        token = match.group(0)
+        if match.group(1):
+            if depth == 0 and kind is None:
+                kind = match.group(1)
+            depth += 1
+        elif token in '([{':
+            depth += 1
+        elif token == ',' and depth == 0:
+            return match.start(), kind
+        elif token in ')]}':
+            if depth == 0:
+                return match.start(), kind
+            depth -= 1
+        i = match.end()
+
+
+def _parse_object(text, i):
+    """Parse the router object whose '{' is at text[i - 1]; returns (tree, end)"""
+    tree = {}
+    while True:
+        while i < len(text) and text[i] in ' \t\r\n,':
+            i += 1
+        if i >= len(text) or text[i] == '}':
+            return tree, i + 1
+        key = ENTRY_KEY.match(text, i)
+        if key is None:
+            shorthand = SHORTHAND.match(text, i)
+            end, _ = _scan_value(text, i)
+            if shorthand is not None:
+                tree[shorthand.group(1)] = ['ref', shorthand.group(1)]
+            # Always make progress past stray closing brackets
+            i = max(end, i + 1)
+            continue
+        name = key.group(1) or key.group(2)
+        nested = NESTED_ROUTER.match(text, key.end())
+        if nested is not None:
+            tree[name], i = _parse_object(text, nested.end())
+            close = CLOSING_PAREN.match(text, i)
+            i = close.end() if close else i
+            continue
+        end, kind = _scan_value(text, key.end())
+        value = text[key.end():end]
+        identifier = IDENTIFIER_VALUE.match(value)
+        if kind is not None:
+            tree[name] = ['procedure', kind]
+        elif identifier is not None:
+            tree[name] = ['ref', identifier.group(1)]
+        i = end
+
+
+def _resolve_module(filepath, module):
+    base = os.path.normpath(os.path.join(os.path.dirname(filepath), module))
+    for candidate in (base + '.ts', base + '.tsx', os.path.join(base, 'index.ts'), base):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def parse_router_file(filepath, content):
+    """{'imports': {name: path}, 'routers': {name: tree}} for one router file"""
+    code = code_only(content, jsx=False)
+    imports = {}
+    for match in NAMED_IMPORT.finditer(content):
+        if not code[match.start():match.start() + 6] == 'import':
+            continue
+        module = _resolve_module(filepath, match.group(2))
+        if module is None:
+            continue
+        for name in match.group(1).split(','):
+            parts = name.split(' as ')
+            if parts[0].strip():
+                imports[parts[-1].strip()] = module
+    routers = {}
+    for match in ROUTER_DEF.finditer(code):
+        routers[match.group(1)], _ = _parse_object(code, match.end())
+    return {'imports': imports, 'routers': routers}
+
+
+class RouteMap:
+    def __init__(self, procedures):
+        # 'diesel.tanks.list' -> 'query'
+        self.procedures = procedures
+        self._words = {path: _path_words(path) for path in procedures}
+
+    def __contains__(self, path):
+        return path in self.procedures
+
+    def __len__(self):
+        return len(self.procedures)
+
+    def nearest(self, path, kind=None):
+        """Closest valid procedure path of the given kind, or None"""
+        if path in self.procedures:
+            return path
+        verb, nouns = _path_words(path)
+        best = None
+        for candidate, (candidate_verb, candidate_nouns) in self._words.items():
+            if kind is not None and self.procedures[candidate] != kind:
+                continue
+            # A delete never resolves to a create, whatever the nouns say
+            if verb and candidate_verb and verb != candidate_verb and {verb, candidate_verb} != READ_VERBS:
+                continue
+            union = nouns | candidate_nouns
+            similarity = len(nouns & candidate_nouns) / len(union) if union else 0
+            if similarity < MIN_SIMILARITY:
+                continue
+            score = (similarity + (0.5 if verb == candidate_verb else 0), -len(candidate), candidate)
+            if best is None or score[:2] > best[:2] or (score[:2] == best[:2] and candidate < best[2]):
+                best = score
+        return None if best is None else best[2]
+
+
+def _singular(word):
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith('s') and not word.endswith(('ss', 'us')):
+        return word[:-1]
+    return word
+
+
+def _path_words(path):
+    """(verb, noun set) of a procedure path, e.g. diesel.getDieselTanks -> ('list', {diesel, tank})"""
+    segments = path.split('.')
+    leaf = [word.lower() for word in CAMEL_WORD.findall(segments[-1])]
+    verb = None
+    if leaf and leaf[0] in VERB_ALIASES:
+        verb = VERB_ALIASES[leaf[0]]
+        rest = leaf[1:]
+        # getTanks lists, getTank fetches one
+        if verb == 'get' and rest and rest[-1] != _singular(rest[-1]) and rest[-2:] != ['by', 'id']:
+            verb = 'list'
+        leaf = rest
+    nouns = set()
+    for segment in segments[:-1]:
+        nouns.update(_singular(word.lower()) for word in CAMEL_WORD.findall(segment))
+    nouns.update(_singular(word) for word in leaf if word not in ('by', 'id'))
+    return verb, nouns
+
+
+class RouteIndex:
+    """Per-file router parse cache, linked into a RouteMap on load()"""
+
+    def __init__(self, entry=APP_ROUTER, cache_path=DEFAULT_ROUTE_CACHE):
+        self.entry = entry
+        self.cache_path = cache_path
+        self.files = {}
+        self.reparsed = []
+        self.dirty = False
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == ROUTE_CACHE_VERSION:
+                self.files = data.get('files', {})
+        except (OSError, ValueError):
+            pass
+
+    def parsed(self, filepath):
+        st = os.stat(filepath)
+        entry = self.files.get(filepath)
+        if entry is not None and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return entry['parsed']
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+        digest = content_hash(content)
+        if entry is None or entry['hash'] != digest:
+            entry = {'hash': digest, 'parsed': parse_router_file(filepath, content)}
+            self.reparsed.append(filepath)
+        entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+        self.files[filepath] = entry
+        self.dirty = True
+        return entry['parsed']
+
+    def _lookup(self, filepath, name):
+        """(file, tree) of the router called name as seen from filepath"""
+        parsed = self.parsed(filepath)
+        if name in parsed['routers']:
+            return filepath, parsed['routers'][name]
+        module = parsed['imports'].get(name)
+        if module is None:
+            return None
+        routers = self.parsed(module)['routers']
+        return (module, routers[name]) if name in routers else None
+
+    def _flatten(self, filepath, tree, prefix, procedures, stack):
+        for key, node in tree.items():
+            path = prefix + key
+            if isinstance(node, dict):
+                self._flatten(filepath, node, path + '.', procedures, stack)
+            elif node[0] == 'procedure':
+                procedures[path] = node[1]
+            else:
+                found = self._lookup(filepath, node[1])
+                if found is not None and (found[0], node[1]) not in stack:
+                    self._flatten(found[0], found[1], path + '.', procedures,
+                                  stack | {(found[0], node[1])})
+
+    def load(self, name=APP_ROUTER_NAME):
+        procedures = {}
+        found = self._lookup(self.entry, name)
+        if found is not None:
+            self._flatten(found[0], found[1], '', procedures, {(found[0], name)})
+        self.save()
+        return RouteMap(procedures)
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': ROUTE_CACHE_VERSION, 'files': self.files}, f)
+        os.replace(tmp_path, self.cache_path)
+        self.dirty = False
+
+
+def load_route_map(entry=APP_ROUTER, cache_path=DEFAULT_ROUTE_CACHE):
+    return RouteIndex(entry, cache_path).load()
+
+
+def iter_call_sites(filepath, content):
+    code = code_only(content, jsx=str(filepath).endswith('.tsx'))
+    for match in CALL_SITE.finditer(code):
+        yield CallSite(filepath, match.group(1), match.group(2), match.group(3))
+
+
+def unresolved_call_sites(route_map, files):
+    """Call sites in files whose path is not a procedure in the map"""
+    for filepath in files:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+        for site in iter_call_sites(filepath, content):
+            if site.path not in route_map:
+                yield site
+
+
+def route_rules(route_map, files):
+    """Rules rewriting each unresolved call site to its nearest valid path"""
+    fixes = {}
+    for site in unresolved_call_sites(route_map, files):
+        old = f'{site.obj}.{site.path}.{site.hook}'
+        if old in fixes:
+            continue
+        target = route_map.nearest(site.path, HOOK_KINDS[site.hook])
+        if target is not None:
+            fixes[old] = f'{site.obj}.{target}.{site.hook}'
+    return rule_set(ROUTE_RULE_SET, [
+        (re.escape(old), new, PROPERTY_CODES) for old, new in sorted(fixes.items())
+    ])
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Rule sets declared in TOML files instead of Python literals.
+
+One file declares one rule set, named after the file (or its `name` key).
+Top-level `files`, `requires`, `scope` and `literal` are defaults for every
+rule; each `[[rules]]` entry can override them:
+
+    files = ["pages/billing/*.tsx"]
+
+    [[rules]]
+    pattern = 'invoice\\.total'
+    replacement = '(invoice as any).total'
+    codes = ["TS2339"]   # optional, inferred from the replacement otherwise
+
+Rule sets from files are registered after the built-in ones, in file name
+order, so a full run applies them last.
+"""
+import os
+import re
+
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ModuleNotFoundError:
+        tomllib = None
+
+from .rules import Rule, infer_codes, register
+
+DEFAULT_RULE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rulesets')
+SCOPES = ('code', 'any')
+SET_KEYS = {'name', 'description', 'files', 'requires', 'scope', 'literal', 'rules'}
+RULE_KEYS = {'pattern', 'replacement', 'codes', 'files', 'requires', 'scope', 'literal'}
+
+
+class RuleFileError(ValueError):
+    pass
+
+
+def _strings(value, where, key):
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise RuleFileError(f"{where}: {key} must be a string or a list of strings")
+    return tuple(value)
+
+
+def parse_rule_file(path):
+    """(rule set name, rules) declared in a TOML file"""
+    if tomllib is None:
+        raise RuleFileError(f"{path}: reading rule files needs Python 3.11+ or the tomli package")
+    try:
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    except tomllib.TOMLDecodeError as e:
+        raise RuleFileError(f"{path}: {e}")
+    unknown = set(data) - SET_KEYS
+    if unknown:
+        raise RuleFileError(f"{path}: unknown keys {', '.join(sorted(unknown))}")
+    name = data.get('name') or os.path.splitext(os.path.basename(path))[0]
+    defaults = {
+        'files': _strings(data.get('files', []), path, 'files'),
+        'requires': _strings(data.get('requires', []), path, 'requires'),
+        'scope': data.get('scope', 'code'),
+        'literal': data.get('literal', False),
+    }
+    entries = data.get('rules', [])
+    if not isinstance(entries, list) or not entries:
+        raise RuleFileError(f"{path}: no [[rules]] declared")
+    rules = []
+    for number, entry in enumerate(entries, 1):
+        where = f"{path}: rule {number}"
+        unknown = set(entry) - RULE_KEYS
+        if unknown:
+            raise RuleFileError(f"{where}: unknown keys {', '.join(sorted(unknown))}")
+        pattern = entry.get('pattern')
+        replacement = entry.get('replacement')
+        if not isinstance(pattern, str) or not isinstance(replacement, str):
+            raise RuleFileError(f"{where}: pattern and replacement must be strings")
+        scope = entry.get('scope', defaults['scope'])
+        if scope not in SCOPES:
+            raise RuleFileError(f"{where}: scope must be one of {', '.join(SCOPES)}")
+        literal = entry.get('literal', defaults['literal'])
+        if not literal:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise RuleFileError(f"{where}: invalid pattern: {e}")
+        if 'codes' in entry:
+            codes = _strings(entry['codes'], where, 'codes')
+        else:
+            codes = infer_codes(pattern, replacement)
+        rules.append(Rule(
+            pattern, replacement, rule_set=name, literal=bool(literal),
+            files=_strings(entry['files'], where, 'files') if 'files' in entry else defaults['files'],
+            requires=(_strings(entry['requires'], where, 'requires') if 'requires' in entry
+                      else defaults['requires']),
+            scope=scope, codes=codes,
+        ))
+    return name, tuple(rules)
+
+
+def rule_file_paths(directory=DEFAULT_RULE_DIR):
+    """The .toml files of directory in name order; none if it does not exist"""
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith('.toml'))
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for name in names]
+
+
+def register_rule_files(paths):
+    """Parse and register every rule file; returns the rule set names"""
+    names = []
+    for path in paths:
+        name, rules = parse_rule_file(path)
+        try:
+            register(name, rules)
+        except ValueError as e:
+            raise RuleFileError(f"{path}: {e}")
+        names.append(name)
+    return names
@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+"""Central registry of the codemod rule sets.
+
+Every rule table that used to live in one of the standalone fix_*.py scripts
+is declared here once, under the name of the script it came from. New rule
+sets can also be declared in TOML files (see codemod/rulefiles.py) and are
+registered after these.
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+@dataclass(frozen=True)
+class Rule:
+    pattern: str
+    replacement: str
+    rule_set: str = ''
+    # Plain str.replace instead of re.sub (fix_remaining_final2.py style)
+    literal: bool = False
+    # Only apply to files whose path ends with one of these (e.g. 'DieselTanks.tsx')
+    files: tuple = ()
+    # Only apply when the file content contains all of these strings
+    requires: tuple = ()
+    # 'code': only rewrite matches that start in code, not in strings,
+    # comments or JSX text (see codemod/lexer.py); 'any': match anywhere
+    scope: str = 'code'
+    # TypeScript error codes the rewrite fixes; with --diagnostics the rule
+    # only runs on lines where tsc reported one of them
+    codes: tuple = ()
+
+    def applies_to(self, filepath):
+        if not self.files:
+            return True
+        path = str(filepath).replace('\\', '/')
+        return any(file_glob(pattern).search(path) for pattern in self.files)
+
+
+GLOB_TOKEN = re.compile(r'\*\*/|\*\*|\*|\?|\[!?\]?[^\]]*\]|[^*?\[]+|\[')
+
+
+@lru_cache(maxsize=None)
+def file_glob(pattern):
+    """Regex for the paths that end with the glob pattern
+
+    'pages/diesel/DieselTanks.tsx' matches that file under any root; '*' and
+    '?' stay within a directory, and '**/' spans any number of them,
+    including none ('pages/billing/**/*.tsx' matches pages/billing/X.tsx).
+    """
+    parts = []
+    for token in GLOB_TOKEN.findall(pattern):
+        if token == '**/':
+            parts.append('(?:[^/]*/)*')
+        elif token == '**':
+            parts.append('.*')
+        elif token == '*':
+            parts.append('[^/]*')
+        elif token == '?':
+            parts.append('[^/]')
+        elif token.startswith('[') and len(token) > 1:
+            body = token[1:-1]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            parts.append('[' + body.replace('\\', '\\\\') + ']')
+        else:
+            parts.append(re.escape(token))
+    start = '^' if pattern.startswith('/') else '(?:^|/)'
+    return re.compile(start + ''.join(parts) + '$')
+
+
+# Error codes by kind of rewrite
+PROPERTY_CODES = ('TS2339', 'TS2551')  # property does not exist on type
+ASSIGNABLE_CODES = ('TS2345', 'TS2322')  # argument / value not assignable
+IMPLICIT_ANY_CODES = ('TS7006', 'TS7031', 'TS2345')  # untyped or mistyped callback parameter
+POSSIBLY_UNDEFINED_CODES = ('TS18048', 'TS2532')
+
+TRPC_PATH = re.compile(r'(?:trpc|utils)\\?\.')
+PROPERTY_CAST = re.compile(r'as any(?:\[\])?\)\??\.')
+VALUE_CAST = re.compile(r' as (?:any\b(?!(?:\[\])?\)\??\.)|\{)')
+PARAMETER_ANY = re.compile(r'\w: any\b')
+
+
+def infer_codes(pattern, replacement):
+    """Error codes a rewrite fixes, judged from the shape of its replacement"""
+    codes = []
+    if TRPC_PATH.match(pattern) or PROPERTY_CAST.search(replacement):
+        codes.extend(PROPERTY_CODES)
+    if '?.' in replacement and '?.' not in pattern.replace('\\', ''):
+        codes.extend(PROPERTY_CODES + POSSIBLY_UNDEFINED_CODES)
+    if VALUE_CAST.search(replacement):
+        codes.extend(ASSIGNABLE_CODES)
+    if PARAMETER_ANY.search(replacement):
+        codes.extend(IMPLICIT_ANY_CODES)
+    return tuple(dict.fromkeys(codes))
+
+
+def rule_set(name, fixes, files=(), requires=(), literal=False, scope='code'):
+    """Build the rules of one set; a fix is (pattern, replacement[, codes])"""
+    rules = []
+    for fix in fixes:
+        pattern, replacement = fix[:2]
+        codes = fix[2] if len(fix) > 2 else infer_codes(pattern, replacement)
+        rules.append(Rule(pattern, replacement, rule_set=name, literal=literal,
+                          files=tuple(files), requires=tuple(requires), scope=scope,
+                          codes=tuple(codes)))
+    return tuple(rules)
+
+
+# Shared fixes that most scripts repeated verbatim
+MUTATE_AS_ANY = (r'\.mutate\(\{([^}]+)\}\)', r'.mutate({\1} as any)')
+MUTATE_ASYNC_AS_ANY = (r'\.mutateAsync\(\{([^}]+)\}\)', r'.mutateAsync({\1} as any)')
+SET_DATA_AS_ANY = (r'set(\w+)\(data\)', r'set\1(data as any)')
+# 'id' does not exist on the untyped params object
+USE_PARAMS_ID = (r'const \{ id \} = useParams\(\);', r'const { id } = useParams() as { id: string };', PROPERTY_CODES)
+CONTROL_AS_ANY = (r'control=\{(\w+)\.control\}', r'control={\1.control as any}')
+# The negative lookahead keeps ZOD_RESOLVER_AS_ANY idempotent: without it a
+# second run appends another 'as any'. HANDLE_SUBMIT_AS_ANY needs none, since
+# its rewrite no longer ends in ')' right after the name
+ZOD_RESOLVER_AS_ANY = (r'resolver: zodResolver\((\w+)\)(?!\s*as\s*any)', r'resolver: zodResolver(\1) as any')
+HANDLE_SUBMIT_AS_ANY = (r'form\.handleSubmit\((\w+)\)', r'form.handleSubmit(\1 as any)')
+# Unknown property in an object literal / no matching overload
+REQUIRED_ERROR = (r'required_error:', r'message:', ('TS2353', 'TS2769'))
+MAP_TYPED_ANY = (r'\.map\(\((\w+): (\w+)\) =>', r'.map((\1: any) =>')
+FILTER_TYPED_ANY = (r'\.filter\(\((\w+): (\w+)\) =>', r'.filter((\1: any) =>')
+ON_SUCCESS_VARIABLES = (r'onSuccess: \(_, variables\) =>', r'onSuccess: (_: any, variables: any) =>')
+ON_SUCCESS_DATA_VARIABLES = (r'onSuccess: \(data, variables\) =>', r'onSuccess: (data: any, variables: any) =>')
+INVOICE_NO = (r'invoice\.invoiceNo', r'(invoice as any).invoiceNo')
+INVOICE_BALANCE_DUE = (r'invoice\.balanceDue', r'(invoice as any).balanceDue')
+
+# Diesel router renames shared by fix_all_final2.py, fix_final_all.py and
+# fix_trpc_final.py
+DIESEL_TRPC_FIXES = [
+    (r'trpc\.diesel\.getDieselTanks\.useQuery', r'trpc.diesel.tanks.list.useQuery'),
+    (r'trpc\.diesel\.createDieselTank\.useMutation', r'trpc.diesel.tanks.create.useMutation'),
+    (r'trpc\.diesel\.updateDieselTank\.useMutation', r'trpc.diesel.tanks.update.useMutation'),
+    (r'trpc\.diesel\.deleteDieselTank\.useMutation', r'trpc.diesel.tanks.delete.useMutation'),
+    (r'trpc\.diesel\.getDieselPumpMeters\.useQuery', r'trpc.diesel.pumpMeters.list.useQuery'),
+    (r'trpc\.diesel\.createDieselPumpMeter\.useMutation', r'trpc.diesel.pumpMeters.create.useMutation'),
+    (r'trpc\.diesel\.updateDieselPumpMeter\.useMutation', r'trpc.diesel.pumpMeters.update.useMutation'),
+    (r'trpc\.diesel\.deleteMeter\.useMutation', r'trpc.diesel.pumpMeters.delete.useMutation'),
+    (r'trpc\.diesel\.getDieselPipes\.useQuery', r'trpc.diesel.pipes.list.useQuery'),
+    (r'trpc\.diesel\.createDieselPipe\.useMutation', r'trpc.diesel.pipes.create.useMutation'),
+    (r'trpc\.diesel\.updateDieselPipe\.useMutation', r'trpc.diesel.pipes.update.useMutation'),
+    (r'trpc\.diesel\.deleteDieselPipe\.useMutation', r'trpc.diesel.pipes.delete.useMutation'),
+    (r'trpc\.diesel\.getStationDieselConfig\.useQuery', r'trpc.diesel.stationConfig.get.useQuery'),
+    (r'trpc\.diesel\.saveStationDieselConfig\.useMutation', r'trpc.diesel.stationConfig.update.useMutation'),
+]
+
+DIESEL_UTILS_FIXES = [
+    (r'utils\.diesel\.getDieselTanks\.invalidate', r'utils.diesel.tanks.list.invalidate'),
+    (r'utils\.diesel\.getDieselPumpMeters\.invalidate', r'utils.diesel.pumpMeters.list.invalidate'),
+    (r'utils\.diesel\.getDieselPipes\.invalidate', r'utils.diesel.pipes.list.invalidate'),
+]
+
+DIESEL_RECEIVING_FIXES = [
+    (r'trpc\.diesel\.getDieselSuppliers\.useQuery', r'trpc.diesel.suppliers.list.useQuery'),
+    (r'trpc\.diesel\.getDieselTankers\.useQuery', r'trpc.diesel.tankers.list.useQuery'),
+    (r'trpc\.diesel\.getDieselReceivingTasks\.useQuery', r'trpc.diesel.receivingTasks.list.useQuery'),
+    (r'trpc\.diesel\.createDieselReceivingTask\.useMutation', r'trpc.diesel.receivingTasks.create.useMutation'),
+    (r'trpc\.diesel\.completeDieselReceivingTask\.useMutation', r'trpc.diesel.receivingTasks.updateStatus.useMutation'),
+]
+
+# Diesel/organization fixes with default businessId, shared by
+# comprehensive_fix.py, fix_all_trpc.py and fix_trpc_paths.py
+BUSINESS_ID_TRPC_FIXES = [
+    (r'trpc\.diesel\.getDieselSuppliers\.useQuery\(\)', r'trpc.diesel.suppliers.list.useQuery({ businessId: 1 })'),
+    (r'trpc\.diesel\.getDieselTankers\.useQuery\(\)', r'trpc.diesel.tankers.list.useQuery({ businessId: 1 })'),
+    (r'trpc\.diesel\.getDieselTanks\.useQuery\(\)', r'trpc.diesel.tanks.list.useQuery({ businessId: 1 })'),
+    (r'trpc\.diesel\.getDieselReceivingTasks\.useQuery\(\)', r'trpc.diesel.receivingTasks.list.useQuery({ businessId: 1 })'),
+    (r'trpc\.diesel\.createDieselReceivingTask\.useMutation', r'trpc.diesel.receivingTasks.create.useMutation'),
+    (r'trpc\.diesel\.completeDieselReceivingTask\.useMutation', r'trpc.diesel.receivingTasks.updateStatus.useMutation'),
+]
+
+ORGANIZATION_TRPC_FIXES = [
+    (r'trpc\.getStations\.useQuery\(\)', r'trpc.organization.stations.list.useQuery({ businessId: 1 })'),
+    (r'trpc\.organization\.getStations\.useQuery\(\)', r'trpc.organization.stations.list.useQuery({ businessId: 1 })'),
+]
+
+JOURNALS_LIST = (r'trpc\.accounting\.journals\.list\.useQuery', r'trpc.accounting.journalEntries.list.useQuery')
+
+SCADA_TRPC_FIXES = [
+    (r'trpc\.scada\.dashboard\.useQuery', r'trpc.scada.alerts.list.useQuery'),
+    (r'trpc\.scada\.stats\.useQuery', r'trpc.scada.alerts.list.useQuery'),
+]
+
+# Renames used by fix_final.py and fix_all_final.py
+ASSETS_PIPES_TRPC_FIXES = [
+    (r'trpc\.diesel\.getDieselTanks\.useQuery', r'trpc.diesel.tanks.list.useQuery'),
+    (r'trpc\.diesel\.getDieselPumpMeters\.useQuery', r'trpc.diesel.pumpMeters.list.useQuery'),
+    (r'trpc\.diesel\.getDieselPipes\.useQuery', r'trpc.diesel.assets.pipes.list.useQuery'),
+] + SCADA_TRPC_FIXES + [JOURNALS_LIST]
+
+CALLBACK_USER_FIXES = [
+    (r'\.filter\(\((\w+): User\)', r'.filter((\1: any)'),
+    (r'\.map\(\((\w+): User\)', r'.map((\1: any)'),
+    ON_SUCCESS_VARIABLES,
+]
+
+TRANSFERS_FIXES = [
+    (r'transfers\.outgoing(?!\?)', r'(transfers as any).outgoing'),
+    (r'transfers\.incoming(?!\?)', r'(transfers as any).incoming'),
+]
+
+UNRECONCILED_TRANSFERS_FIXES = [
+    (r'unreconciledTransfers\.outgoing', r'(unreconciledTransfers as any).outgoing'),
+    (r'unreconciledTransfers\.incoming', r'(unreconciledTransfers as any).incoming'),
+]
+
+# Explicit file lists from the scripts that only touched known-bad pages
+MUTATE_FINAL_FILES = (
+    'pages/diesel/DieselTanks.tsx',
+    'pages/diesel/DieselReceiving.tsx',
+    'pages/assets/diesel/DieselPumpsAssets.tsx',
+    'pages/assets/diesel/DieselPipesAssets.tsx',
+    'pages/assets/diesel/DieselTanksAssets.tsx',
+    'pages/inventory/Items.tsx',
+    'pages/inventory/Warehouses.tsx',
+    'pages/maintenance/MaintenancePlans.tsx',
+    'pages/maintenance/WorkOrdersList.tsx',
+    'pages/organization/Stations.tsx',
+    'pages/projects/ProjectsList.tsx',
+    'pages/fieldops/FieldOperations.tsx',
+    'pages/customers/PaymentsManagement.tsx',
+    'pages/accounting/JournalEntries.tsx',
+    'pages/accounting/ChartOfAccounts.tsx',
+    'pages/accounting/GeneralLedger.tsx',
+    'pages/assets/AssetsList.tsx',
+    'pages/assets/AssetCategories.tsx',
+    'pages/Home.tsx',
+)
+
+TS2345_FINAL_FILES = (
+    'pages/assets/diesel/DieselPipesAssets.tsx',
+    'pages/assets/diesel/DieselTanksAssets.tsx',
+    'pages/billing/invoicing/MeterReadingsManagement.tsx',
+    'pages/billing/main-data/AreasManagement.tsx',
+    'pages/billing/main-data/FeeTypesManagement.tsx',
+    'pages/billing/main-data/TariffsManagement.tsx',
+    'pages/billing/payments/PaymentsManagement.tsx',
+    'pages/diesel/DieselReceiving.tsx',
+    'pages/diesel/DieselTanks.tsx',
+    'pages/diesel/DieselConfiguration.tsx',
+    'pages/assets/diesel/DieselPumpsAssets.tsx',
+    'pages/inventory/Items.tsx',
+    'pages/inventory/Warehouses.tsx',
+    'pages/maintenance/MaintenancePlans.tsx',
+    'pages/maintenance/WorkOrdersList.tsx',
+    'pages/organization/Stations.tsx',
+    'pages/projects/ProjectsList.tsx',
+    'pages/accounting/JournalEntries.tsx',
+    'pages/accounting/ChartOfAccounts.tsx',
+    'pages/accounting/GeneralLedger.tsx',
+    'pages/assets/AssetsList.tsx',
+    'pages/assets/AssetCategories.tsx',
+    'pages/fieldops/FieldOperations.tsx',
+    'pages/customers/PaymentsManagement.tsx',
+    'pages/scada/Cameras.tsx',
+    'pages/projects/GanttChart.tsx',
+    'pages/Home.tsx',
+)
+
+REMAINING_ALL_FILES = (
+    'WorkOrderDetails.tsx', 'CustomVouchers.tsx', 'CustomTreasuries.tsx',
+    'CustomReconciliation.tsx', 'CustomSubSystems.tsx', 'SubSystemDetails.tsx',
+    'DieselConfiguration.tsx', 'DieselTanks.tsx', 'DieselReceiving.tsx',
+    'DieselTanksAssets.tsx', 'DieselPumpsAssets.tsx', 'DieselPipesAssets.tsx',
+    'ProjectDetails.tsx', 'ProjectsList.tsx', 'InvoicesManagement.tsx',
+    'PaymentsManagement.tsx', 'AssetCategories.tsx', 'AssetDetails.tsx',
+    'AssetsList.tsx', 'Stations.tsx', 'Businesses.tsx', 'Warehouses.tsx',
+    'Items.tsx', 'Movements.tsx', 'MaintenancePlans.tsx', 'WorkOrdersList.tsx',
+    'Cameras.tsx', 'MonitoringDashboard.tsx', 'DashboardHome.tsx',
+    'GeneralLedger.tsx', 'ChartOfAccounts.tsx', 'JournalEntries.tsx',
+    'TrialBalance.tsx', 'TariffsManagement.tsx', 'FeeTypesManagement.tsx',
+    'AreasManagement.tsx', 'MeterReadingsManagement.tsx', 'BillingPeriods.tsx',
+    'CustomerDetails.tsx', 'CustomersManagement.tsx', 'MeterReadings.tsx',
+    'MetersManagement.tsx', 'FieldOperations.tsx', 'FieldTeams.tsx',
+    'FieldWorkers.tsx', 'GanttChart.tsx', 'Home.tsx',
+)
+
+SPECIFIC_FILES = (
+    'pages/Dashboard.tsx',
+    'pages/billing/customers/CustomersManagement.tsx',
+    'pages/custom/SubSystemDetails.tsx',
+)
+
+FINAL_BATCH_DATA_VARS = [
+    'trialBalanceData', 'ledgerData', 'stationConfig', 'asset', 'category', 'station',
+    'customer', 'invoice', 'payment', 'meter', 'reading', 'voucher', 'treasury',
+    'project', 'task', 'workOrder', 'transfers', 'config',
+]
+
+
+REGISTRY = {
+    'fix_ts_errors': rule_set('fix_ts_errors', [
+        (r'trpc\.billing\.customers\.list\.useQuery\(\s*\{\s*businessId:\s*(\d+)\s*\}\s*\)', r'trpc.billing.getCustomers.useQuery()'),
+        (r'trpc\.assets\.stats\.useQuery', r'trpc.assets.dashboardStats.useQuery'),
+        (r'trpc\.maintenance\.stats\.useQuery', r'trpc.maintenance.dashboardStats.useQuery'),
+        (r'trpc\.accounting\.stats\.useQuery', r'trpc.accounting.dashboardStats.useQuery'),
+        (r'trpc\.scada\.dashboard\.useQuery', r'trpc.scada.alerts.stats.useQuery'),
+        (r'trpc\.billing\.stats\.useQuery\([^)]*\)', r'/* billing stats removed */'),
+        (r'trpc\.accounting\.generalLedger\.useQuery', r'trpc.accounting.journals.list.useQuery'),
+        (r'trpc\.accounting\.trialBalance\.useQuery', r'trpc.accounting.dashboardStats.useQuery'),
+        (r'trpc\.diesel\.meters\.createMeter\.useMutation', r'trpc.diesel.meters.create.useMutation'),
+        (r'trpc\.diesel\.meters\.updateMeter\.useMutation', r'trpc.diesel.meters.update.useMutation'),
+        (r'trpc\.diesel\.meters\.deleteMeter\.useMutation', r'trpc.diesel.meters.delete.useMutation'),
+    ]),
+    'fix_trpc_paths': rule_set('fix_trpc_paths', BUSINESS_ID_TRPC_FIXES + [
+        (r'trpc\.diesel\.getStationDieselConfig\.useQuery', r'trpc.diesel.tanks.list.useQuery'),
+        (r'utils\.diesel\.getDieselReceivingTasks\.invalidate', r'utils.diesel.receivingTasks.list.invalidate'),
+    ] + ORGANIZATION_TRPC_FIXES + [
+        (r'trpc\.diesel\.meters\.createMeter\.useMutation', r'trpc.diesel.pumpMeters.create.useMutation'),
+        (r'trpc\.diesel\.meters\.updateMeter\.useMutation', r'trpc.diesel.pumpMeters.update.useMutation'),
+        (r'trpc\.diesel\.meters\.deleteMeter\.useMutation', r'trpc.diesel.pumpMeters.delete.useMutation'),
+        (r'trpc\.diesel\.getDieselTanks\.useQuery', r'trpc.diesel.tanks.list.useQuery'),
+        (r'trpc\.billing\.customers\.list\.useQuery', r'trpc.billing.getCustomers.useQuery'),
+    ]),
+    'fix_all_trpc': rule_set('fix_all_trpc', BUSINESS_ID_TRPC_FIXES[:3] + [
+        (r'trpc\.diesel\.getDieselTanks\.useQuery\s*\(\s*\{', r'trpc.diesel.tanks.list.useQuery({'),
+    ] + BUSINESS_ID_TRPC_FIXES[3:] + [
+        (r'trpc\.diesel\.getStationDieselConfig\.useQuery', r'trpc.diesel.stationConfig.get.useQuery'),
+        (r'utils\.diesel\.getDieselReceivingTasks\.invalidate', r'utils.diesel.receivingTasks.list.invalidate'),
+        (r'trpc\.diesel\.getDieselPumpMeters\.useQuery', r'trpc.diesel.pumpMeters.list.useQuery'),
+        (r'trpc\.diesel\.getDieselPipes\.useQuery', r'trpc.diesel.assets.pipes.list.useQuery'),
+        (r'trpc\.diesel\.pumpMeters\.createMeter\.useMutation', r'trpc.diesel.pumpMeters.create.useMutation'),
+        (r'trpc\.diesel\.pumpMeters\.updateMeter\.useMutation', r'trpc.diesel.pumpMeters.update.useMutation'),
+        (r'trpc\.diesel\.pumpMeters\.deleteMeter\.useMutation', r'trpc.diesel.pumpMeters.delete.useMutation'),
+    ] + ORGANIZATION_TRPC_FIXES + [JOURNALS_LIST] + SCADA_TRPC_FIXES + [
+        (r'invoice\.invoiceNo(?!\?)', r'(invoice as any).invoiceNo'),
+        (r'invoice\.balanceDue(?!\?)', r'(invoice as any).balanceDue'),
+    ] + TRANSFERS_FIXES + UNRECONCILED_TRANSFERS_FIXES + CALLBACK_USER_FIXES),
+    'comprehensive_fix': rule_set('comprehensive_fix', BUSINESS_ID_TRPC_FIXES + [
+        (r'trpc\.diesel\.getStationDieselConfig\.useQuery', r'trpc.diesel.tanks.list.useQuery'),
+        (r'utils\.diesel\.getDieselReceivingTasks\.invalidate', r'utils.diesel.receivingTasks.list.invalidate'),
+        (r'trpc\.diesel\.getDieselTanks\.useQuery\s*\(\s*\{', r'trpc.diesel.tanks.list.useQuery({'),
+        (r'trpc\.diesel\.meters\.createMeter\.useMutation', r'trpc.diesel.pumpMeters.create.useMutation'),
+        (r'trpc\.diesel\.meters\.updateMeter\.useMutation', r'trpc.diesel.pumpMeters.update.useMutation'),
+        (r'trpc\.diesel\.meters\.deleteMeter\.useMutation', r'trpc.diesel.pumpMeters.delete.useMutation'),
+    ] + ORGANIZATION_TRPC_FIXES + [
+        JOURNALS_LIST,
+        (r'(\w+)\.type\s*===\s*"(residential|commercial|industrial|government)"', r'(\1 as any).customerType === "\2"'),
+        (r'(\w+)\.type\s*===\s*"(asset|liability|equity|revenue|expense)"', r'(\1 as any).accountType === "\2"'),
+        (r'customer\.accountNumber(?!\?)', r'(customer as any).accountNumber'),
+        (r'payment\.accountNumber(?!\?)', r'(payment as any).accountNumber'),
+        (r'invoice\.invoiceNo(?!\?)', r'(invoice as any).invoiceNo'),
+        (r'invoice\.balanceDue(?!\?)', r'(invoice as any).balanceDue'),
+    ] + TRANSFERS_FIXES + CALLBACK_USER_FIXES),
+    'fix_type_assertions': rule_set('fix_type_assertions', [
+        (r'\.filter\(\((\w+):\s*\w+\)\s*=>', r'.filter((\1: any) =>'),
+        (r'\.map\(\((\w+):\s*\w+\)\s*=>\s*\(', r'.map((\1: any) => ('),
+        (r'\.map\(\((\w+):\s*\w+\)\s*=>\s*\{', r'.map((\1: any) => {'),
+        (r'\.find\(\((\w+):\s*\w+\)\s*=>', r'.find((\1: any) =>'),
+        (r'\.some\(\((\w+):\s*\w+\)\s*=>', r'.some((\1: any) =>'),
+        (r'\.every\(\((\w+):\s*\w+\)\s*=>', r'.every((\1: any) =>'),
+        (r'\.reduce\(\((\w+):\s*\w+,\s*(\w+):\s*\w+\)\s*=>', r'.reduce((\1: any, \2: any) =>'),
+    ]),
+    'fix_form_errors': rule_set('fix_form_errors', [
+        (r'resolver:\s*zodResolver\(([^)]+)\)(?!\s*as\s*any)', r'resolver: zodResolver(\1) as any'),
+        (r'control=\{form\.control\}(?!\s*as\s*any)', r'control={form.control as any}'),
+    ]),
+    # Only the control-prop casts were ever applied; the script's map and
+    # .type casts were defined but never called
+    'fix_all_ts_errors': rule_set('fix_all_ts_errors', [
+        (r'control=\{(\w+)Form\.control\}(?!\s*as)', r'control={\1Form.control as any}'),
+        (r'control=\{form\.control\}(?!\s*as)', r'control={form.control as any}'),
+        (r'control=\{(\w+)\.control\}(?!\s*as)', r'control={\1.control as any}'),
+    ]),
+    # Only the callback fixes were ever applied, and only to files using tRPC
+    'fix_remaining_errors': rule_set('fix_remaining_errors', [
+        (r'\.map\(\((\w+)\)\s*=>\s*\(', r'.map((\1: any) => ('),
+        (r'\.map\(\((\w+),\s*(\w+)\)\s*=>\s*\(', r'.map((\1: any, \2: number) => ('),
+        (r'\.filter\(\((\w+)\)\s*=>', r'.filter((\1: any) =>'),
+        (r'\.find\(\((\w+)\)\s*=>', r'.find((\1: any) =>'),
+        (r'\.reduce\(\((\w+),\s*(\w+)\)\s*=>', r'.reduce((\1: any, \2: any) =>'),
+    ], requires=['trpc.']),
+    'fix_all_ts': rule_set('fix_all_ts', [
+        (r'const filteredUsers = users\.filter', r'const filteredUsers = (users as any[]).filter'),
+        (r'const filtered\w+ = (\w+)\.filter\(', r'const filtered\1 = (\1 as any[]).filter('),
+        ON_SUCCESS_VARIABLES,
+        ON_SUCCESS_DATA_VARIABLES,
+        (r'(\w+)\.type\s*===\s*"(residential|commercial|industrial|government)"', r'(\1 as any).type === "\2"'),
+        (r'(\w+)\.type\s*===\s*"(asset|liability|equity|revenue|expense)"', r'(\1 as any).accountType === "\2"'),
+        (r'(?<!\?)\.accountNumber(?!\s*\?)', r'?.accountNumber'),
+        (r'(?<!\?)\.invoiceNo(?!\s*\?)', r'?.invoiceNo'),
+        (r'(?<!\?)\.balanceDue(?!\s*\?)', r'?.balanceDue'),
+    ]),
+    'fix_all_remaining': rule_set('fix_all_remaining', [
+        (r'(\w+)\.type\s*===\s*"(asset|liability|equity|revenue|expense)"', r'(\1 as any).accountType === "\2"'),
+        JOURNALS_LIST,
+        (r'trpc\.diesel\.getDieselTanks\.useQuery\s*\(\s*\{\s*stationId', r'trpc.diesel.tanks.list.useQuery({ businessId: 1, stationId'),
+        (r'(\w+)\.accountNumber(?!\s*as)', r'(\1 as any).accountNumber'),
+        (r'(\w+)\.invoiceNo(?!\s*as)', r'(\1 as any).invoiceNo'),
+        (r'(\w+)\.balanceDue(?!\s*as)', r'(\1 as any).balanceDue'),
+        (r'(\w+)\.outgoing(?!\s*as)', r'(\1 as any).outgoing'),
+        (r'(\w+)\.incoming(?!\s*as)', r'(\1 as any).incoming'),
+    ]),
+    # The broad property casts in the script were never applied; only the
+    # targeted fixes below ran, and only on the listed pages
+    'fix_remaining_all': rule_set('fix_remaining_all', [
+        CONTROL_AS_ANY,
+        ON_SUCCESS_VARIABLES,
+        ON_SUCCESS_DATA_VARIABLES,
+        USE_PARAMS_ID,
+    ], files=REMAINING_ALL_FILES),
+    'fix_zod_state': rule_set('fix_zod_state', [
+        ZOD_RESOLVER_AS_ANY,
+        SET_DATA_AS_ANY,
+        (r'set(\w+)\(response\)', r'set\1(response as any)'),
+        HANDLE_SUBMIT_AS_ANY,
+        INVOICE_NO,
+        INVOICE_BALANCE_DUE,
+        REQUIRED_ERROR,
+    ]),
+    'fix_safe': rule_set('fix_safe', [
+        MUTATE_AS_ANY,
+        MUTATE_ASYNC_AS_ANY,
+        SET_DATA_AS_ANY,
+        USE_PARAMS_ID,
+        ZOD_RESOLVER_AS_ANY,
+        HANDLE_SUBMIT_AS_ANY,
+        REQUIRED_ERROR,
+        MAP_TYPED_ANY,
+        FILTER_TYPED_ANY,
+    ]),
+    'fix_ts2345': rule_set('fix_ts2345', [
+        MUTATE_AS_ANY,
+        MUTATE_ASYNC_AS_ANY,
+        SET_DATA_AS_ANY,
+        MAP_TYPED_ANY,
+        FILTER_TYPED_ANY,
+        (r'\.useQuery\(\{ businessId: 1 \}\)', r'.useQuery({ businessId: 1 } as any)'),
+    ]),
+    'fix_ts2345_final': rule_set('fix_ts2345_final', [
+        SET_DATA_AS_ANY,
+        MUTATE_AS_ANY,
+        (r'\.useQuery\(\{([^}]+)\}\)', r'.useQuery({\1} as any)'),
+        MAP_TYPED_ANY,
+        FILTER_TYPED_ANY,
+        (r'setSelectedTank\(tank\)', r'setSelectedTank(tank as any)'),
+        (r'setEditingStation\(station\)', r'setEditingStation(station as any)'),
+    ], files=TS2345_FINAL_FILES),
+    'fix_mutate_final': rule_set('fix_mutate_final', [
+        (r'\.mutateAsync\(\{([^}]+)\}\)(?! as any)', r'.mutateAsync({\1} as any)'),
+        (r'\.filter\(t => t\.type', r'.filter((t: any) => t.type'),
+        (r'\.filter\(t => isLowLevel', r'.filter((t: any) => isLowLevel'),
+        (r'isLowLevel\(t\)', r'isLowLevel(t as any)'),
+        (r'getLevel\(t\)', r'getLevel(t as any)'),
+        (r'setEditingStation\(station\)', r'setEditingStation(station as any)'),
+    ], files=MUTATE_FINAL_FILES),
+    'fix_final': rule_set('fix_final', [
+        (r'(\w+)\.map\(\((\w+): (\w+)\) =>', r'(\1 as any[]).map((\2: any) =>'),
+        (r'(\w+)\.filter\(\((\w+): (\w+)\) =>', r'(\1 as any[]).filter((\2: any) =>'),
+        MUTATE_AS_ANY,
+        MUTATE_ASYNC_AS_ANY,
+        CONTROL_AS_ANY,
+        USE_PARAMS_ID,
+    ] + ASSETS_PIPES_TRPC_FIXES),
+    'fix_all_final': rule_set('fix_all_final', [
+        (r'(\w+)\?\.\((\w+) as any\[\]\)\.map', r'((\1 as any)?.\2 || []).map'),
+        (r'(\w+)\.data\.map\(\((\w+): any\)', r'((\1 as any).data || []).map((\2: any)'),
+    ] + ASSETS_PIPES_TRPC_FIXES + [
+        (r'transfers\.outgoing', r'(transfers as any).outgoing'),
+        (r'transfers\.incoming', r'(transfers as any).incoming'),
+    ] + UNRECONCILED_TRANSFERS_FIXES),
+    'fix_trpc_final': rule_set('fix_trpc_final', DIESEL_TRPC_FIXES + DIESEL_UTILS_FIXES + [
+        INVOICE_NO,
+        INVOICE_BALANCE_DUE,
+    ]),
+    'fix_remaining_final': rule_set('fix_remaining_final', ASSETS_PIPES_TRPC_FIXES[:3] + [
+        (r'trpc\.diesel\.createDieselTank\.useMutation', r'trpc.diesel.tanks.create.useMutation'),
+        (r'trpc\.diesel\.updateDieselTank\.useMutation', r'trpc.diesel.tanks.update.useMutation'),
+        (r'trpc\.diesel\.deleteDieselTank\.useMutation', r'trpc.diesel.tanks.delete.useMutation'),
+    ] + DIESEL_RECEIVING_FIXES + [
+        (r'trpc\.diesel\.getStationDieselConfig\.useQuery', r'trpc.diesel.stationConfig.get.useQuery'),
+        (r'utils\.diesel\.getDieselTanks\.invalidate', r'utils.diesel.tanks.list.invalidate'),
+        (r'utils\.diesel\.getDieselReceivingTasks\.invalidate', r'utils.diesel.receivingTasks.list.invalidate'),
+        (r'(\w+Data)\.(\w+)', r'(\1 as any).\2'),
+        CONTROL_AS_ANY,
+        MUTATE_AS_ANY,
+        MUTATE_ASYNC_AS_ANY,
+        USE_PARAMS_ID,
+    ]),
+    'fix_remaining_final2': (
+        rule_set('fix_remaining_final2', [
+            ('setSelectedTank(tank)', 'setSelectedTank(tank as any)'),
+            ('setEditingTank(tank)', 'setEditingTank(tank as any)'),
+        ], files=['pages/diesel/DieselTanks.tsx'], literal=True)
+        + rule_set('fix_remaining_final2', [
+            ('setEditingStation(station)', 'setEditingStation(station as any)'),
+        ], files=['pages/organization/Stations.tsx'], literal=True)
+        + rule_set('fix_remaining_final2', [
+            ('trpc.fieldOps.operations.delete.useMutation', 'trpc.fieldOps.operations.update.useMutation'),
+        ], files=['pages/fieldops/FieldOperations.tsx'], literal=True)
+    ),
+    'fix_all_final2': rule_set('fix_all_final2', DIESEL_TRPC_FIXES[:12] + [
+        (r'trpc\.diesel\.getStationDieselConfig\.useQuery', r'trpc.diesel.stationConfig.get.useQuery'),
+        (r'trpc\.diesel\.saveStationDieselConfig\.useMutation', r'trpc.diesel.stationConfig.update.useMutation'),
+    ] + DIESEL_RECEIVING_FIXES + [
+        (r'trpc\.billing\.deleteMeterReading\.useMutation', r'trpc.billing.createMeterReading.useMutation'),
+    ] + DIESEL_UTILS_FIXES + [
+        (r'utils\.diesel\.getDieselReceivingTasks\.invalidate', r'utils.diesel.receivingTasks.list.invalidate'),
+        SET_DATA_AS_ANY,
+        MUTATE_AS_ANY,
+        USE_PARAMS_ID,
+        (r'params\.id', r'(params as any)?.id'),
+        INVOICE_NO,
+        INVOICE_BALANCE_DUE,
+    ]),
+    'fix_final_all': rule_set('fix_final_all', DIESEL_TRPC_FIXES + DIESEL_RECEIVING_FIXES + [
+        (r'trpc\.fieldOps\.teams\.delete\.useMutation', r'trpc.fieldOps.teams.update.useMutation'),
+        (r'trpc\.fieldOps\.workers\.delete\.useMutation', r'trpc.fieldOps.workers.update.useMutation'),
+        (r'trpc\.projects\.ganttData\.useQuery', r'trpc.projects.list.useQuery'),
+    ] + DIESEL_UTILS_FIXES + [
+        (r'utils\.diesel\.getDieselReceivingTasks\.invalidate', r'utils.diesel.receivingTasks.list.invalidate'),
+        MUTATE_AS_ANY,
+        SET_DATA_AS_ANY,
+        (r'\.useQuery\(\{([^}]+), priority:([^}]+)\}\)', r'.useQuery({\1} as any)'),
+        (r'\.useQuery\(\{([^}]+), type:([^}]+)\}\)', r'.useQuery({\1} as any)'),
+    ]),
+    'fix_all_remaining_final': rule_set('fix_all_remaining_final', [
+        (r'trpc\.accounting\.generalLedger\.useQuery', r'trpc.accounting.accounts.list.useQuery'),
+        (r'trpc\.accounting\.trialBalance\.useQuery', r'trpc.accounting.accounts.list.useQuery'),
+        (r'trpc\.diesel\.getStationDieselConfig\.useQuery', r'trpc.diesel.stationConfig.get.useQuery'),
+        (r'trpc\.diesel\.saveStationDieselConfig\.useMutation', r'trpc.diesel.stationConfig.update.useMutation'),
+        INVOICE_NO,
+        INVOICE_BALANCE_DUE,
+        (r'transfers\.outgoing', r'(transfers as any).outgoing'),
+        (r'transfers\.incoming', r'(transfers as any).incoming'),
+        (r'stationConfig\.config', r'(stationConfig as any).config'),
+        (r'stationConfig\.path', r'(stationConfig as any).path'),
+        USE_PARAMS_ID,
+        SET_DATA_AS_ANY,
+        MUTATE_AS_ANY,
+        MAP_TYPED_ANY,
+    ]),
+    'fix_final_batch': rule_set('fix_final_batch', [
+        (rf'{var}\.(\w+)', rf'({var} as any).\1') for var in FINAL_BATCH_DATA_VARS
+    ] + [
+        MUTATE_AS_ANY,
+        ZOD_RESOLVER_AS_ANY,
+        HANDLE_SUBMIT_AS_ANY,
+    ]),
+    'fix_specific': rule_set('fix_specific', [
+        (r'(\w+)\.children\.map\(\((\w+): any\)', r'((\1 as any).children || []).map((\2: any)'),
+        (r'(\w+)\.meters\.map\(\((\w+): any\)', r'((\1 as any).meters || []).map((\2: any)'),
+        (r'transfers\.outgoing\.map\(\((\w+): any\)', r'((transfers as any).outgoing || []).map((\1: any)'),
+        (r'transfers\.incoming\.map\(\((\w+): any\)', r'((transfers as any).incoming || []).map((\1: any)'),
+        (r'unreconciledTransfers\.outgoing\.map\(\((\w+): any\)', r'((unreconciledTransfers as any).outgoing || []).map((\1: any)'),
+        (r'unreconciledTransfers\.incoming\.map\(\((\w+): any\)', r'((unreconciledTransfers as any).incoming || []).map((\1: any)'),
+        CONTROL_AS_ANY,
+        MUTATE_AS_ANY,
+        MUTATE_ASYNC_AS_ANY,
+    ], files=SPECIFIC_FILES),
+}
+
+# Order in which a full run applies the rule sets
+FIX_SEQUENCE = list(REGISTRY)
+
+
+def register(name, rules):
+    """Add a rule set to the registry, at the end of the fix sequence"""
+    rules = tuple(rules)
+    if name in REGISTRY:
+        if REGISTRY[name] == rules:
+            return
+        raise ValueError(f"Rule set {name!r} is already registered")
+    REGISTRY[name] = rules
+    FIX_SEQUENCE.append(name)
+
+
+def select(names=None):
+    """Flatten the named rule sets (default: the full sequence) in run order"""
+    names = FIX_SEQUENCE if not names else names
+    unknown = [name for name in names if name not in REGISTRY]
+    if unknown:
+        raise KeyError(f"Unknown rule set(s): {', '.join(unknown)}")
+    rules = []
+    for name in names:
+        rules.extend(REGISTRY[name])
+    return rules
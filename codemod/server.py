@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""Code actions for the open buffer, over the Language Server Protocol.
+
+A long-running process an editor starts once, talking JSON-RPC on stdio. It
+keeps the rules (with their regexes and literal anchors) and the tRPC route
+map warm, and tracks the open buffers through incremental didChange
+notifications. A textDocument/codeAction request only looks at the requested
+range and a few lines around it:
+
+- every rule matching there is offered as its own quick fix (`control`
+  casts, `useParams` typing, ...), preferred when its error codes match a
+  diagnostic on the range;
+- tRPC call sites missing from the route map are offered their nearest
+  valid procedure;
+- "Apply all codemod fixes here" applies the non-overlapping ones at once.
+
+The code map of a buffer (what is code and what is a string or a comment) is
+built at most once per version, while no request is waiting, so answering
+costs a few regex searches over a handful of lines.
+
+    python -m codemod.server                # what the editor runs
+    python -m codemod.server --log /tmp/codemod-lsp.log
+"""
+import argparse
+import json
+import os
+import re
+import select
+import sys
+import time
+from collections import namedtuple
+from urllib.parse import unquote, urlparse
+
+from .compiler import rule_anchor
+from .lexer import CodeMap
+from .lines import LineIndex
+from .routes import CALL_SITE, HOOK_KINDS, RouteIndex
+from .rulefiles import DEFAULT_RULE_DIR, RuleFileError, register_rule_files, rule_file_paths
+from .rules import select as select_rules
+
+# Lines around the requested range searched for matches spanning it
+CONTEXT_LINES = 2
+MAX_TITLE = 60
+SERVER_ROUTERS = os.sep + 'server' + os.sep
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+SERVER_NOT_INITIALIZED = -32002
+
+TEXT_DOCUMENT_SYNC_INCREMENTAL = 2
+
+# start and end are offsets into the buffer; rule is None for route fixes
+Rewrite = namedtuple('Rewrite', 'start end text title rule codes')
+
+
+class ProtocolError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def uri_to_path(uri):
+    parsed = urlparse(uri)
+    return os.path.normpath(unquote(parsed.path)) if parsed.scheme == 'file' else uri
+
+
+def _utf16_index(text, units):
+    """Index into text of a position counted in UTF-16 code units"""
+    if text.isascii():
+        return min(units, len(text))
+    count = 0
+    for index, char in enumerate(text):
+        if count >= units:
+            return index
+        count += 2 if ord(char) > 0xFFFF else 1
+    return len(text)
+
+
+def _utf16_units(text):
+    return len(text) if text.isascii() else sum(2 if ord(char) > 0xFFFF else 1 for char in text)
+
+
+class Document:
+    """An open buffer with its line index and code map, both built once per version"""
+
+    def __init__(self, uri, text, version=0):
+        self.uri = uri
+        self.path = uri_to_path(uri)
+        self.text = text
+        self.version = version
+        self._lines = None
+        self._code_map = None
+
+    @property
+    def lines(self):
+        if self._lines is None:
+            self._lines = LineIndex(self.text)
+        return self._lines
+
+    @property
+    def code_map(self):
+        if self._code_map is None:
+            self._code_map = CodeMap(self.text, jsx=self.path.endswith('.tsx'))
+        return self._code_map
+
+    @property
+    def warm(self):
+        return self._code_map is not None
+
+    def _line_text(self, line):
+        # line is 1-based; without its newline
+        start = self.lines.line_start(line)
+        end = self.lines.line_end(line)
+        return self.text[start:end].rstrip('\r\n')
+
+    def offset(self, position):
+        """Offset of an LSP position (0-based line, UTF-16 character)"""
+        line = position['line'] + 1
+        if line > self.lines.line_count:
+            return len(self.text)
+        return self.lines.line_start(line) + _utf16_index(self._line_text(line), position['character'])
+
+    def position(self, offset):
+        line = self.lines.line_of(offset)
+        start = self.lines.line_start(line)
+        return {'line': line - 1, 'character': _utf16_units(self.text[start:offset])}
+
+    def range(self, start, end):
+        return {'start': self.position(start), 'end': self.position(end)}
+
+    def change(self, changes, version):
+        for change in changes:
+            if 'range' not in change:
+                self.text = change['text']
+            else:
+                start = self.offset(change['range']['start'])
+                end = self.offset(change['range']['end'])
+                self.text = self.text[:start] + change['text'] + self.text[end:]
+            self._lines = None
+        self._code_map = None
+        self.version = version
+
+
+def _title(old, new):
+    def short(text):
+        text = ' '.join(text.split())
+        return text if len(text) <= MAX_TITLE else text[:MAX_TITLE - 1] + '…'
+    return f"Replace `{short(old)}` with `{short(new)}`"
+
+
+class CodeActions:
+    """The warm state: each distinct rule with its regex and anchor, and the route map"""
+
+    def __init__(self, rules, route_index=None):
+        self.entries = []
+        seen = set()
+        for rule in rules:
+            key = (rule.pattern, rule.replacement, rule.literal, rule.scope, rule.files, rule.requires)
+            if key in seen:
+                continue
+            seen.add(key)
+            regex = re.compile(re.escape(rule.pattern) if rule.literal else rule.pattern)
+            self.entries.append((rule, regex, rule_anchor(rule)))
+        self.route_index = route_index
+        self.route_map = route_index.load() if route_index is not None else None
+        self._applies = {}
+
+    def reload_routes(self):
+        if self.route_index is not None:
+            self.route_map = self.route_index.load()
+
+    def _applies_to(self, rule, path):
+        if not rule.files:
+            return True
+        key = (rule.files, path)
+        result = self._applies.get(key)
+        if result is None:
+            result = self._applies[key] = rule.applies_to(path)
+        return result
+
+    def rewrites(self, doc, start, end):
+        """[Rewrite] for the matches overlapping [start, end] of the buffer"""
+        lines = doc.lines
+        first = max(1, lines.line_of(start) - CONTEXT_LINES)
+        last = min(lines.line_count, lines.line_of(end) + CONTEXT_LINES)
+        base = lines.line_start(first)
+        segment = doc.text[base:lines.line_end(last)]
+        found = {}
+        for rule, regex, anchor in self.entries:
+            if anchor is not None and anchor not in segment:
+                continue
+            if not self._applies_to(rule, doc.path):
+                continue
+            if rule.requires and not all(required in doc.text for required in rule.requires):
+                continue
+            for match in regex.finditer(segment):
+                match_start = base + match.start()
+                match_end = base + match.end()
+                if match_start > end or match_end < start:
+                    continue
+                if rule.scope == 'code' and not doc.code_map.is_code(match_start):
+                    continue
+                text = rule.replacement if rule.literal else match.expand(rule.replacement)
+                key = (match_start, match_end, text)
+                if key not in found:
+                    found[key] = Rewrite(match_start, match_end, text, _title(match.group(), text),
+                                         rule, rule.codes)
+        if self.route_map is not None:
+            for match in CALL_SITE.finditer(segment):
+                if base + match.start() > end or base + match.end() < start:
+                    continue
+                if match.group(2) in self.route_map:
+                    continue
+                path_start = base + match.start(2)
+                path_end = base + match.end(2)
+                target = self.route_map.nearest(match.group(2), HOOK_KINDS[match.group(3)])
+                if target is None or not doc.code_map.is_code(base + match.start()):
+                    continue
+                key = (path_start, path_end, target)
+                found.setdefault(key, Rewrite(
+                    path_start, path_end, target,
+                    f"Use {match.group(1)}.{target}.{match.group(3)} (route map)", None,
+                    ('TS2339', 'TS2551')))
+        return list(found.values())
+
+    def actions(self, doc, start, end, diagnostics=()):
+        """LSP CodeAction objects for the range, preferred ones first"""
+        codes = {}
+        for diagnostic in diagnostics:
+            code = diagnostic.get('code')
+            if code is None:
+                continue
+            code = str(code)
+            code = code if code.startswith('TS') else 'TS' + code
+            codes.setdefault(code, []).append(diagnostic)
+        rewrites = self.rewrites(doc, start, end)
+        actions = []
+        for order, rewrite in enumerate(rewrites):
+            matched = [diagnostic for code in rewrite.codes for diagnostic in codes.get(code, ())]
+            action = {
+                'title': rewrite.title,
+                'kind': 'quickfix',
+                'edit': {'changes': {doc.uri: [
+                    {'range': doc.range(rewrite.start, rewrite.end), 'newText': rewrite.text}]}},
+            }
+            if matched:
+                action['diagnostics'] = matched
+                action['isPreferred'] = True
+            actions.append((not matched, rewrite.start, order, action))
+        actions.sort(key=lambda item: item[:3])
+        result = [action for *_, action in actions]
+        combined = self._non_overlapping(rewrites)
+        if len(combined) > 1:
+            result.append({
+                'title': f"Apply all codemod fixes here ({len(combined)})",
+                'kind': 'quickfix',
+                'edit': {'changes': {doc.uri: [
+                    {'range': doc.range(rewrite.start, rewrite.end), 'newText': rewrite.text}
+                    for rewrite in combined]}},
+            })
+        return result
+
+    @staticmethod
+    def _non_overlapping(rewrites):
+        # In rule order, the way a run would apply them; later overlapping ones are dropped
+        taken = []
+        for rewrite in rewrites:
+            if all(rewrite.end <= other.start or other.end <= rewrite.start for other in taken):
+                taken.append(rewrite)
+        return sorted(taken, key=lambda rewrite: rewrite.start)
+
+
+class Connection:
+    """Content-Length framed JSON-RPC messages over a pair of file descriptors"""
+
+    def __init__(self, infile, outfile):
+        self.fd = infile.fileno()
+        self.outfile = outfile
+        self.buffer = bytearray()
+
+    def _message_in_buffer(self):
+        header_end = self.buffer.find(b'\r\n\r\n')
+        if header_end < 0:
+            return None
+        length = None
+        for line in bytes(self.buffer[:header_end]).split(b'\r\n'):
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == b'content-length':
+                length = int(value.strip())
+        if length is None:
+            raise ProtocolError(PARSE_ERROR, 'missing Content-Length header')
+        body_start = header_end + 4
+        if len(self.buffer) < body_start + length:
+            return None
+        body = bytes(self.buffer[body_start:body_start + length])
+        del self.buffer[:body_start + length]
+        return body
+
+    def pending(self):
+        """True if a message is waiting to be read"""
+        if b'\r\n\r\n' in self.buffer:
+            return True
+        readable, _, _ = select.select([self.fd], [], [], 0)
+        return bool(readable)
+
+    def read(self):
+        """The next message, or None at end of input"""
+        while True:
+            body = self._message_in_buffer()
+            if body is not None:
+                try:
+                    return json.loads(body)
+                except ValueError as e:
+                    raise ProtocolError(PARSE_ERROR, f'invalid JSON: {e}')
+            chunk = os.read(self.fd, 65536)
+            if not chunk:
+                return None
+            self.buffer.extend(chunk)
+
+    def write(self, message):
+        body = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.outfile.write(b'Content-Length: %d\r\n\r\n' % len(body) + body)
+        self.outfile.flush()
+
+
+class Server:
+    def __init__(self, actions, connection, log=None):
+        self.actions = actions
+        self.connection = connection
+        self.log = log
+        self.documents = {}
+        self.initialized = False
+        self.shutdown_requested = False
+        self.exit_code = None
+        self.handlers = {
+            'initialize': self.initialize,
+            'initialized': lambda params: None,
+            'shutdown': self.shutdown,
+            'exit': self.exit,
+            'textDocument/didOpen': self.did_open,
+            'textDocument/didChange': self.did_change,
+            'textDocument/didSave': self.did_save,
+            'textDocument/didClose': self.did_close,
+            'textDocument/codeAction': self.code_action,
+        }
+
+    def serve(self):
+        """Answer messages until exit (or end of input); returns the exit status"""
+        while self.exit_code is None:
+            # Lex changed buffers while the editor is not waiting on us
+            cold = [doc for doc in self.documents.values() if not doc.warm]
+            if cold and not self.connection.pending():
+                cold[0].code_map
+                continue
+            try:
+                message = self.connection.read()
+            except ProtocolError as e:
+                self.connection.write({'jsonrpc': '2.0', 'id': None,
+                                       'error': {'code': e.code, 'message': str(e)}})
+                continue
+            if message is None:
+                return 0 if self.shutdown_requested else 1
+            self.dispatch(message)
+        return self.exit_code
+
+    def dispatch(self, message):
+        method = message.get('method')
+        request_id = message.get('id')
+        is_request = 'id' in message
+        start = time.perf_counter()
+        try:
+            if not isinstance(method, str):
+                raise ProtocolError(INVALID_REQUEST, 'missing method')
+            if not self.initialized and method not in ('initialize', 'exit'):
+                raise ProtocolError(SERVER_NOT_INITIALIZED, 'initialize first')
+            handler = self.handlers.get(method)
+            if handler is None:
+                if not is_request:
+                    return   # $/cancelRequest, $/setTrace, ... need no answer
+                raise ProtocolError(METHOD_NOT_FOUND, f'unknown method {method}')
+            result = handler(message.get('params') or {})
+            if is_request:
+                self.connection.write({'jsonrpc': '2.0', 'id': request_id, 'result': result})
+        except ProtocolError as e:
+            if is_request:
+                self.connection.write({'jsonrpc': '2.0', 'id': request_id,
+                                       'error': {'code': e.code, 'message': str(e)}})
+        except Exception as e:
+            if is_request:
+                self.connection.write({'jsonrpc': '2.0', 'id': request_id,
+                                       'error': {'code': INTERNAL_ERROR, 'message': f'{type(e).__name__}: {e}'}})
+        finally:
+            if self.log is not None:
+                self.log.write(f"{method} {(time.perf_counter() - start) * 1000:.2f}ms\n")
+                self.log.flush()
+
+    def initialize(self, params):
+        self.initialized = True
+        return {
+            'capabilities': {
+                'textDocumentSync': {'openClose': True, 'change': TEXT_DOCUMENT_SYNC_INCREMENTAL,
+                                     'save': True},
+                'codeActionProvider': {'codeActionKinds': ['quickfix']},
+            },
+            'serverInfo': {'name': 'codemod'},
+        }
+
+    def shutdown(self, params):
+        self.shutdown_requested = True
+        return None
+
+    def exit(self, params):
+        self.exit_code = 0 if self.shutdown_requested else 1
+
+    def did_open(self, params):
+        item = params['textDocument']
+        self.documents[item['uri']] = Document(item['uri'], item['text'], item.get('version', 0))
+
+    def did_change(self, params):
+        doc = self.documents.get(params['textDocument']['uri'])
+        if doc is not None:
+            doc.change(params['contentChanges'], params['textDocument'].get('version', doc.version + 1))
+
+    def did_save(self, params):
+        # A saved router can add the procedure a call site was missing
+        path = uri_to_path(params['textDocument']['uri'])
+        if SERVER_ROUTERS in path and path.endswith('.ts'):
+            self.actions.reload_routes()
+
+    def did_close(self, params):
+        self.documents.pop(params['textDocument']['uri'], None)
+
+    def code_action(self, params):
+        doc = self.documents.get(params['textDocument']['uri'])
+        if doc is None:
+            return []
+        start = doc.offset(params['range']['start'])
+        end = doc.offset(params['range']['end'])
+        diagnostics = params.get('context', {}).get('diagnostics', ())
+        return self.actions.actions(doc, start, end, diagnostics)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m codemod.server',
+                                     description='Serve the codemod rules as LSP code actions on stdio.')
+    parser.add_argument('rule_sets', nargs='*', metavar='RULE_SET',
+                        help='rule sets to offer (default: the full fix sequence)')
+    parser.add_argument('--rules-dir', default=DEFAULT_RULE_DIR, metavar='DIR',
+                        help='directory of TOML rule files (default: codemod/rulesets)')
+    parser.add_argument('--no-routes', action='store_true',
+                        help='do not offer tRPC call site fixes from the server route map')
+    parser.add_argument('--log', metavar='PATH', help='append each message and its handling time to PATH')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        register_rule_files(rule_file_paths(args.rules_dir))
+        rules = select_rules(args.rule_sets)
+    except (OSError, RuleFileError) as e:
+        print(f"Cannot load rule files: {e}", file=sys.stderr)
+        return 2
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+    actions = CodeActions(rules, None if args.no_routes else RouteIndex())
+    log = open(args.log, 'a', encoding='utf-8') if args.log else None
+    try:
+        return Server(actions, Connection(sys.stdin.buffer, sys.stdout.buffer), log).serve()
+    finally:
+        if log is not None:
+            log.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+from codemod.lexer import CODE, COMMENT, JSX_TEXT, STRING, TEMPLATE, CodeMap, code_only, scan_spans
+
+
+def kinds(content, jsx=True):
+    return [(kind, content[start:end]) for kind, start, end in scan_spans(content, jsx=jsx)]
+
+
+def test_spans_cover_the_content_in_order():
+    content = 'const a = "x"; // note\nconst b = `t ${a} u`;\n'
+    spans = scan_spans(content)
+    assert spans[0][1] == 0 and spans[-1][2] == len(content)
+    assert all(prev[2] == nxt[1] for prev, nxt in zip(spans, spans[1:]))
+
+
+def test_strings_comments_and_templates():
+    content = "a('it\\'s'); /* c */ b(`x ${y('z')} w`); // end"
+    assert kinds(content) == [
+        (CODE, 'a('), (STRING, "'it\\'s'"), (CODE, '); '), (COMMENT, '/* c */'),
+        (CODE, ' b('), (TEMPLATE, '`x ${'), (CODE, 'y('), (STRING, "'z'"), (CODE, ')'),
+        (TEMPLATE, '} w`'), (CODE, '); '), (COMMENT, '// end'),
+    ]
+    code = code_only(content)
+    assert "it's" not in code and '/* c */' not in code and 'y(' in code
+    assert len(code) == len(content)
+
+
+def test_regex_literal_and_division():
+    content = 'const r = /a"b/g; const d = x / y / z;'
+    assert (STRING, '/a"b/g') in kinds(content)
+    assert code_only(content).endswith('const d = x / y / z;')
+
+
+def test_jsx_text_is_not_code():
+    content = 'const e = <p className="a">Don\'t call trpc.x.y.useQuery()</p>; f();'
+    code = code_only(content, jsx=True)
+    assert 'trpc.x.y.useQuery' not in code
+    assert code.endswith('</p>; f();')
+    assert (JSX_TEXT, "Don't call trpc.x.y.useQuery()") in kinds(content)
+
+
+def test_jsx_expressions_are_code():
+    content = '<div>{items.map((i) => <b key={i}>{i}</b>)}</div>'
+    assert 'items.map((i) =>' in code_only(content)
+
+
+def test_generic_arrow_functions_are_not_jsx():
+    content = ('const f = <T,>(x: T) => x.map((a) => a);\n'
+               'const g = <T extends object>(x: T) => x;\n'
+               'const h = <div>text</div>;\n')
+    code = code_only(content)
+    assert 'x.map((a) => a)' in code
+    assert 'const g = <T extends object>(x: T) => x;' in code
+    assert 'text' not in code
+
+
+def test_comparisons_are_not_jsx():
+    content = 'if (a < b && c > d) { e(); }'
+    assert code_only(content) == content
+
+
+def test_jsx_off_for_ts_files():
+    content = 'const x = <Foo>bar;'
+    assert code_only(content, jsx=False) == content
+
+
+def test_code_map_answers_by_offset():
+    content = 'a("b") // c'
+    code_map = CodeMap(content)
+    assert code_map.is_code(0)
+    assert not code_map.is_code(content.index('b'))
+    assert not code_map.is_code(content.index('c'))
@@ -0,0 +1,68 @@
+import re
+
+from codemod.compiler import compile_rules, literal_text, required_literals, rule_anchor
+from codemod.rules import Rule, select
+
+
+def test_literal_text():
+    assert literal_text(r'trpc\.diesel\.getDieselTanks') == 'trpc.diesel.getDieselTanks'
+    assert literal_text(r'set(\w+)\(data\)') is None
+    assert literal_text(r'\bword') is None
+
+
+def test_required_literals():
+    assert required_literals(r'\.mutate\(\{([^}]+)\}\)') == ['.mutate({', '})']
+    # An optional character ends the run without joining it
+    assert required_literals(r'abcd?ef') == ['abc', 'ef']
+    assert required_literals(r'(?:foo)?bar') == ['bar']
+    assert required_literals(r'x(?!yz)w') == ['x', 'w']
+    assert required_literals(r'foo|bar') == []
+
+
+def test_anchor_prefers_the_longest_literal_and_requires():
+    assert rule_anchor(Rule(r'set(\w+)\(data\)', 'x')) == '(data)'
+    assert rule_anchor(Rule(r'(\w+)\.x', 'y', requires=('trpc.',))) == 'trpc.'
+    assert rule_anchor(Rule(r'a(\w+)b', 'y')) is None
+
+
+def test_inline_flags_disable_the_anchor():
+    for pattern in (r'(?i)FooBar\.x', r'(?x) Foo Bar', r'a(?i:FooBar)', r'(?s-i:FooBar)'):
+        assert rule_anchor(Rule(pattern, 'y')) is None, pattern
+    # An escaped parenthesis is not a flag group
+    assert rule_anchor(Rule(r'\(?iFooBar', 'y')) == 'iFooBar'
+    assert rule_anchor(Rule(r'(?i)FooBar\.x', 'y', requires=('foo',))) == 'foo'
+    rules = compile_rules([Rule(r'(?i)FooBar\.x', 'y')])
+    assert rules.apply('foobar.x = 1', 'a.ts') == 'y = 1'
+
+
+def test_every_anchor_occurs_in_every_match():
+    # The prefilter is only sound if no match can lack its rule's anchor
+    samples = {
+        r'\.mutate\(\{([^}]+)\}\)': 'a.mutate({ id: 1 })',
+        r'trpc\.diesel\.getDieselTanks\.useQuery\s*\(\s*\{': 'trpc.diesel.getDieselTanks.useQuery( {',
+        r'control=\{(\w+)\.control\}(?!\s*as)': 'control={form.control}',
+    }
+    for pattern, text in samples.items():
+        match = re.search(pattern, text)
+        anchor = rule_anchor(Rule(pattern, ''))
+        assert match and anchor and anchor in match.group(0), pattern
+
+
+def test_prefiltered_plan_matches_plain_re_sub():
+    content = ('const m = trpc.diesel.getDieselTanks.useQuery();\n'
+               'x.mutate({ id: 1 });\n'
+               'setRows(data);\n'
+               '<FormField control={form.control} />\n')
+    rules = select()
+    # The fix sequence applied rule by rule, as the old scripts did; the
+    # content is all code, so scoping does not change anything here
+    plain = content
+    for rule in rules:
+        if not rule.applies_to('pages/X.tsx') or not all(text in plain for text in rule.requires):
+            continue
+        if rule.literal:
+            plain = plain.replace(rule.pattern, rule.replacement)
+        else:
+            plain = re.sub(rule.pattern, rule.replacement, plain)
+    assert plain != content
+    assert compile_rules(rules).apply(content, 'pages/X.tsx') == plain
@@ -0,0 +1,51 @@
+import os
+import re
+
+from codemod.rulefiles import parse_rule_file
+from codemod.rules import Rule, file_glob
+
+README = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'README.md')
+
+
+def _readme_rule_file(tmp_path):
+    with open(README, 'r', encoding='utf-8') as f:
+        block = re.search(r'```toml\n(# (codemod/rulesets/\S+)\n.*?)```', f.read(), re.DOTALL)
+    path = tmp_path / os.path.basename(block.group(2))
+    path.write_text(block.group(1), encoding='utf-8')
+    return parse_rule_file(str(path))
+
+
+def test_readme_example_matches_every_depth(tmp_path):
+    name, rules = _readme_rule_file(tmp_path)
+    assert name == 'fix_invoice_total'
+    rule = rules[0]
+    assert rule.files == ('pages/billing/**/*.tsx',)
+    for path in ('client/src/pages/billing/BillingDashboard.tsx',
+                 'client/src/pages/billing/invoicing/InvoicesManagement.tsx',
+                 'client/src/pages/billing/a/b/c/Deep.tsx'):
+        assert rule.applies_to(path), path
+    for path in ('client/src/pages/billing/utils.ts',
+                 'client/src/pages/billingx/Page.tsx',
+                 'client/src/pages/customers/Billing.tsx'):
+        assert not rule.applies_to(path), path
+
+
+def test_plain_paths_match_as_a_suffix_of_whole_directories():
+    rule = Rule('a', 'b', files=('pages/diesel/DieselTanks.tsx', 'Home.tsx'))
+    assert rule.applies_to('client/src/pages/diesel/DieselTanks.tsx')
+    assert rule.applies_to('client\\src\\pages\\Home.tsx')
+    assert not rule.applies_to('client/src/xpages/diesel/DieselTanks.tsx')
+    assert not rule.applies_to('client/src/pages/MyHome.tsx')
+
+
+def test_single_star_and_classes_stay_within_a_directory():
+    assert file_glob('pages/*.tsx').search('src/pages/Home.tsx')
+    assert not file_glob('pages/*.tsx').search('src/pages/billing/Home.tsx')
+    assert file_glob('Page[0-9].tsx').search('a/Page7.tsx')
+    assert not file_glob('Page[!0-9].tsx').search('a/Page7.tsx')
+    assert file_glob('/abs/**').search('/abs/x/y.ts')
+    assert not file_glob('/abs/**').search('/other/abs/x.ts')
+
+
+def test_rules_without_files_apply_everywhere():
+    assert Rule('a', 'b').applies_to('anything.ts')
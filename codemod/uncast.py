@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""Find the `as any` casts tsc no longer needs, with as few compiles as possible.
+
+Candidates are the casts the fix scripts inserted:
+
+- `(invoice as any).total`    -> `invoice.total`
+- `.mutate({...} as any)`      -> `.mutate({...})`  (also `as any[]`)
+- `.map((item: any) =>`        -> `.map((item) =>`
+
+Every removal only changes types, never runtime behaviour, so `tsc --noEmit`
+is the whole check. A baseline compile records the errors the tree already
+has; a set of removals is safe when compiling the tree with them applied
+reports no error the baseline did not have.
+
+Removals are checked in groups and failing groups are split in half
+(adaptive group testing), so N candidates of which k are still needed cost
+about k * log2(N) compiles instead of N. Safe removals accumulate, so every
+check also covers their interactions. tsc runs with --incremental, so each
+compile only re-checks what changed.
+
+The result is a unified patch of the safe removals, applied with
+`git apply` and undone with `git apply -R`; the tree itself is restored
+after every check.
+
+    python -m codemod.uncast --list
+    python -m codemod.uncast --patch uncast.patch
+"""
+import argparse
+import os
+import re
+import shlex
+import subprocess
+import sys
+import time
+from collections import Counter, namedtuple
+
+from .cache import REPO_ROOT
+from .diagnostics import ANSI_ESCAPE, DIAGNOSTIC_LINE
+from .discovery import GitError, git_toplevel, walk_files
+from .journal import DEFAULT_JOURNAL_DIR, WriteBatch, stage, undo_record, write_atomic
+from .lexer import code_only
+from .lines import LineIndex
+from .patch import apply_edits, unified_diff
+
+CLIENT_SRC = os.path.join(REPO_ROOT, 'client', 'src')
+DEFAULT_PATCH = os.path.join(REPO_ROOT, '.codemod', 'uncast.patch')
+DEFAULT_TSC = 'npx --no-install tsc --noEmit --pretty false --incremental'
+
+# (invoice as any).total: the parentheses only exist for the cast. Not after
+# a name or closing bracket, where they are a call's parentheses
+PAREN_CAST = re.compile(r'(?<![\w$)\]])\(([\w$]+(?:\.[\w$]+)*) as any(?:\[\])?\)')
+SUFFIX_CAST = re.compile(r' as any(?:\[\])?(?![\w$\[])')
+PARAM_ANY = re.compile(r'(?<=[(,])(\s*[\w$]+): any(?=\s*[,)])')
+
+Candidate = namedtuple('Candidate', 'filepath start end replacement line kind')
+
+
+class TscError(Exception):
+    pass
+
+
+def find_candidates(filepath, content):
+    """Removable casts in the code of one file, in offset order"""
+    code = code_only(content, jsx=filepath.endswith('.tsx'))
+    lines = LineIndex(content)
+    found = []
+    covered = []
+    for match in PAREN_CAST.finditer(code):
+        found.append(Candidate(filepath, match.start(), match.end(), match.group(1),
+                               lines.line_of(match.start()), 'paren'))
+        covered.append((match.start(), match.end()))
+    for match in SUFFIX_CAST.finditer(code):
+        if any(start <= match.start() < end for start, end in covered):
+            continue
+        found.append(Candidate(filepath, match.start(), match.end(), '',
+                               lines.line_of(match.start()), 'as any'))
+    for match in PARAM_ANY.finditer(code):
+        found.append(Candidate(filepath, match.start(), match.end(), match.group(1),
+                               lines.line_of(match.start()), 'param'))
+    return sorted(found, key=lambda candidate: candidate.start)
+
+
+def diagnostic_counts(output, root):
+    """Counter of (file, line, error code) in tsc output"""
+    counts = Counter()
+    for raw in output.splitlines():
+        match = DIAGNOSTIC_LINE.match(ANSI_ESCAPE.sub('', raw))
+        if match is not None:
+            filepath = os.path.normpath(os.path.join(root, match.group('path').strip()))
+            counts[filepath, int(match.group('line') or match.group('line2')), match.group('code')] += 1
+    return counts
+
+
+class Tsc:
+    """Runs the type checker and counts its diagnostics"""
+
+    def __init__(self, command=DEFAULT_TSC, cwd=REPO_ROOT):
+        self.command = shlex.split(command)
+        self.cwd = cwd
+        self.runs = 0
+        self.seconds = 0.0
+
+    def check(self):
+        start = time.perf_counter()
+        try:
+            completed = subprocess.run(self.command, cwd=self.cwd, capture_output=True, text=True,
+                                       encoding='utf-8', errors='replace')
+        except FileNotFoundError as e:
+            raise TscError(f"cannot run {self.command[0]}: {e}")
+        self.runs += 1
+        self.seconds += time.perf_counter() - start
+        output = completed.stdout + completed.stderr
+        counts = diagnostic_counts(output, self.cwd)
+        if completed.returncode and not counts:
+            # Failed without a single diagnostic: tsc itself did not run
+            raise TscError(output.strip()[-2000:] or f"exit status {completed.returncode}")
+        return counts
+
+
+class Bisector:
+    """Group testing of candidate removals against a baseline compile"""
+
+    def __init__(self, candidates, contents, tsc, progress=None):
+        self.candidates = candidates
+        self.contents = contents
+        self.tsc = tsc
+        self.progress = progress
+        self.accepted = []
+        self.rejected = []
+        self.written = set()
+        self.baseline = None
+
+    def _write(self, selected):
+        edits = {}
+        for candidate in selected:
+            edits.setdefault(candidate.filepath, []).append(
+                (candidate.start, candidate.end, candidate.replacement))
+        for filepath in sorted(self.written | set(edits)):
+            file_edits = sorted(edits.get(filepath, ()))
+            write_atomic(filepath, apply_edits(self.contents[filepath], file_edits))
+        self.written = set(edits)
+
+    def restore(self):
+        for filepath in self.written:
+            write_atomic(filepath, self.contents[filepath])
+        self.written = set()
+
+    def _passes(self, group):
+        self._write(self.accepted + group)
+        counts = self.tsc.check()
+        new = counts - self.baseline
+        if self.progress is not None:
+            self.progress(self, group, not new)
+        return not new
+
+    def _bisect(self, group, known_bad=False):
+        if not known_bad and self._passes(group):
+            self.accepted.extend(group)
+            return
+        if len(group) == 1:
+            self.rejected.extend(group)
+            return
+        middle = len(group) // 2
+        left, right = group[:middle], group[middle:]
+        left_passed = self._passes(left)
+        if left_passed:
+            self.accepted.extend(left)
+        else:
+            self._bisect(left, known_bad=True)
+        # The whole group failed, so with a clean left half the right half must fail
+        self._bisect(right, known_bad=left_passed)
+
+    def run(self, group_size=0):
+        try:
+            self.restore()
+            self.baseline = self.tsc.check()
+            size = group_size or len(self.candidates) or 1
+            for start in range(0, len(self.candidates), size):
+                self._bisect(self.candidates[start:start + size])
+        finally:
+            self.restore()
+        self.accepted.sort(key=lambda candidate: (candidate.filepath, candidate.start))
+        return self.accepted
+
+
+def write_patch(accepted, contents, path, root=REPO_ROOT):
+    """Write the accepted removals as a patch for `git apply` (and `git apply -R`)"""
+    by_file = {}
+    for candidate in accepted:
+        by_file.setdefault(candidate.filepath, []).append(
+            (candidate.start, candidate.end, candidate.replacement))
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for filepath in sorted(by_file):
+            name = os.path.relpath(filepath, root).replace(os.sep, '/')
+            f.writelines(unified_diff(contents[filepath], by_file[filepath], f'a/{name}', f'b/{name}'))
+
+
+def apply_removals(accepted, contents, journal_dir=DEFAULT_JOURNAL_DIR):
+    """Commit the accepted removals to the tree with an undo journal; returns its path"""
+    by_file = {}
+    for candidate in accepted:
+        by_file.setdefault(candidate.filepath, []).append(
+            (candidate.start, candidate.end, candidate.replacement))
+    batch = WriteBatch(journal_dir, description=f'uncast: {len(accepted)} casts removed')
+    try:
+        for filepath, edits in sorted(by_file.items()):
+            updated = apply_edits(contents[filepath], edits)
+            batch.add(filepath, stage(filepath, updated), undo_record(filepath, contents[filepath], updated))
+    except BaseException:
+        batch.discard()
+        raise
+    return batch.commit()
+
+
+def collect(root, limit=0):
+    contents = {}
+    candidates = []
+    for filepath in walk_files(root):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+        found = find_candidates(filepath, content)
+        if found:
+            contents[filepath] = content
+            candidates.extend(found)
+        if limit and len(candidates) >= limit:
+            return candidates[:limit], contents
+    return candidates, contents
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m codemod.uncast',
+                                     description='Find `as any` casts tsc no longer needs.')
+    parser.add_argument('--root', default=CLIENT_SRC, help='directory to search (default: client/src)')
+    parser.add_argument('--tsc', default=DEFAULT_TSC, metavar='COMMAND',
+                        help=f'type check command, run from the repository root (default: {DEFAULT_TSC})')
+    parser.add_argument('--patch', default=DEFAULT_PATCH, metavar='PATH',
+                        help='where to write the patch of safe removals (default: .codemod/uncast.patch)')
+    parser.add_argument('--apply', action='store_true',
+                        help='also remove the safe casts from the tree (undo with --rollback)')
+    parser.add_argument('--group-size', type=int, default=0, metavar='N',
+                        help='check candidates in groups of at most N (default: all at once)')
+    parser.add_argument('--limit', type=int, default=0, metavar='N',
+                        help='only consider the first N candidates')
+    parser.add_argument('--list', action='store_true', help='list the candidates and exit')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    candidates, contents = collect(args.root, args.limit)
+    if args.list:
+        for candidate in candidates:
+            print(f"{os.path.relpath(candidate.filepath, REPO_ROOT)}:{candidate.line}: {candidate.kind}")
+        print(f"{len(candidates)} candidates in {len(contents)} files")
+        return 0
+    if not candidates:
+        print("No candidates")
+        return 0
+
+    def progress(bisector, group, passed):
+        print(f"compile {bisector.tsc.runs}: {len(group)} removals {'safe' if passed else 'rejected'} "
+              f"({len(bisector.accepted)} safe, {len(bisector.rejected)} needed so far)")
+
+    tsc = Tsc(args.tsc)
+    bisector = Bisector(candidates, contents, tsc, progress)
+    print(f"{len(candidates)} candidates in {len(contents)} files")
+    try:
+        accepted = bisector.run(args.group_size)
+    except TscError as e:
+        print(f"Type check failed to run: {e}")
+        return 2
+    print(f"\n{len(accepted)} casts can be removed, {len(bisector.rejected)} are still needed "
+          f"({tsc.runs} compiles, {tsc.seconds:.1f}s)")
+    if accepted:
+        try:
+            patch_root = git_toplevel(args.root)
+        except GitError:
+            patch_root = REPO_ROOT
+        write_patch(accepted, contents, args.patch, patch_root)
+        print(f"Patch: {args.patch} (git apply; git apply -R to undo)")
+        if args.apply:
+            journal = apply_removals(accepted, contents)
+            print(f"Applied; undo journal: {journal}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
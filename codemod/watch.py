@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Watch mode: apply the rules to each file as soon as it is saved.
+
+The rules are compiled once and the content hash of every file seen is kept
+in memory, so a save costs one read, one pass of the rules and (if anything
+changed) one atomic write, whatever the size of the tree. Events are
+debounced: an editor that writes a file in several steps, or a branch switch
+that touches many files, is handled as one batch once the tree is quiet.
+
+On Linux the tree is watched with inotify (through ctypes, no extra
+dependency); elsewhere, or when inotify is unavailable, it falls back to
+polling the mtimes of the tree.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+from .cache import rules_fingerprint
+from .engine import CLIENT_SRC, EXTENSIONS, SKIP_DIRS, ensure_compiled, iter_files, process_file
+from .journal import WriteBatch
+
+# Seconds without events before a batch of changes is processed
+DEFAULT_DEBOUNCE = 0.03
+# A steady stream of events is still flushed at least this often
+MAX_DEBOUNCE = 1.0
+DEFAULT_POLL_INTERVAL = 0.5
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class Overflow(Exception):
+    """The kernel dropped events; the whole tree has to be rescanned"""
+
+
+def _watched_file(name):
+    return name.endswith(EXTENSIONS) and not name.startswith('.')
+
+
+class InotifyWatcher:
+    """Recursive inotify watch of a directory tree"""
+
+    def __init__(self, root):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.dirs = {}
+        self.add_tree(root)
+
+    def add_tree(self, root):
+        """Watch root and every directory below it; returns the files found"""
+        found = []
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise OSError(error, 'inotify watch limit reached (fs.inotify.max_user_watches)')
+                continue
+            self.dirs[wd] = directory
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        stack.append(entry.path)
+                elif _watched_file(entry.name):
+                    found.append(entry.path)
+        return found
+
+    def read(self, timeout):
+        """Paths of files written or moved in within timeout seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                raise Overflow()
+            if mask & (IN_IGNORED | IN_DELETE_SELF):
+                self.dirs.pop(wd, None)
+                continue
+            directory = self.dirs.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and name not in SKIP_DIRS:
+                    # Files written before the watch was added would be missed
+                    changed.update(self.add_tree(path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and _watched_file(name):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback that compares the size and mtime of every file on each poll"""
+
+    def __init__(self, root, interval=DEFAULT_POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self.stats = self._snapshot()
+
+    def _snapshot(self):
+        stats = {}
+        for filepath in iter_files(self.root):
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                continue
+            stats[filepath] = (st.st_size, st.st_mtime_ns)
+        return stats
+
+    def read(self, timeout):
+        time.sleep(min(timeout, self.interval) if timeout is not None else self.interval)
+        stats = self._snapshot()
+        changed = {path for path, stat in stats.items() if self.stats.get(path) != stat}
+        self.stats = stats
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_watcher(root, poll=None):
+    """An InotifyWatcher, or a PollingWatcher when poll is set or inotify is unavailable"""
+    if poll is None:
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), polling instead")
+    return PollingWatcher(root, poll or DEFAULT_POLL_INTERVAL)
+
+
+class Session:
+    """Compiled rules and the last known state of each file"""
+
+    def __init__(self, rules, budget=None, journal_dir=None):
+        self.rules = ensure_compiled(rules)
+        self.budget = budget
+        self.journal_dir = journal_dir
+        self.fingerprint = rules_fingerprint(self.rules.rules, 'watch')
+        # Manifest-style entries (hash, size, mtime) of the content last seen
+        # clean or written, so process_file can skip a file without reading it
+        # again
+        self.entries = {}
+
+    def process(self, paths):
+        """Apply the rules to paths; returns [(filepath, seconds, result)]"""
+        batch = WriteBatch(self.journal_dir, description=f'watch: {len(self.rules.rules)} rules')
+        outcomes = []
+        try:
+            for filepath in sorted(paths):
+                start = time.perf_counter()
+                if not os.path.isfile(filepath):
+                    # Deleted or renamed away since the event
+                    self.entries.pop(filepath, None)
+                    continue
+                # Our own writes, and saves that did not change the content,
+                # come back as events too; process_file skips them
+                result = process_file(filepath, self.rules, self.fingerprint, self.entries.get(filepath),
+                                      budget=self.budget, batch=True, journal=self.journal_dir is not None)
+                if result.entry is None:
+                    self.entries.pop(filepath, None)
+                else:
+                    self.entries[filepath] = result.entry
+                if result.skipped:
+                    continue
+                if result.fixed:
+                    batch.add(filepath, result.staged, result.undo)
+                outcomes.append((filepath, time.perf_counter() - start, result))
+        except BaseException:
+            batch.discard()
+            raise
+        batch.commit()
+        for filepath, _, result in outcomes:
+            if result.fixed:
+                # The stat of our own write, so its event is skipped unread;
+                # with no hash, a later save is always processed
+                st = os.stat(filepath)
+                self.entries[filepath] = {'hash': None, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                                          'rules': self.fingerprint}
+        return outcomes
+
+
+def _collect(watcher, debounce):
+    """Block until a change, then gather events until the tree is quiet"""
+    changed = set()
+    while not changed:
+        changed = watcher.read(None)
+    deadline = time.monotonic() + MAX_DEBOUNCE
+    while time.monotonic() < deadline:
+        more = watcher.read(debounce)
+        if not more:
+            break
+        changed |= more
+    return changed
+
+
+def watch(rules, root=CLIENT_SRC, debounce=DEFAULT_DEBOUNCE, poll=None, budget=None,
+          journal_dir=None):
+    """Apply rules to files under root whenever they change, until interrupted"""
+    session = Session(rules, budget, journal_dir)
+    watcher = open_watcher(root, poll)
+    kind = 'inotify' if isinstance(watcher, InotifyWatcher) else f'polling every {watcher.interval:g}s'
+    print(f"Watching {root} ({kind}, {len(session.rules.rules)} rules); Ctrl-C to stop")
+    try:
+        while True:
+            try:
+                changed = _collect(watcher, debounce)
+            except Overflow:
+                print("Event queue overflowed, rescanning the tree")
+                changed = set(iter_files(root))
+            for filepath, seconds, result in session.process(changed):
+                if result.error is not None:
+                    print(f"Error processing {filepath}: {result.error}")
+                elif result.fixed:
+                    print(f"Fixed: {filepath} ({seconds * 1000:.1f} ms)")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
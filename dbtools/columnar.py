@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+"""Convert the COPY data of a pg_dump into memory-mappable column files.
+
+Every table becomes a directory with one NumPy `.npy` file per column, so an
+aggregate over invoices or meter readings is a scan of one flat array
+instead of a database restore:
+
+    out/manifest.json
+    out/public.invoices/total_amount.npy          int64, scaled by 10**2
+    out/public.invoices/total_amount.valid.npy    bool, only if the column has nulls
+    out/public.invoices/customer_name.offsets.npy int64, rows + 1 offsets into...
+    out/public.invoices/customer_name.npy         uint8, the UTF-8 text of all rows
+
+Column types come from the dump's CREATE TABLE statements: integers keep
+their width, numeric(p,s) with p <= 18 is an int64 scaled by 10**s (exact,
+unlike float), date is datetime64[D], timestamp datetime64[us] (UTC for
+timestamptz), boolean bool, real/double float. Everything else, including
+json and enums, is text in the Arrow string layout. A null, or a value the
+column type cannot hold (an `infinity` timestamp), is stored as zero with its
+valid flag cleared.
+
+The dump is streamed once. Each COPY block is cut into chunks of rows that a
+process pool converts column by column (one C-level map per column, not a
+Python loop per field), and the chunks are appended to the column files in
+dump order as they come back. The .npy files are written directly, so
+converting needs no third-party package; numpy.load(path, mmap_mode='r')
+maps them, and ColumnarDump maps them with or without numpy installed.
+
+    python -m dbtools.columnar database_backup.sql analytics/ -j 4
+    python -m dbtools.columnar dump.sql.gz analytics/ --tables invoices,meter_readings
+"""
+import argparse
+import ast
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from collections import deque, namedtuple
+from datetime import date, datetime, time as time_of_day, timedelta, timezone
+from functools import lru_cache, partial
+from itertools import accumulate, islice, repeat
+
+from .pgdump import DumpFormatError, DumpReader, base_type, qualified_name, unescape
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+DEFAULT_CHUNK_ROWS = 50_000
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+# Room for the header of any column, so it can be rewritten in place once
+# the row count is known; a multiple of 64 keeps the data aligned
+NPY_HEADER_SIZE = 128
+MAX_SCALED_PRECISION = 18
+NUMERIC_MODIFIER = re.compile(r'numeric\s*\(\s*(\d+)\s*,\s*(\d+)\s*\)', re.IGNORECASE)
+UNSAFE_FILE_CHARACTERS = re.compile(r'[^\w.-]')
+
+# kind names the conversion; dtype is the .npy descr of the stored values and
+# typecode the array module's code for them; scale is set for scaled decimals
+ColumnSpec = namedtuple('ColumnSpec', 'name type kind dtype typecode scale')
+# One converted column of one chunk: values as bytes (or the UTF-8 text),
+# chunk-relative offsets for text, valid flags if any row is null
+ColumnChunk = namedtuple('ColumnChunk', 'data offsets valid nulls rejected')
+
+FIXED_TYPES = {
+    'smallint': ('int', '<i2', 'h'), 'int2': ('int', '<i2', 'h'), 'smallserial': ('int', '<i2', 'h'),
+    'integer': ('int', '<i4', 'i'), 'int': ('int', '<i4', 'i'), 'int4': ('int', '<i4', 'i'),
+    'serial': ('int', '<i4', 'i'),
+    'bigint': ('int', '<i8', 'q'), 'int8': ('int', '<i8', 'q'), 'bigserial': ('int', '<i8', 'q'),
+    'oid': ('int', '<i8', 'q'),
+    'real': ('float', '<f4', 'f'), 'float4': ('float', '<f4', 'f'),
+    'double precision': ('float', '<f8', 'd'), 'float8': ('float', '<f8', 'd'),
+    'boolean': ('bool', '|b1', 'B'), 'bool': ('bool', '|b1', 'B'),
+    'date': ('date', '<M8[D]', 'q'),
+    'timestamp without time zone': ('timestamp', '<M8[us]', 'q'), 'timestamp': ('timestamp', '<M8[us]', 'q'),
+    'timestamp with time zone': ('timestamptz', '<M8[us]', 'q'), 'timestamptz': ('timestamptz', '<M8[us]', 'q'),
+    'time without time zone': ('time', '<m8[us]', 'q'), 'time': ('time', '<m8[us]', 'q'),
+}
+# What a memoryview over a .npy file's data is cast to without numpy
+TYPECODES = {'<i2': 'h', '<i4': 'i', '<i8': 'q', '<f4': 'f', '<f8': 'd', '|b1': '?', '|u1': 'B',
+             '<M8[D]': 'q', '<M8[us]': 'q', '<m8[us]': 'q'}
+# Text stored in place of a null, converting to zero
+ZERO_TEXT = {'int': '0', 'float': '0', 'bool': 'f', 'decimal': '0', 'date': '1970-01-01',
+             'timestamp': '1970-01-01 00:00:00', 'timestamptz': '1970-01-01 00:00:00+00',
+             'time': '00:00:00', 'text': ''}
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+EPOCH_DAY = date(1970, 1, 1).toordinal()
+MICROSECOND = timedelta(microseconds=1)
+CONVERSION_ERRORS = (ValueError, ArithmeticError, LookupError, TypeError)
+
+
+def _days(text):
+    return date.fromisoformat(text).toordinal() - EPOCH_DAY
+
+
+def _micros(text):
+    return (datetime.fromisoformat(text) - EPOCH) // MICROSECOND
+
+
+def _utc_micros(text):
+    value = datetime.fromisoformat(text)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - EPOCH_UTC) // MICROSECOND
+
+
+def _time_micros(text):
+    value = time_of_day.fromisoformat(text)
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000 + value.microsecond
+
+
+def _scaled_converter(scale):
+    """'-12.5' -> -1250 for scale 2, without going through Decimal"""
+    def convert(text):
+        whole, _, fraction = text.partition('.')
+        if len(fraction) > scale:
+            raise ValueError(f"{text} has more than {scale} decimals")
+        return int(whole + fraction.ljust(scale, '0'))
+    return convert
+
+
+CONVERTERS = {
+    'int': int, 'float': float, 'bool': {'t': 1, 'f': 0}.__getitem__,
+    'date': _days, 'timestamp': _micros, 'timestamptz': _utc_micros, 'time': _time_micros,
+}
+
+
+def _dates(values):
+    return map(EPOCH_DAY.__rsub__, map(date.toordinal, map(date.fromisoformat, values)))
+
+
+def _timestamps(values):
+    return map(MICROSECOND.__rfloordiv__, map(EPOCH.__rsub__, map(datetime.fromisoformat, values)))
+
+
+def _utc_timestamps(values):
+    # A timestamp without an offset fails the subtraction and goes through _utc_micros
+    return map(MICROSECOND.__rfloordiv__, map(EPOCH_UTC.__rsub__, map(datetime.fromisoformat, values)))
+
+
+# The same conversions as whole-column map chains, with no Python frame per
+# value; CONVERTERS is the per-value fallback when one of them fails
+COLUMN_CONVERTERS = {'date': _dates, 'timestamp': _timestamps, 'timestamptz': _utc_timestamps}
+
+
+@lru_cache(maxsize=None)
+def _decimal_pattern(scale):
+    number = rf'-?\d+\.\d{{{scale}}}'
+    return re.compile(rf'{number}(?:\n{number})*')
+
+
+def column_spec(name, type_name):
+    """How a column of a pg type is stored"""
+    base = base_type(type_name)
+    if base in FIXED_TYPES:
+        kind, dtype, typecode = FIXED_TYPES[base]
+        return ColumnSpec(name, type_name, kind, dtype, typecode, None)
+    if base in ('numeric', 'decimal'):
+        modifier = NUMERIC_MODIFIER.search(type_name.replace('decimal', 'numeric'))
+        if modifier is not None and int(modifier.group(1)) <= MAX_SCALED_PRECISION:
+            return ColumnSpec(name, type_name, 'decimal', '<i8', 'q', int(modifier.group(2)))
+        return ColumnSpec(name, type_name, 'float', '<f8', 'd', None)
+    return ColumnSpec(name, type_name, 'text', '|u1', 'B', None)
+
+
+def table_specs(block):
+    """ColumnSpecs for the columns of a CopyBlock, in COPY order"""
+    specs = []
+    for name in block.columns:
+        column = block.table_info.column(name) if block.table_info is not None else None
+        specs.append(column_spec(name, column.type if column is not None else 'text'))
+    return specs
+
+
+def _encode_each(convert, typecode, values, valid):
+    # A value the column cannot hold becomes a null instead of failing the chunk
+    encoded = array(typecode)
+    valid = bytearray(valid if valid is not None else b'\x01' * len(values))
+    rejected = 0
+    for position, value in enumerate(values):
+        try:
+            encoded.append(convert(value))
+        except CONVERSION_ERRORS:
+            encoded.append(0)
+            if valid[position]:
+                valid[position] = 0
+                rejected += 1
+    return encoded.tobytes(), bytes(valid), rejected
+
+
+def _scaled_decimals(values, scale):
+    """Whole-column scaling, for pg_dump's output of exactly `scale` decimals"""
+    if scale == 0:
+        return map(int, values)
+    if _decimal_pattern(scale).fullmatch('\n'.join(values)) is None:
+        raise ValueError(f"not all values have {scale} decimals")
+    return map(int, map(str.replace, values, repeat('.'), repeat('')))
+
+
+def _converters(spec):
+    """(whole-column conversion, per-value fallback) for a typed column"""
+    if spec.kind == 'decimal':
+        return partial(_scaled_decimals, scale=spec.scale), _scaled_converter(spec.scale)
+    convert = CONVERTERS[spec.kind]
+    return COLUMN_CONVERTERS.get(spec.kind, partial(map, convert)), convert
+
+
+def _encode_column(spec, values):
+    valid = None
+    nulls = values.count('\\N')
+    if nulls:
+        valid = bytes(value != '\\N' for value in values)
+        zero = ZERO_TEXT[spec.kind]
+        if spec.kind == 'decimal' and spec.scale:
+            zero = '0.' + '0' * spec.scale
+        values = [zero if value == '\\N' else value for value in values]
+    if spec.kind == 'text':
+        encoded = [(unescape(value) if '\\' in value else value).encode() for value in values]
+        offsets = array('q', accumulate(map(len, encoded), initial=0))
+        return ColumnChunk(b''.join(encoded), offsets, valid, nulls, 0)
+    convert_column, convert = _converters(spec)
+    try:
+        data = array(spec.typecode, convert_column(values)).tobytes()
+        rejected = 0
+    except CONVERSION_ERRORS:
+        data, valid, rejected = _encode_each(convert, spec.typecode, values, valid)
+    return ColumnChunk(data, None, valid, nulls, rejected)
+
+
+def convert_chunk(table, first_row, specs, lines):
+    """(rows, [ColumnChunk per column]) for COPY text lines of one table; runs in the pool"""
+    width = len(specs)
+    if set(map(str.count, lines, repeat('\t'))) != {width - 1}:
+        for number, line in enumerate(lines):
+            count = line.count('\t') + 1
+            if count != width:
+                raise DumpFormatError(f"{table}: row {first_row + number} has {count} fields, expected {width}")
+    # One split of the whole chunk; every width-th field is a column
+    fields = '\t'.join(lines).split('\t')
+    columns = [fields[position::width] for position in range(width)]
+    return len(lines), [_encode_column(spec, values) for spec, values in zip(specs, columns)]
+
+
+def npy_header(dtype, count):
+    header = f"{{'descr': '{dtype}', 'fortran_order': False, 'shape': ({count},), }}"
+    header = header.ljust(NPY_HEADER_SIZE - len(NPY_MAGIC) - 3) + '\n'
+    return NPY_MAGIC + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+class NpyWriter:
+    """A one-dimensional .npy file written in pieces; the header is finished on close"""
+
+    def __init__(self, path, dtype):
+        self.path = path
+        self.dtype = dtype
+        self.count = 0
+        self._file = open(path, 'wb')
+        self._file.write(b'\0' * NPY_HEADER_SIZE)
+
+    def write(self, data, count):
+        self._file.write(data)
+        self.count += count
+
+    def close(self):
+        self._file.seek(0)
+        self._file.write(npy_header(self.dtype, self.count))
+        self._file.close()
+
+    def abort(self):
+        self._file.close()
+
+
+class _ColumnFiles:
+    def __init__(self, directory, spec, filename):
+        self.spec = spec
+        self.directory = directory
+        self.filename = filename
+        self.values = NpyWriter(os.path.join(directory, f'{filename}.npy'), spec.dtype)
+        self.offsets = None
+        if spec.kind == 'text':
+            self.offsets = NpyWriter(os.path.join(directory, f'{filename}.offsets.npy'), '<i8')
+            self.offsets.write(array('q', [0]).tobytes(), 1)
+        self.valid = None
+        self.nulls = 0
+        self.rejected = 0
+
+    def append(self, rows_before, rows, chunk):
+        if self.offsets is None:
+            self.values.write(chunk.data, rows)
+        else:
+            base = self.values.count
+            offsets = chunk.offsets[1:]
+            if base:
+                offsets = array('q', [offset + base for offset in offsets])
+            self.offsets.write(offsets.tobytes(), rows)
+            self.values.write(chunk.data, len(chunk.data))
+        if chunk.valid is not None and self.valid is None:
+            # First null of the column: every earlier row was valid
+            self.valid = NpyWriter(os.path.join(self.directory, f'{self.filename}.valid.npy'), '|b1')
+            self.valid.write(b'\x01' * rows_before, rows_before)
+        if self.valid is not None:
+            self.valid.write(chunk.valid if chunk.valid is not None else b'\x01' * rows, rows)
+        self.nulls += chunk.nulls
+        self.rejected += chunk.rejected
+
+    def writers(self):
+        return [writer for writer in (self.values, self.offsets, self.valid) if writer is not None]
+
+    def manifest(self):
+        entry = {'name': self.spec.name, 'type': self.spec.type, 'kind': self.spec.kind,
+                 'dtype': self.spec.dtype, 'values': os.path.basename(self.values.path),
+                 'nulls': self.nulls, 'rejected': self.rejected}
+        if self.spec.scale is not None:
+            entry['scale'] = self.spec.scale
+        if self.offsets is not None:
+            entry['offsets'] = os.path.basename(self.offsets.path)
+        if self.valid is not None:
+            entry['valid'] = os.path.basename(self.valid.path)
+        return entry
+
+
+def _file_names(names):
+    used = set()
+    result = []
+    for position, name in enumerate(names):
+        filename = UNSAFE_FILE_CHARACTERS.sub('_', name) or f'column{position}'
+        if filename.lower() in used:
+            filename = f'{filename}_{position}'
+        used.add(filename.lower())
+        result.append(filename)
+    return result
+
+
+class TableWriter:
+    """The column files of one table, appended to chunk by chunk in row order"""
+
+    def __init__(self, directory, table, specs):
+        self.table = table
+        self.rows = 0
+        self.directory = os.path.join(directory, UNSAFE_FILE_CHARACTERS.sub('_', table))
+        os.makedirs(self.directory, exist_ok=True)
+        self.columns = [_ColumnFiles(self.directory, spec, filename)
+                        for spec, filename in zip(specs, _file_names([spec.name for spec in specs]))]
+
+    def append(self, rows, chunks):
+        for column, chunk in zip(self.columns, chunks):
+            column.append(self.rows, rows, chunk)
+        self.rows += rows
+
+    def close(self):
+        """Finish the files; returns the table's manifest entry"""
+        for column in self.columns:
+            for writer in column.writers():
+                writer.close()
+        return {'name': self.table, 'directory': os.path.basename(self.directory), 'rows': self.rows,
+                'primary_key': [], 'columns': [column.manifest() for column in self.columns]}
+
+    def abort(self):
+        for column in self.columns:
+            for writer in column.writers():
+                writer.abort()
+
+
+def _chunks(lines, size):
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _drain(pending, manifest, limit):
+    # Results are taken in submission order, so each table's rows stay in dump order
+    while len(pending) > limit:
+        writer, future = pending.popleft()
+        if future is None:
+            manifest['tables'][writer.table] = writer.close()
+        else:
+            writer.append(*future.result())
+
+
+def write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    os.replace(path + '.tmp', path)
+
+
+def convert_dump(path, directory, tables=None, jobs=1, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Convert the COPY data of a pg_dump into column files under directory
+
+    tables limits the conversion to those table names. Returns the manifest,
+    which is written last: a directory without one holds no finished
+    conversion.
+    """
+    os.makedirs(directory, exist_ok=True)
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        os.remove(os.path.join(directory, MANIFEST))
+    wanted = None if tables is None else {qualified_name(name) for name in tables}
+    manifest = {'format': FORMAT_VERSION, 'source': os.path.abspath(path), 'tables': {}}
+    reader = DumpReader(path, typed=False)
+    pool = None
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=jobs)
+    # (TableWriter, future of a chunk, or None once the table's chunks are all queued)
+    pending = deque()
+    writers = []
+    try:
+        for block in reader.copy_blocks():
+            if wanted is not None and block.table not in wanted:
+                continue
+            specs = table_specs(block)
+            writer = TableWriter(directory, block.table, specs)
+            writers.append(writer)
+            for lines in _chunks(block.raw(), chunk_rows):
+                task = (block.table, block.rows_read - len(lines) + 1, specs, lines)
+                if pool is None:
+                    writer.append(*convert_chunk(*task))
+                else:
+                    pending.append((writer, pool.submit(convert_chunk, *task)))
+                    # A few chunks per worker in flight keeps the pool busy in bounded memory
+                    _drain(pending, manifest, jobs * 2)
+            pending.append((writer, None))
+            _drain(pending, manifest, jobs * 2 if pool is not None else 0)
+        _drain(pending, manifest, 0)
+    except BaseException:
+        for writer in writers:
+            if writer.table not in manifest['tables']:
+                writer.abort()
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    # pg_dump adds primary keys after the data
+    for name, entry in manifest['tables'].items():
+        info = reader.tables.get(name)
+        if info is not None:
+            entry['primary_key'] = list(info.primary_key)
+    write_manifest(directory, manifest)
+    return manifest
+
+
+def load_npy(path):
+    """A read-only memory map of a .npy file: a numpy array, or a memoryview without numpy"""
+    if numpy is not None:
+        return numpy.load(path, mmap_mode='r')
+    with open(path, 'rb') as f:
+        prefix = f.read(len(NPY_MAGIC) + 2)
+        if prefix[:6] != NPY_MAGIC[:6]:
+            raise ValueError(f"{path} is not a .npy file")
+        header_length = struct.unpack('<H', prefix[-2:])[0]
+        header = ast.literal_eval(f.read(header_length).decode('latin1'))
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if sys.byteorder != 'little' and header['descr'].startswith('<'):
+        raise ValueError(f"{path}: little-endian data needs numpy on this machine")
+    typecode = TYPECODES[header['descr']]
+    start = len(NPY_MAGIC) + 2 + header_length
+    count = header['shape'][0]
+    return memoryview(mapped)[start:start + count * struct.calcsize(typecode)].cast(typecode)
+
+
+class TextColumn:
+    """The rows of a text column, decoded on access; None for nulls"""
+
+    def __init__(self, offsets, data, valid=None):
+        self.offsets = offsets
+        self.data = data
+        self.valid = valid
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += len(self)
+        if self.valid is not None and not self.valid[row]:
+            return None
+        return bytes(self.data[int(self.offsets[row]):int(self.offsets[row + 1])]).decode()
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+
+class ColumnarTable:
+    """One converted table: its columns are memory-mapped when first used"""
+
+    def __init__(self, directory, entry):
+        self.name = entry['name']
+        self.rows = entry['rows']
+        self.primary_key = tuple(entry['primary_key'])
+        self.directory = os.path.join(directory, entry['directory'])
+        self._entries = {column['name']: column for column in entry['columns']}
+        self.columns = list(self._entries)
+        self._arrays = {}
+
+    def _load(self, filename):
+        if filename not in self._arrays:
+            self._arrays[filename] = load_npy(os.path.join(self.directory, filename))
+        return self._arrays[filename]
+
+    def entry(self, name):
+        try:
+            return self._entries[name]
+        except KeyError:
+            raise KeyError(f"{self.name} has no column {name}") from None
+
+    def column(self, name):
+        """The stored values: an array (decimals still scaled) or a TextColumn"""
+        entry = self.entry(name)
+        values = self._load(entry['values'])
+        if entry['kind'] == 'text':
+            return TextColumn(self._load(entry['offsets']), values, self.valid(name))
+        return values
+
+    def valid(self, name):
+        """The column's valid flags, or None if it has no nulls"""
+        entry = self.entry(name)
+        return self._load(entry['valid']) if 'valid' in entry else None
+
+    def scale(self, name):
+        """Power of ten a decimal column is scaled by, or None"""
+        return self.entry(name).get('scale')
+
+    def __repr__(self):
+        return f"ColumnarTable({self.name!r}, {self.rows} rows, {len(self.columns)} columns)"
+
+
+class ColumnarDump:
+    """The tables of a directory written by convert_dump"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != FORMAT_VERSION:
+            raise ValueError(f"{directory}: unsupported columnar format {self.manifest.get('format')}")
+        self.tables = {name: ColumnarTable(directory, entry) for name, entry in self.manifest['tables'].items()}
+
+    def table(self, name):
+        try:
+            return self.tables[qualified_name(name)]
+        except KeyError:
+            raise KeyError(f"{self.directory} has no table {name}") from None
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(directory) for name in files)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m dbtools.columnar',
+                                     description='Convert the data of a pg_dump into memory-mappable column files.')
+    parser.add_argument('dump', help='pg_dump file (plain format, .sql or .sql.gz)')
+    parser.add_argument('output', help='directory for the column files and manifest.json')
+    parser.add_argument('--tables', metavar='A,B', help='only convert these tables')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, metavar='N',
+                        help=f'rows converted per task (default: {DEFAULT_CHUNK_ROWS})')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    tables = args.tables.split(',') if args.tables else None
+    start = time.perf_counter()
+    try:
+        manifest = convert_dump(args.dump, args.output, tables, max(1, args.jobs), max(1, args.chunk_rows))
+    except (OSError, DumpFormatError) as e:
+        print(f"Cannot convert {args.dump}: {e}")
+        return 2
+    seconds = time.perf_counter() - start
+    for table in manifest['tables'].values():
+        notes = [f"{column['name']}: {column['rejected']} values not {column['kind']}"
+                 for column in table['columns'] if column['rejected']]
+        print(f"{table['name']}: {table['rows']} rows, {len(table['columns'])} columns"
+              + (f" ({'; '.join(notes)})" if notes else ''))
+    size = os.path.getsize(args.dump)
+    print(f"\n{len(manifest['tables'])} tables, {sum(t['rows'] for t in manifest['tables'].values())} rows "
+          f"-> {args.output} ({directory_size(args.output) / 1e6:.1f} MB)")
+    print(f"{size / 1e6:.1f} MB in {seconds:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
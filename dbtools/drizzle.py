@@ -0,0 +1,708 @@
+#!/usr/bin/env python3
+"""Read the tables of Drizzle ORM schema files without running TypeScript.
+
+drizzle/schema.ts declares every PostgreSQL table as a pgTable call, and
+drizzle/customer-system-schema.ts and drizzle/schemas/*.ts declare the MySQL
+ones as mysqlTable calls:
+
+    export const branches = pgTable("branches", {
+      id: serial("id").primaryKey(),
+      code: varchar("code", { length: 20 }).notNull(),
+      latitude: numeric("latitude", { precision: 10, scale: 8 }),
+      ...
+    }, (table) => ({
+      codeIdx: uniqueIndex("branches_code_idx").on(table.businessId, table.code),
+    }));
+
+load_model turns them into a SchemaModel: tables with their columns (SQL
+name, TypeScript property, type, nullability, default, enum values), indexes,
+primary keys and foreign keys, the last taken from `.references()`,
+`foreignKey()` and the `one(..., { fields, references })` of relations().
+Types are spelled the way each database's dump spells them:
+'character varying(20)', 'numeric(10,8)', 'timestamp without time zone' for
+pgTable, 'varchar(20)', 'decimal(10,8)', "enum('a','b')" for mysqlTable.
+
+    model = load_model()
+    model.table('customers').column('business_id').type     # 'integer'
+
+Strings and comments are blanked with codemod.lexer before the calls are
+matched, so a bracket or comma inside a string cannot throw the scan off;
+names and literals are then read from the source at the same offsets.
+
+Parsing schema.ts takes a quarter of a second, so each file's model is
+pickled to .dbtools/drizzle/, keyed by a hash of the file's content, of this
+module and of the lexer. A file seen before is hashed and unpickled in a few
+milliseconds; foreign keys across files are resolved after loading.
+
+    python -m dbtools.drizzle
+    python -m dbtools.drizzle --table customers
+    python -m dbtools.drizzle drizzle/schemas/*.ts --column business_id
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import tempfile
+import time
+from typing import NamedTuple
+
+from .pgdump import Column, Table
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(REPO_ROOT, '.dbtools', 'drizzle')
+DEFAULT_FILES = (os.path.join('drizzle', 'schema.ts'), os.path.join('drizzle', 'customer-system-schema.ts'))
+# Artifacts kept for older versions of the files
+MAX_ARTIFACTS = 64
+SOURCES = (os.path.abspath(__file__), os.path.join(REPO_ROOT, 'codemod', 'lexer.py'))
+
+TABLE_CALL = re.compile(r'\b(?:export\s+)?const\s+([\w$]+)\s*=\s*(pgTable|mysqlTable)\s*\(')
+ENUM_CALL = re.compile(r'\b(?:export\s+)?const\s+([\w$]+)\s*=\s*pgEnum\s*\(')
+RELATIONS_CALL = re.compile(r'\brelations\s*\(')
+ONE_CALL = re.compile(r'\bone\s*\(')
+CALL = re.compile(r'\s*\.?\s*([\w$]+)\s*(?:<[^()]*>)?\s*\(')
+PROPERTY = re.compile(r'\s*([\w$]+)\s*:')
+FIELD = re.compile(r'([\w$]+)\s*:\s*(\[[^\]]*\]|[^,}]+)')
+MEMBER = re.compile(r'([\w$]+)\s*\.\s*([\w$]+)\s*$')
+ARROW_MEMBER = re.compile(r'=>\s*([\w$]+)\s*\.\s*([\w$]+)')
+NOT_NEWLINE = re.compile(r'[^\n]')
+STRING = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'')
+OPENING = {'(': ')', '[': ']', '{': '}'}
+CLOSING = {')', ']', '}'}
+
+PG = 'pg'
+MYSQL = 'mysql'
+DIALECTS = {'pgTable': PG, 'mysqlTable': MYSQL}
+
+# Drizzle column builders and how each database's dump spells their types
+PG_TYPES = {
+    'serial': 'integer', 'smallserial': 'smallint', 'bigserial': 'bigint',
+    'integer': 'integer', 'smallint': 'smallint', 'bigint': 'bigint',
+    'real': 'real', 'doublePrecision': 'double precision',
+    'numeric': 'numeric', 'decimal': 'numeric',
+    'varchar': 'character varying', 'char': 'character', 'text': 'text',
+    'boolean': 'boolean', 'date': 'date', 'time': 'time without time zone',
+    'timestamp': 'timestamp without time zone', 'interval': 'interval',
+    'json': 'json', 'jsonb': 'jsonb', 'uuid': 'uuid',
+}
+MYSQL_TYPES = {
+    'int': 'int', 'tinyint': 'tinyint', 'smallint': 'smallint', 'mediumint': 'mediumint', 'bigint': 'bigint',
+    'serial': 'serial', 'float': 'float', 'double': 'double', 'real': 'real', 'decimal': 'decimal',
+    'varchar': 'varchar', 'char': 'char', 'text': 'text', 'tinytext': 'tinytext',
+    'mediumtext': 'mediumtext', 'longtext': 'longtext', 'boolean': 'boolean',
+    'date': 'date', 'datetime': 'datetime', 'timestamp': 'timestamp', 'time': 'time', 'year': 'year',
+    'json': 'json', 'binary': 'binary', 'varbinary': 'varbinary',
+}
+SERIAL_TYPES = {'serial', 'smallserial', 'bigserial'}
+LENGTH_TYPES = {'varchar', 'char', 'binary', 'varbinary'}
+DECIMAL_TYPES = {'numeric', 'decimal'}
+# Index builders of a table's extra config, and whether they are unique
+INDEX_BUILDERS = {'index': False, 'uniqueIndex': True, 'unique': True}
+
+
+class SchemaError(ValueError):
+    """A table definition the reader cannot follow"""
+
+
+class SchemaColumn(NamedTuple):
+    name: str
+    property: str
+    builder: str
+    type: str
+    nullable: bool
+    default: object
+    primary_key: bool
+    unique: bool
+    autoincrement: bool
+    enum: object
+    line: int
+
+
+class Index(NamedTuple):
+    name: str
+    columns: tuple
+    unique: bool
+
+
+class ForeignKey(NamedTuple):
+    columns: tuple
+    table: str
+    references: tuple
+    source: str
+
+
+class Reference(NamedTuple):
+    """A foreign key as written, in TypeScript variables and properties"""
+    variable: str
+    properties: tuple
+    target: str
+    target_properties: tuple
+    source: str
+    line: int
+
+
+class SchemaTable:
+    def __init__(self, name, variable, dialect, path, line, columns):
+        self.name = name
+        self.variable = variable
+        self.dialect = dialect
+        self.path = path
+        self.line = line
+        self.columns = columns
+        self.indexes = []
+        self.primary_key = ()
+        self.foreign_keys = []
+
+    def column(self, name):
+        """The column with this SQL name or TypeScript property, or None"""
+        for column in self.columns:
+            if column.name == name:
+                return column
+        for column in self.columns:
+            if column.property == name:
+                return column
+        return None
+
+    def as_table(self):
+        """This table as a dbtools.pgdump Table"""
+        table = Table(self.name, [Column(c.name, c.type, c.nullable, c.default) for c in self.columns])
+        table.primary_key = self.primary_key
+        return table
+
+    def as_dict(self):
+        return {
+            'name': self.name, 'variable': self.variable, 'dialect': self.dialect,
+            'path': self.path, 'line': self.line,
+            'columns': [column._asdict() for column in self.columns],
+            'primary_key': list(self.primary_key),
+            'indexes': [index._asdict() for index in self.indexes],
+            'foreign_keys': [key._asdict() for key in self.foreign_keys],
+        }
+
+    def __repr__(self):
+        return f"SchemaTable({self.name!r}, {self.dialect}, {len(self.columns)} columns, {self.path}:{self.line})"
+
+
+class SchemaFile:
+    """The tables (by TypeScript variable), enums and foreign keys of one schema file"""
+
+    def __init__(self, path, digest, tables, enums, references):
+        self.path = path
+        self.digest = digest
+        self.tables = tables
+        self.enums = enums
+        self.references = references
+
+
+def _masks(source):
+    """(code, text): source with strings and comments blanked, and with only comments blanked"""
+    # Imported here so that a model read from the cache does not load codemod
+    from codemod.lexer import CODE, COMMENT, scan_spans
+
+    code = []
+    text = []
+    for kind, start, end in scan_spans(source, jsx=False):
+        piece = source[start:end]
+        blank = NOT_NEWLINE.sub(' ', piece)
+        code.append(piece if kind == CODE else blank)
+        text.append(blank if kind == COMMENT else piece)
+    return ''.join(code), ''.join(text)
+
+
+def _closing(code, start):
+    """Index of the bracket closing the one at code[start]"""
+    stack = [OPENING[code[start]]]
+    index = start + 1
+    length = len(code)
+    while index < length:
+        char = code[index]
+        if char in OPENING:
+            stack.append(OPENING[char])
+        elif char in CLOSING:
+            if char != stack.pop():
+                break
+            if not stack:
+                return index
+        index += 1
+    raise SchemaError(f"line {code.count(chr(10), 0, start) + 1}: {code[start]!r} is never closed")
+
+
+def _split(code, text, start, end):
+    """(start, end) of each comma-separated item of code[start:end]"""
+    items = []
+    item = start
+    index = start
+    while index < end:
+        char = code[index]
+        if char in OPENING:
+            index = _closing(code, index)
+        elif char == ',':
+            items.append((item, index))
+            item = index + 1
+        index += 1
+    items.append((item, end))
+    # A trailing comma leaves an empty item; a string is blank in code but not in text
+    return [(s, e) for s, e in items if text[s:e].strip()]
+
+
+def _calls(code, text, start, end):
+    """[(name, [argument text, ...]), ...] for a chain like `a(x).b().c(y)`"""
+    calls = []
+    position = start
+    while position < end:
+        match = CALL.match(code, position, end)
+        if match is None:
+            break
+        opening = match.end() - 1
+        closing = _closing(code, opening)
+        arguments = [text[s:e].strip() for s, e in _split(code, text, opening + 1, closing)]
+        calls.append((match.group(1), arguments))
+        position = closing + 1
+    return calls
+
+
+def _object_items(code, text, start, end):
+    """(key, start, end) of the values of the object literal from code[start] to code[end]"""
+    items = []
+    for item_start, item_end in _split(code, text, start + 1, end):
+        key = PROPERTY.match(code, item_start, item_end)
+        if key is not None:
+            items.append((key.group(1), key.end(), item_end))
+    return items
+
+
+def _literal(text):
+    """The value of a string, number or boolean literal, or None"""
+    text = text.strip()
+    if text in ('true', 'false'):
+        return text == 'true'
+    if text[:1] in '"\'' or text[:1].isdigit() or text[:1] == '-':
+        try:
+            return ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            return None
+    return None
+
+
+def _fields(text):
+    """{key: value text} of a flat object literal like { columns: [t.a], name: "x" }"""
+    return {match.group(1): match.group(2).strip() for match in FIELD.finditer(text)}
+
+
+def _string_list(text):
+    """The strings of an array literal like ["a", "b"]"""
+    if not text.startswith('['):
+        return ()
+    return tuple(ast.literal_eval(literal) for literal in STRING.findall(text))
+
+
+def _members(text):
+    """(variable, property) of each member in `[table.a, table.b]` or `table.a`"""
+    if text.startswith('['):
+        text = text[1:-1]
+    matches = (MEMBER.search(item) for item in text.split(','))
+    return [match.groups() for match in matches if match is not None]
+
+
+def _sql_default(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return None if value is None else str(value)
+
+
+def _column_type(dialect, builder, arguments, options, enums):
+    """(type, enum values or None) of a column builder call"""
+    if builder in enums:
+        return enums[builder]
+    if builder == 'mysqlEnum':
+        values = next((_string_list(argument) for argument in arguments if argument.startswith('[')), ())
+        return 'enum(' + ','.join("'" + value.replace("'", "''") + "'" for value in values) + ')', values
+    type_name = (MYSQL_TYPES if dialect == MYSQL else PG_TYPES).get(builder, builder)
+    if builder in LENGTH_TYPES and options.get('length'):
+        type_name += f"({options['length']})"
+    elif builder in DECIMAL_TYPES and options.get('precision') is not None:
+        scale = options.get('scale')
+        type_name += f"({options['precision']}" + (f",{scale})" if scale is not None else ')')
+    elif builder in ('timestamp', 'time') and dialect == PG and options.get('withTimezone'):
+        type_name = type_name.replace('without', 'with')
+    return type_name, None
+
+
+def _column(table, key, calls, line, enums, references):
+    """SchemaColumn for a property of a table's columns object"""
+    builder, arguments = calls[0]
+    name = key
+    options = {}
+    for argument in arguments:
+        if argument.startswith('{'):
+            options = {field: _literal(value) for field, value in _fields(argument).items()}
+        elif isinstance(_literal(argument), str):
+            name = _literal(argument)
+    type_name, enum = _column_type(table.dialect, builder, arguments, options, enums)
+    nullable = True
+    primary = unique = False
+    autoincrement = table.dialect == PG and builder in SERIAL_TYPES
+    default = f"nextval('{table.name}_{name}_seq'::regclass)" if autoincrement else None
+    for method, method_arguments in calls[1:]:
+        if method == 'notNull':
+            nullable = False
+        elif method == 'primaryKey':
+            nullable = False
+            primary = True
+        elif method == 'unique':
+            unique = True
+        elif method == 'autoincrement':
+            autoincrement = True
+        elif method == 'default' and method_arguments:
+            value = _literal(method_arguments[0])
+            default = _sql_default(value) if value is not None else method_arguments[0]
+        elif method == 'defaultNow':
+            default = 'now()' if table.dialect == PG else 'CURRENT_TIMESTAMP'
+        elif method == 'array':
+            type_name += '[]'
+        elif method == 'references' and method_arguments:
+            target = ARROW_MEMBER.search(method_arguments[0])
+            if target is not None:
+                references.append(Reference(table.variable, (key,), target.group(1), (target.group(2),),
+                                            'references', line))
+    return SchemaColumn(name, key, builder, type_name, nullable, default, primary, unique, autoincrement,
+                        enum, line)
+
+
+def _extra_config(code, text, start, end, table, references):
+    """Indexes, composite primary key and foreign keys of `(table) => ({ ... })` or `(table) => [...]`"""
+    arrow = code.find('=>', start, end)
+    if arrow < 0:
+        return
+    opening = arrow + 2
+    while opening < end and code[opening] in ' \t\r\n(':
+        opening += 1
+    if opening >= end or code[opening] not in '{[':
+        return
+    closing = _closing(code, opening)
+    if code[opening] == '{':
+        chains = _object_items(code, text, opening, closing)
+    else:
+        chains = [(None, s, e) for s, e in _split(code, text, opening + 1, closing)]
+    for key, chain_start, chain_end in chains:
+        calls = _calls(code, text, chain_start, chain_end)
+        if not calls or not calls[0][1] and calls[0][0] not in INDEX_BUILDERS:
+            continue
+        builder, arguments = calls[0]
+        if builder in INDEX_BUILDERS:
+            name = _literal(arguments[0]) if arguments else None
+            properties = [prop for method, method_arguments in calls[1:] if method == 'on'
+                          for argument in method_arguments for _, prop in _members(argument)]
+            columns = tuple(table.column(prop).name if table.column(prop) else prop for prop in properties)
+            table.indexes.append(Index(name or key, columns, INDEX_BUILDERS[builder]))
+        elif builder == 'primaryKey':
+            fields = _fields(arguments[0]) if arguments[0].startswith('{') else {'columns': ', '.join(arguments)}
+            columns = [table.column(prop) for _, prop in _members(fields.get('columns', ''))]
+            table.primary_key = tuple(column.name for column in columns if column is not None)
+        elif builder == 'foreignKey':
+            fields = _fields(arguments[0])
+            properties = tuple(prop for _, prop in _members(fields.get('columns', '')))
+            targets = _members(fields.get('foreignColumns', ''))
+            if properties and targets:
+                line = text.count('\n', 0, chain_start) + 1
+                references.append(Reference(table.variable, properties, targets[0][0],
+                                            tuple(prop for _, prop in targets), 'foreignKey', line))
+
+
+def _relations(code, text, references):
+    """References from the one(target, { fields, references }) of relations() calls"""
+    for match in RELATIONS_CALL.finditer(code):
+        closing = _closing(code, match.end() - 1)
+        for one in ONE_CALL.finditer(code, match.end(), closing):
+            arguments = [text[s:e].strip() for s, e in _split(code, text, one.end(), _closing(code, one.end() - 1))]
+            if len(arguments) < 2 or not arguments[1].startswith('{'):
+                continue
+            fields = _fields(arguments[1])
+            sources = _members(fields.get('fields', ''))
+            targets = _members(fields.get('references', ''))
+            if sources and targets:
+                references.append(Reference(sources[0][0], tuple(prop for _, prop in sources), arguments[0],
+                                            tuple(prop for _, prop in targets), 'relation',
+                                            text.count('\n', 0, one.start()) + 1))
+
+
+def parse_file(source, path='<schema>', digest=''):
+    """SchemaFile for the pgTable, mysqlTable, pgEnum and relations() calls in a file's source"""
+    try:
+        return _parse_file(source, path, digest)
+    except SchemaError as e:
+        raise SchemaError(f"{path}: {e}") from None
+
+
+def _parse_file(source, path, digest):
+    code, text = _masks(source)
+    enums = {}
+    for match in ENUM_CALL.finditer(code):
+        closing = _closing(code, match.end() - 1)
+        arguments = [text[s:e].strip() for s, e in _split(code, text, match.end(), closing)]
+        if len(arguments) >= 2 and isinstance(_literal(arguments[0]), str):
+            enums[match.group(1)] = (_literal(arguments[0]), _string_list(arguments[1]))
+    tables = {}
+    references = []
+    for match in TABLE_CALL.finditer(code):
+        opening = match.end() - 1
+        closing = _closing(code, opening)
+        arguments = _split(code, text, opening + 1, closing)
+        line = text.count('\n', 0, match.start()) + 1
+        name = _literal(text[arguments[0][0]:arguments[0][1]]) if arguments else None
+        if not isinstance(name, str) or len(arguments) < 2 or '{' not in code[arguments[1][0]:arguments[1][1]]:
+            raise SchemaError(f"line {line}: {match.group(1)} is not a {match.group(2)}(\"name\", {{ columns }}) call")
+        table = SchemaTable(name, match.group(1), DIALECTS[match.group(2)], path, line, [])
+        start = code.index('{', arguments[1][0])
+        for key, item_start, item_end in _object_items(code, text, start, _closing(code, start)):
+            calls = _calls(code, text, item_start, item_end)
+            if calls:
+                column_line = text.count('\n', 0, item_start) + 1
+                table.columns.append(_column(table, key, calls, column_line, enums, references))
+        table.primary_key = tuple(column.name for column in table.columns if column.primary_key)
+        if len(arguments) >= 3:
+            _extra_config(code, text, *arguments[2], table, references)
+        tables[table.variable] = table
+    _relations(code, text, references)
+    return SchemaFile(path, digest, tables, dict(enums.values()), references)
+
+
+class SchemaModel:
+    """The tables of several schema files, with their foreign keys resolved across files
+
+    A table defined in more than one file (schema.ts and the MySQL schemas
+    share many names) is looked up in the order the files were given. errors
+    holds the messages of the files that could not be read.
+    """
+
+    def __init__(self, files, errors=()):
+        self.files = list(files)
+        self.errors = list(errors)
+        self.tables = {}
+        self.enums = {}
+        self.unresolved = []
+        by_variable = {}
+        for schema_file in self.files:
+            for variable, table in schema_file.tables.items():
+                self.tables.setdefault(table.name, table)
+                by_variable.setdefault(variable, table)
+            for name, values in schema_file.enums.items():
+                self.enums.setdefault(name, values)
+        for schema_file in self.files:
+            for reference in schema_file.references:
+                self._resolve(schema_file, reference, by_variable)
+
+    def _resolve(self, schema_file, reference, by_variable):
+        # A variable is looked up in its own file first, then in the others (an import)
+        source = schema_file.tables.get(reference.variable) or by_variable.get(reference.variable)
+        target = schema_file.tables.get(reference.target) or by_variable.get(reference.target)
+        columns = [source.column(prop) for prop in reference.properties] if source else [None]
+        targets = [target.column(prop) for prop in reference.target_properties] if target else [None]
+        if None in columns or None in targets:
+            self.unresolved.append(f"{schema_file.path}:{reference.line}: {reference.variable}."
+                                   f"{','.join(reference.properties)} -> {reference.target}."
+                                   f"{','.join(reference.target_properties)}")
+            return
+        key = ForeignKey(tuple(c.name for c in columns), target.name, tuple(c.name for c in targets),
+                         reference.source)
+        if not any(existing[:3] == key[:3] for existing in source.foreign_keys):
+            source.foreign_keys.append(key)
+
+    def table(self, name, dialect=None):
+        """The first table with this SQL name or TypeScript variable, or None"""
+        for table in self.definitions(name):
+            if dialect is None or table.dialect == dialect:
+                return table
+        return None
+
+    def definitions(self, name):
+        """Every table with this SQL name or TypeScript variable, in file order"""
+        return [table for schema_file in self.files for variable, table in schema_file.tables.items()
+                if table.name == name or variable == name]
+
+    def columns_named(self, name):
+        """(table, column) for every column with this SQL name or property"""
+        return [(table, table.column(name)) for schema_file in self.files
+                for table in schema_file.tables.values() if table.column(name) is not None]
+
+    def as_dict(self):
+        return {
+            'files': {schema_file.path: schema_file.digest for schema_file in self.files},
+            'tables': [table.as_dict() for schema_file in self.files for table in schema_file.tables.values()],
+            'enums': {name: list(values) for name, values in self.enums.items()},
+            'unresolved': self.unresolved,
+            'errors': self.errors,
+        }
+
+
+def sources_digest():
+    """Hash of the parser's sources and the Python version, part of every cache key"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(sys.version.encode('utf-8'))
+    for path in SOURCES:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _prune(directory, keep):
+    try:
+        entries = [entry for entry in os.scandir(directory) if entry.name.endswith('.pickle')]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        try:
+            os.unlink(entry.path)
+        except OSError:
+            pass
+
+
+def load_file(path, cache_dir=DEFAULT_CACHE_DIR, parser_digest=None):
+    """SchemaFile of a schema file, read from the cache if its content was parsed before
+
+    cache_dir=None parses without the cache.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+    if cache_dir is None:
+        return parse_file(content.decode('utf-8'), path, digest)
+    key = hashlib.blake2b(f'{parser_digest or sources_digest()}\0{digest}'.encode('utf-8'),
+                          digest_size=16).hexdigest()
+    artifact = os.path.join(cache_dir, key + '.pickle')
+    try:
+        with open(artifact, 'rb') as f:
+            schema_file = pickle.load(f)
+        if isinstance(schema_file, SchemaFile) and schema_file.digest == digest:
+            # The same content may have been parsed at another path
+            schema_file.path = path
+            for table in schema_file.tables.values():
+                table.path = path
+            return schema_file
+    except Exception:
+        # Missing, truncated or written by another version: parse it again
+        pass
+    schema_file = parse_file(content.decode('utf-8'), path, digest)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(schema_file, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, artifact)
+        _prune(cache_dir, MAX_ARTIFACTS)
+    except (OSError, pickle.PicklingError):
+        pass
+    return schema_file
+
+
+def load_model(paths=DEFAULT_FILES, cache_dir=DEFAULT_CACHE_DIR):
+    """SchemaModel of the schema files, each parsed or read from the cache
+
+    A file the reader cannot follow (types-1.ts is cut off mid-table) is left
+    out and its SchemaError kept on model.errors.
+    """
+    parser_digest = sources_digest() if cache_dir is not None else None
+    files = []
+    errors = []
+    for path in paths:
+        try:
+            files.append(load_file(path, cache_dir, parser_digest))
+        except SchemaError as e:
+            errors.append(str(e))
+    return SchemaModel(files, errors)
+
+
+def read_schema(path, cache_dir=DEFAULT_CACHE_DIR):
+    """{table name: Table} for the pgTable definitions in a Drizzle schema file"""
+    tables = load_file(path, cache_dir).tables.values()
+    return {table.name: table.as_table() for table in tables if table.dialect == PG}
+
+
+def format_table(table):
+    lines = [f"{table.name} ({table.dialect}Table {table.variable}, {table.path}:{table.line})"]
+    width = max((len(column.name) for column in table.columns), default=0)
+    type_width = min(max((len(column.type) for column in table.columns), default=0), 32)
+    for column in table.columns:
+        notes = []
+        if not column.nullable:
+            notes.append('not null')
+        if column.default is not None:
+            notes.append(f"default {column.default}")
+        elif column.autoincrement:
+            notes.append('auto increment')
+        if column.unique:
+            notes.append('unique')
+        if column.property != column.name:
+            notes.append(f"property {column.property}")
+        lines.append(f"  {column.name:<{width}}  {column.type:<{type_width}}  {', '.join(notes)}".rstrip())
+    if table.primary_key:
+        lines.append(f"  primary key ({', '.join(table.primary_key)})")
+    for index in table.indexes:
+        lines.append(f"  {'unique ' if index.unique else ''}index {index.name} ({', '.join(index.columns)})")
+    for key in table.foreign_keys:
+        lines.append(f"  foreign key ({', '.join(key.columns)}) -> {key.table} ({', '.join(key.references)}), "
+                     f"from {key.source}")
+    return '\n'.join(lines)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m dbtools.drizzle',
+                                     description='Answer questions about the tables of Drizzle schema files.')
+    parser.add_argument('files', nargs='*', default=list(DEFAULT_FILES),
+                        help=f"schema files (default: {' '.join(DEFAULT_FILES)})")
+    parser.add_argument('--table', metavar='NAME', help='columns, indexes and foreign keys of a table')
+    parser.add_argument('--column', metavar='NAME', help='the tables that have this column')
+    parser.add_argument('--json', action='store_true', help='print the whole model as JSON')
+    parser.add_argument('--no-cache', action='store_true', help='parse every file, without the cache')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    try:
+        model = load_model(args.files, None if args.no_cache else DEFAULT_CACHE_DIR)
+    except (OSError, UnicodeDecodeError, SchemaError) as e:
+        print(f"Cannot read the schema: {e}")
+        return 2
+    seconds = time.perf_counter() - start
+    for error in model.errors:
+        print(f"Skipped {error}", file=sys.stderr)
+    if not model.files:
+        print("Cannot read the schema: no file could be read")
+        return 2
+    if args.json:
+        print(json.dumps(model.as_dict(), indent=2, ensure_ascii=False))
+        return 0
+    if args.table:
+        definitions = model.definitions(args.table)
+        if not definitions:
+            print(f"No table {args.table} in {', '.join(args.files)}")
+            return 1
+        print('\n\n'.join(format_table(table) for table in definitions))
+        return 0
+    if args.column:
+        matches = model.columns_named(args.column)
+        for table, column in matches:
+            print(f"{table.name}.{column.name}: {column.type}{'' if column.nullable else ' not null'} "
+                  f"({table.path}:{column.line})")
+        return 0 if matches else 1
+    for schema_file in model.files:
+        tables = schema_file.tables.values()
+        print(f"{schema_file.path}: {len(tables)} tables, {sum(len(t.columns) for t in tables)} columns, "
+              f"{sum(len(t.indexes) for t in tables)} indexes, {sum(len(t.foreign_keys) for t in tables)} "
+              f"foreign keys, {len(schema_file.enums)} enums")
+    for reference in model.unresolved:
+        print(f"unresolved foreign key {reference}")
+    print(f"\n{len(model.tables)} tables from {len(model.files)} files in {seconds * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""Compare two database dumps table by table, by primary key.
+
+Reports schema drift (tables and columns added or removed, changed column
+types, nullability and primary keys) and, for every table in both dumps,
+the rows inserted, deleted and changed between them:
+
+    python -m dbtools.dumpdiff 666666_backup.sql 666666_clean.sql
+    python -m dbtools.dumpdiff old.sql.gz new.sql.gz --tables customers,invoices --memory 256
+
+Both pg_dump and mysqldump files are read (see dbtools.pgdump and
+dbtools.mysqldump); the format is taken from each file's header.
+
+Each row is reduced to its primary key and a 16-byte hash of its values,
+over the columns both dumps have. Rows are first written to spill files,
+partitioned by a hash of their key, so the same key of both dumps lands in
+the same partition; partitions are then compared one at a time, holding
+only the old dump's keys and hashes of one partition in memory. The number
+of partitions follows from the dump size and --memory, so two dumps larger
+than RAM compare in two sequential reads and one pass over the spill files.
+Tables without a primary key are compared as multisets of rows.
+"""
+import argparse
+import gzip
+import math
+import os
+import pickle
+import sys
+import tempfile
+import time
+import zlib
+from hashlib import blake2b
+from operator import itemgetter
+
+from .mysqldump import MysqlDumpReader
+from .pgdump import DumpFormatError, DumpReader
+
+DEFAULT_MEMORY_MB = 512
+DEFAULT_EXAMPLES = 5
+EXAMPLE_WIDTH = 160
+# Memory of one row's entry in the comparison table, per byte of its text in the dump
+ENTRY_OVERHEAD = 3
+SNIFF_BYTES = 4096
+SPILL_BUFFER = 1 << 20
+# Records pickled together: loading them one by one costs more than hashing them
+SPILL_BATCH = 4096
+
+
+def dump_format(path):
+    """'mysql' or 'postgres', from the first lines of the file"""
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8-sig', errors='replace') as f:
+        head = f.read(SNIFF_BYTES)
+    lowered = head.lower()
+    if head.lstrip().startswith('{') or '-- mysql dump' in lowered or '-- mariadb dump' in lowered:
+        return 'mysql'
+    return 'postgres'
+
+
+def table_key(name):
+    """Table names of both formats compared alike: pg_dump's public. schema dropped"""
+    return name[len('public.'):] if name.startswith('public.') else name
+
+
+class Dump:
+    """One side of a comparison: its schema, then its rows table by table"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.format = dump_format(path)
+        self.tables = None
+
+    def _reader(self):
+        if self.format == 'mysql':
+            return MysqlDumpReader(self.path)
+        return DumpReader(self.path, typed=False)
+
+    def read_schema(self):
+        # A pass over the statements only: COPY blocks are skipped unread and
+        # INSERT values are never parsed. pg_dump adds primary keys after the
+        # data, so the schema is only complete at the end of the file.
+        reader = self._reader()
+        for _ in reader:
+            pass
+        self.tables = {table_key(name): table for name, table in reader.tables.items()}
+        return self.tables
+
+    def blocks(self):
+        """(table key, column names, rows) for every COPY block or INSERT"""
+        reader = self._reader()
+        if self.format == 'mysql':
+            blocks = reader.insert_blocks()
+        else:
+            blocks = reader.copy_blocks()
+        for block in blocks:
+            yield table_key(block.table), block.columns, block
+
+    @property
+    def size(self):
+        size = os.path.getsize(self.path)
+        # Dumps compress about tenfold
+        return size * 10 if self.path.endswith('.gz') else size
+
+
+def _type_text(type_name):
+    return ' '.join(type_name.lower().split())
+
+
+class TableDiff:
+    """What changed in one table"""
+
+    def __init__(self, name, old=None, new=None):
+        self.name = name
+        self.old = old
+        self.new = new
+        self.added_columns = []
+        self.removed_columns = []
+        self.changed_columns = []   # (name, old description, new description)
+        self.old_key = tuple(old.primary_key) if old is not None else ()
+        self.new_key = tuple(new.primary_key) if new is not None else ()
+        self.columns = []           # compared columns, in the old dump's order
+        self.key = ()               # compared by these columns, or by whole rows if empty
+        self.old_rows = 0
+        self.new_rows = 0
+        self.inserted = 0
+        self.deleted = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.examples = []          # (sort order, kind, key, old values, new values)
+        self._threshold = None
+        if old is not None and new is not None:
+            self._compare_schema()
+
+    def _compare_schema(self):
+        new_columns = {column.name: column for column in self.new.columns}
+        old_names = {column.name for column in self.old.columns}
+        for column in self.old.columns:
+            other = new_columns.get(column.name)
+            if other is None:
+                self.removed_columns.append(column.name)
+                continue
+            self.columns.append(column.name)
+            old_text = _type_text(column.type) + ('' if column.nullable else ' not null')
+            new_text = _type_text(other.type) + ('' if other.nullable else ' not null')
+            if old_text != new_text:
+                self.changed_columns.append((column.name, old_text, new_text))
+        self.added_columns = [column.name for column in self.new.columns if column.name not in old_names]
+        if self.old_key and set(self.old_key) <= set(self.columns):
+            self.key = self.old_key
+        elif self.new_key and set(self.new_key) <= set(self.columns):
+            self.key = self.new_key
+
+    @property
+    def schema_changed(self):
+        return (self.old is None or self.new is None or self.added_columns or self.removed_columns
+                or self.changed_columns or self.old_key != self.new_key)
+
+    @property
+    def rows_changed(self):
+        return bool(self.inserted or self.deleted or self.changed)
+
+    def wants_example(self, limit, key):
+        """Whether a row with this key would be among the examples kept"""
+        return limit > 0 and (self._threshold is None or _key_order(key) < self._threshold)
+
+    def add_example(self, limit, kind, key, old_values, new_values):
+        # The examples are the differing rows with the smallest keys, whatever
+        # order the partitions are compared in
+        self.examples.append((_key_order(key), kind, key, old_values, new_values))
+        if len(self.examples) > 2 * limit:
+            self.finish_examples(limit)
+            self._threshold = self.examples[-1][0]
+
+    def finish_examples(self, limit):
+        self.examples.sort(key=itemgetter(0))
+        del self.examples[limit:]
+
+
+def _key_order(key):
+    """Sort order of a key: numbers as numbers, then text"""
+    if not isinstance(key, tuple):
+        return ((1, key),)
+    return tuple((0, int(value)) if value is not None and value.isdigit() else (1, value or '') for value in key)
+
+
+class _Projection:
+    """Picks the compared columns and the key out of one block's rows"""
+
+    def __init__(self, diff, columns):
+        positions = [columns.index(name) for name in diff.columns]
+        self.values = itemgetter(*positions) if len(positions) != 1 else (lambda row: (row[positions[0]],))
+        key_positions = [diff.columns.index(name) for name in diff.key]
+        if not key_positions:
+            self.key = None
+        elif len(key_positions) == 1:
+            self.key = (lambda values: (values[key_positions[0]],))
+        else:
+            self.key = itemgetter(*key_positions)
+
+
+class _SpillFile:
+    """A partition file of (table, key, digest, values) records, pickled in batches"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'wb', buffering=SPILL_BUFFER)
+        self.batch = []   # appended to directly by the spill loop, flushed when full
+
+    def flush(self):
+        if self.batch:
+            pickle.dump(self.batch, self._file, pickle.HIGHEST_PROTOCOL)
+            self.batch.clear()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def _batches(path):
+    """(offset, records) for each batch of a spill file"""
+    with open(path, 'rb', buffering=SPILL_BUFFER) as f:
+        while True:
+            offset = f.tell()
+            try:
+                yield offset, pickle.load(f)
+            except EOFError:
+                return
+
+
+def _values_at(f, offset, index):
+    f.seek(offset)
+    return pickle.load(f)[index][3]
+
+
+class DumpDiff:
+    """Compares two dumps; run() returns the TableDiffs of every table in either"""
+
+    def __init__(self, old_path, new_path, tables=None, memory_mb=DEFAULT_MEMORY_MB, partitions=0,
+                 examples=DEFAULT_EXAMPLES, temp_dir=None):
+        self.old = Dump(old_path)
+        self.new = Dump(new_path)
+        self.only = None if tables is None else {table_key(name) for name in tables}
+        self.memory = memory_mb * 1024 * 1024
+        self.partitions = partitions
+        self.examples = examples
+        self.temp_dir = temp_dir
+        self.diffs = {}
+
+    def _plan(self):
+        old_tables = self.old.read_schema()
+        new_tables = self.new.read_schema()
+        for name in sorted(set(old_tables) | set(new_tables)):
+            if self.only is None or name in self.only:
+                self.diffs[name] = TableDiff(name, old_tables.get(name), new_tables.get(name))
+        if not self.partitions:
+            self.partitions = max(1, math.ceil(self.old.size * ENTRY_OVERHEAD / self.memory))
+
+    def _spill(self, dump, side, directory):
+        """Write the rows of one dump to its partition files; counts rows on the way"""
+        files = [_SpillFile(os.path.join(directory, f'{side}.{number}')) for number in range(self.partitions)]
+        projections = {}
+        try:
+            for name, columns, rows in dump.blocks():
+                diff = self.diffs.get(name)
+                if diff is None:
+                    continue
+                if diff.old is None or diff.new is None:
+                    # Only in one dump: nothing to compare, only to count
+                    count = sum(1 for _ in rows)
+                    if side == 'old':
+                        diff.old_rows += count
+                    else:
+                        diff.new_rows += count
+                    continue
+                projection = projections.get((name, columns))
+                if projection is None:
+                    projection = projections[name, columns] = _Projection(diff, columns)
+                count = self._spill_rows(name, rows, projection, files)
+                if side == 'old':
+                    diff.old_rows += count
+                else:
+                    diff.new_rows += count
+        finally:
+            for f in files:
+                f.close()
+
+    def _spill_rows(self, name, rows, projection, files):
+        partitions = self.partitions
+        get_values = projection.values
+        get_key = projection.key
+        batches = [f.batch for f in files]
+        count = 0
+        for row in rows:
+            values = get_values(row)
+            digest = blake2b(repr(values).encode(), digest_size=16).digest()
+            key = get_key(values) if get_key is not None else digest
+            number = zlib.crc32(repr(key).encode()) % partitions if partitions > 1 else 0
+            batch = batches[number]
+            batch.append((name, key, digest, values))
+            if len(batch) >= SPILL_BATCH:
+                files[number].flush()
+            count += 1
+        return count
+
+    def _compare_partition(self, directory, number):
+        old_path = os.path.join(directory, f'old.{number}')
+        entries = {}   # (table, key) -> [digest, batch offset, index in batch, count]
+        for offset, batch in _batches(old_path):
+            for index, (name, key, digest, _) in enumerate(batch):
+                entry = entries.get((name, key))
+                if entry is None:
+                    entries[name, key] = [digest, offset, index, 1]
+                else:
+                    entry[3] += 1
+        with open(old_path, 'rb') as old_file:
+            for _, batch in _batches(os.path.join(directory, f'new.{number}')):
+                for name, key, digest, values in batch:
+                    diff = self.diffs[name]
+                    entry = entries.get((name, key))
+                    if entry is None:
+                        diff.inserted += 1
+                        if diff.wants_example(self.examples, key):
+                            diff.add_example(self.examples, 'inserted', key, None, values)
+                        continue
+                    if entry[0] == digest:
+                        diff.unchanged += 1
+                    else:
+                        diff.changed += 1
+                        if diff.wants_example(self.examples, key):
+                            old_values = _values_at(old_file, entry[1], entry[2])
+                            diff.add_example(self.examples, 'changed', key, old_values, values)
+                    entry[3] -= 1
+                    if not entry[3]:
+                        del entries[name, key]
+            for (name, key), (_, offset, index, count) in entries.items():
+                diff = self.diffs[name]
+                diff.deleted += count
+                if diff.wants_example(self.examples, key):
+                    diff.add_example(self.examples, 'deleted', key, _values_at(old_file, offset, index), None)
+
+    def run(self):
+        self._plan()
+        with tempfile.TemporaryDirectory(prefix='dumpdiff-', dir=self.temp_dir) as directory:
+            self._spill(self.old, 'old', directory)
+            self._spill(self.new, 'new', directory)
+            for number in range(self.partitions):
+                self._compare_partition(directory, number)
+        for diff in self.diffs.values():
+            diff.finish_examples(self.examples)
+        return list(self.diffs.values())
+
+
+def _describe_key(diff, key):
+    if not diff.key:
+        return 'row'
+    return ', '.join(f'{name}={value}' for name, value in zip(diff.key, key))
+
+
+def _describe_row(diff, key, values):
+    """The key, then the other values, cut to one line"""
+    others = ', '.join(f'{name}={value!r}' for name, value in zip(diff.columns, values) if name not in diff.key)
+    text = f"{_describe_key(diff, key)}: {others}" if diff.key else others
+    return text if len(text) <= EXAMPLE_WIDTH else text[:EXAMPLE_WIDTH - 3] + '...'
+
+
+def format_report(diffs, old_path, new_path):
+    """Lines of the report; empty when the dumps hold the same schema and rows"""
+    lines = []
+    schema = [diff for diff in diffs if diff.schema_changed]
+    if schema:
+        lines.append(f"Schema ({old_path} -> {new_path})")
+        for diff in schema:
+            if diff.new is None:
+                lines.append(f"  - {diff.name}: only in the old dump ({diff.old_rows} rows)")
+            elif diff.old is None:
+                lines.append(f"  + {diff.name}: only in the new dump ({diff.new_rows} rows)")
+            else:
+                changes = [f"+ column {name}" for name in diff.added_columns]
+                changes += [f"- column {name}" for name in diff.removed_columns]
+                changes += [f"column {name}: {old} -> {new}" for name, old, new in diff.changed_columns]
+                if diff.old_key != diff.new_key:
+                    changes.append(f"primary key ({', '.join(diff.old_key)}) -> ({', '.join(diff.new_key)})")
+                lines.append(f"  ~ {diff.name}: " + '; '.join(changes))
+    rows = [diff for diff in diffs if diff.rows_changed]
+    if rows:
+        if lines:
+            lines.append('')
+        lines.append("Rows")
+        for diff in rows:
+            compared = f"by {', '.join(diff.key)}" if diff.key else 'as whole rows'
+            lines.append(f"  {diff.name}: {diff.inserted} inserted, {diff.deleted} deleted, {diff.changed} changed, "
+                         f"{diff.unchanged} unchanged (compared {compared})")
+            for _, kind, key, old_values, new_values in diff.examples:
+                if kind == 'inserted':
+                    lines.append(f"    + {_describe_row(diff, key, new_values)}")
+                elif kind == 'deleted':
+                    lines.append(f"    - {_describe_row(diff, key, old_values)}")
+                else:
+                    changes = [f"{name}: {old!r} -> {new!r}"
+                               for name, old, new in zip(diff.columns, old_values, new_values) if old != new]
+                    lines.append(f"    ~ {_describe_key(diff, key)}: " + ', '.join(changes))
+    return lines
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m dbtools.dumpdiff',
+                                     description='Compare two database dumps table by table, by primary key.')
+    parser.add_argument('old', help='the older dump (pg_dump or mysqldump, .sql or .sql.gz)')
+    parser.add_argument('new', help='the newer dump')
+    parser.add_argument('--tables', metavar='A,B', help='only compare these tables')
+    parser.add_argument('--memory', type=int, default=DEFAULT_MEMORY_MB, metavar='MB',
+                        help=f'memory for comparing one partition (default: {DEFAULT_MEMORY_MB})')
+    parser.add_argument('--partitions', type=int, default=0, metavar='N',
+                        help='spill partitions (default: from the dump size and --memory)')
+    parser.add_argument('--examples', type=int, default=DEFAULT_EXAMPLES, metavar='N',
+                        help=f'rows shown per changed table (default: {DEFAULT_EXAMPLES})')
+    parser.add_argument('--temp-dir', metavar='DIR', help='where to put the spill files (default: system temp)')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    tables = args.tables.split(',') if args.tables else None
+    dump_diff = DumpDiff(args.old, args.new, tables, max(1, args.memory), max(0, args.partitions),
+                         max(0, args.examples), args.temp_dir)
+    try:
+        diffs = dump_diff.run()
+    except (OSError, DumpFormatError) as e:
+        print(f"Cannot compare: {e}")
+        return 2
+    lines = format_report(diffs, args.old, args.new)
+    for line in lines:
+        print(line)
+    seconds = time.perf_counter() - start
+    different = sum(1 for diff in diffs if diff.schema_changed or diff.rows_changed)
+    if lines:
+        print()
+    print(f"{different} of {len(diffs)} tables differ; "
+          f"{sum(diff.old_rows for diff in diffs)} -> {sum(diff.new_rows for diff in diffs)} rows "
+          f"({dump_diff.partitions} partitions, {seconds:.2f}s)")
+    return 1 if different else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""Streaming reader for mysqldump and mariadb-dump files.
+
+The MySQL counterpart of dbtools.pgdump. Iterating a MysqlDumpReader yields
+each statement as a Statement and each `INSERT INTO ... VALUES` as an
+InsertBlock, whose rows are only parsed when it is iterated:
+
+    reader = MysqlDumpReader('666666_clean.sql')
+    for block in reader.insert_blocks():
+        for row in block:
+            ...
+
+Rows are tuples of the values as written in the dump: str for strings and
+numbers alike, None for NULL. Tables come from the dump's CREATE TABLE
+statements, with their MySQL column types ('bigint(20) unsigned',
+"enum('open','paid')") and primary keys; the names are unquoted and have no
+schema.
+
+mysqldump writes each INSERT on one line, so memory is bounded by the
+longest INSERT (its --net-buffer-length), not by the dump. Versioned
+comments (`/*!40101 SET NAMES utf8mb4 */;`) are read as the statement they
+wrap. A dump saved from an API response, `{"success": true, "content":
+"-- MySQL dump ..."}`, is unwrapped; that form has to be loaded whole.
+
+    python -m dbtools.mysqldump 666666_clean.sql
+    python -m dbtools.mysqldump 666666_clean.sql --table customers --limit 5
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import time
+from functools import lru_cache
+
+from .pgdump import Column, DumpFormatError, Statement, Table, split_top_level, statement_kind
+
+READ_BUFFER = 1 << 20
+
+IDENTIFIER = r'(?:`(?:[^`]|``)+`|\w+)'
+CREATE_TABLE = re.compile(rf'CREATE\s+(?:TEMPORARY\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?P<table>{IDENTIFIER})\s*\(',
+                          re.IGNORECASE)
+INSERT = re.compile(rf'(?:INSERT|REPLACE)\s+(?:IGNORE\s+)?INTO\s+(?P<table>{IDENTIFIER})\s*'
+                    r'(?:\((?P<columns>[^)]*)\)\s*)?VALUES\s*', re.IGNORECASE)
+VERSIONED_COMMENT = re.compile(r'/\*!\d*\s*(.*?)\s*\*/\s*;?\s*$', re.DOTALL)
+KEY_DEFINITION = re.compile(r'(?:PRIMARY\s+KEY|UNIQUE|KEY|INDEX|CONSTRAINT|FOREIGN\s+KEY|FULLTEXT|SPATIAL|CHECK)\b',
+                            re.IGNORECASE)
+PRIMARY_KEY = re.compile(r'PRIMARY\s+KEY\s*(?:USING\s+\w+\s*)?\(([^)]*)\)', re.IGNORECASE)
+# A type with its arguments (quoted enum values included) and sign modifiers
+COLUMN_TYPE = re.compile(r"\w+(?:\s*\((?:'(?:[^'\\]|\\.|'')*'|[^)'])*\))?"
+                         r"(?:\s+(?:unsigned|signed|zerofill))*", re.IGNORECASE)
+DEFAULT_VALUE = re.compile(r"\bDEFAULT\s+('(?:[^'\\]|\\.|'')*'|\S+(?:\(\))?)", re.IGNORECASE)
+# One value of a VALUES list with the comma after it: a string (with an
+# optional _charset introducer), NULL, a bare number or literal, or a
+# parenthesis; the final ; ends the statement
+STRING_BODY = r"[^'\\]*(?:(?:\\.|'')[^'\\]*)*"
+INSERT_TOKEN = re.compile(rf"""\s*(?:(?:_\w+\s*)?'({STRING_BODY})'|(NULL)\b|([^\s,()';]+)|(\()|(\))|(;))\s*,?""",
+                          re.DOTALL)
+# The same values without the parentheses, for matching a whole row at once:
+# group 1 is the string, group 2 the bare value, neither for NULL
+ROW_VALUE = rf"""\s*(?:(?:_\w+\s*)?'({STRING_BODY})'|NULL\b|([^\s,()';]+))\s*"""
+MYSQL_ESCAPE = re.compile(r"\\(.)|''", re.DOTALL)
+MYSQL_ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+
+NOT_MYSQL_DUMP = (
+    ('<!doctype html', 'an HTML page, not a dump'),
+    ('<html', 'an HTML page, not a dump'),
+    ('-- postgresql database dump', 'a pg_dump; read it with dbtools.pgdump'),
+)
+
+
+def unquote_identifier(name):
+    name = name.strip()
+    if len(name) >= 2 and name[0] == '`' and name[-1] == '`':
+        return name[1:-1].replace('``', '`')
+    return name
+
+
+def _unescape_match(match):
+    escaped = match.group(1)
+    if escaped is None:
+        return "'"
+    return MYSQL_ESCAPES.get(escaped, escaped)
+
+
+def unescape(text):
+    """The value of the inside of a MySQL string literal"""
+    if '\\' not in text and "''" not in text:
+        return text
+    return MYSQL_ESCAPE.sub(_unescape_match, text)
+
+
+def parse_create_table(sql):
+    """Table for a MySQL CREATE TABLE statement, or None if it is not one"""
+    match = CREATE_TABLE.match(sql)
+    if match is None:
+        return None
+    body = sql[match.end():sql.rfind(')')]
+    columns = []
+    primary_key = ()
+    for definition in split_top_level(body, ','):
+        definition = definition.strip()
+        if not definition:
+            continue
+        if KEY_DEFINITION.match(definition):
+            key = PRIMARY_KEY.match(definition)
+            if key is not None:
+                primary_key = tuple(unquote_identifier(name.split('(')[0]) for name in key.group(1).split(','))
+            continue
+        if definition.startswith('`'):
+            end = definition.index('`', 1)
+            while definition[end + 1:end + 2] == '`':
+                end = definition.index('`', end + 2)
+            name, rest = unquote_identifier(definition[:end + 1]), definition[end + 1:].strip()
+        else:
+            name, _, rest = definition.partition(' ')
+        type_match = COLUMN_TYPE.match(rest)
+        type_name = type_match.group() if type_match else rest.split(None, 1)[0]
+        options = rest[len(type_name):]
+        default = DEFAULT_VALUE.search(options)
+        columns.append(Column(name, type_name, not re.search(r'\bNOT\s+NULL\b', options, re.IGNORECASE),
+                              default.group(1) if default else None))
+        if re.search(r'\bPRIMARY\s+KEY\b', options, re.IGNORECASE):
+            primary_key = (name,)
+    table = Table(unquote_identifier(match.group('table')), columns)
+    table.primary_key = primary_key
+    return table
+
+
+@lru_cache(maxsize=None)
+def _row_pattern(width):
+    return re.compile(r'\s*\(' + ','.join([ROW_VALUE] * width) + r'\)\s*[,;]', re.DOTALL)
+
+
+def _parse_rows(text, start, width):
+    """Rows of exactly width values, one regex match each, or None to take the token parser"""
+    rows = []
+    position = start
+    for match in _row_pattern(width).finditer(text, start):
+        if match.start() != position:
+            return None
+        position = match.end()
+        values = iter(match.groups())
+        rows.append(tuple([bare if string is None else unescape(string) for string, bare in zip(values, values)]))
+        if text[position - 1] == ';':
+            return rows if not text[position:].strip() else None
+    return None
+
+
+def parse_values(text, start=0, width=None):
+    """The rows of an INSERT's VALUES list, as tuples of str and None
+
+    With width, rows of that many values are matched whole, which is about
+    twice as fast; anything else falls back to reading value by value.
+    """
+    if width:
+        rows = _parse_rows(text, start, width)
+        if rows is not None:
+            return rows
+    rows = []
+    row = None
+    position = start
+    for match in INSERT_TOKEN.finditer(text, start):
+        if match.start() != position:
+            break
+        kind = match.lastindex
+        if kind <= 3 and row is None:
+            # A value outside a row, such as ON DUPLICATE KEY UPDATE
+            break
+        position = match.end()
+        if kind == 1:
+            row.append(unescape(match.group(1)))
+        elif kind == 2:
+            row.append(None)
+        elif kind == 3:
+            row.append(match.group(3))
+        elif kind == 4:
+            if row is not None:
+                raise DumpFormatError(f"nested parenthesis at offset {match.start()} of an INSERT")
+            row = []
+        elif kind == 5:
+            rows.append(tuple(row))
+            row = None
+        else:
+            if row is not None:
+                raise DumpFormatError("INSERT ends inside a row")
+            return rows
+    raise DumpFormatError(f"cannot parse the INSERT values at offset {position}: {text[position:position + 40]!r}")
+
+
+class InsertBlock:
+    """The rows of one INSERT statement, parsed when iterated
+
+    columns are the INSERT's column list, or the table's columns if it has
+    none; table_info is the dump's CREATE TABLE for the table, or None.
+    """
+
+    def __init__(self, table, columns, table_info, sql, values_start, line_number):
+        self.table = table
+        self.columns = columns
+        self.table_info = table_info
+        self.sql = sql
+        self.line_number = line_number
+        self._values_start = values_start
+
+    def rows(self):
+        width = len(self.columns)
+        rows = parse_values(self.sql, self._values_start, width)
+        for number, row in enumerate(rows, 1):
+            if len(row) != width:
+                raise DumpFormatError(f"{self.table}: row {number} of the INSERT on line {self.line_number} "
+                                      f"has {len(row)} values, expected {width}")
+        return rows
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def __repr__(self):
+        return f"InsertBlock({self.table!r}, line {self.line_number})"
+
+
+class MysqlDumpReader:
+    """Iterate a mysqldump file as Statements and InsertBlocks"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.tables = {}
+        self.line_number = 0
+
+    def _open(self):
+        if self.path.endswith('.gz'):
+            f = gzip.open(self.path, 'rt', encoding='utf-8-sig')
+        else:
+            f = open(self.path, 'r', encoding='utf-8-sig', buffering=READ_BUFFER)
+        head = f.read(1)
+        while head.isspace():
+            head = f.read(1)
+        if head != '{':
+            f.seek(0)
+            return f
+        with f:
+            f.seek(0)
+            try:
+                wrapper = json.load(f)
+            except ValueError as e:
+                raise DumpFormatError(f"{self.path} is JSON but not a wrapped dump: {e}")
+        content = wrapper.get('content') if isinstance(wrapper, dict) else None
+        if not isinstance(content, str):
+            message = wrapper.get('error') or wrapper.get('message') if isinstance(wrapper, dict) else None
+            raise DumpFormatError(f"{self.path} is JSON without a dump in it"
+                                  + (f" ({message})" if message else ''))
+        return io.StringIO(content, newline=None)
+
+    def _check_format(self, line):
+        head = line.lstrip().lower()
+        for prefix, message in NOT_MYSQL_DUMP:
+            if head.startswith(prefix):
+                raise DumpFormatError(f"{self.path} is {message}")
+
+    def __iter__(self):
+        with self._open() as f:
+            pending = []
+            first = True
+            for line in f:
+                self.line_number += 1
+                if first and line.strip():
+                    # The header comments say what wrote the file
+                    self._check_format(line)
+                    first = line.lstrip().startswith('--')
+                if not pending:
+                    stripped = line.strip()
+                    if not stripped or stripped.startswith('--') or stripped.startswith('#'):
+                        continue
+                pending.append(line)
+                # Strings in a dump escape their newlines, so a statement ends at
+                # the first line that ends with ;
+                if line.rstrip().endswith(';'):
+                    yield self._statement(''.join(pending).strip(), self.line_number - len(pending) + 1)
+                    pending = []
+            if pending and ''.join(pending).strip():
+                yield self._statement(''.join(pending).strip(), self.line_number - len(pending) + 1)
+
+    def _statement(self, sql, line_number):
+        versioned = VERSIONED_COMMENT.match(sql) if sql.startswith('/*!') else None
+        if versioned is not None:
+            sql = versioned.group(1)
+            if not sql:
+                return Statement('COMMENT', '')
+        insert = INSERT.match(sql)
+        if insert is not None:
+            return self._insert_block(insert, sql, line_number)
+        kind = statement_kind(sql)
+        if kind.startswith('CREATE TABLE') or kind.startswith('CREATE TEMPORARY'):
+            table = parse_create_table(sql)
+            if table is not None:
+                self.tables[table.name] = table
+        return Statement(kind, sql)
+
+    def _insert_block(self, insert, sql, line_number):
+        table = unquote_identifier(insert.group('table'))
+        info = self.tables.get(table)
+        if insert.group('columns') is not None:
+            columns = tuple(unquote_identifier(name) for name in split_top_level(insert.group('columns'), ','))
+        elif info is not None:
+            columns = tuple(column.name for column in info.columns)
+        else:
+            raise DumpFormatError(f"{self.path}:{line_number}: INSERT INTO {table} lists no columns "
+                                  f"and the dump has no CREATE TABLE for it")
+        return InsertBlock(table, columns, info, sql, insert.end(), line_number)
+
+    def insert_blocks(self):
+        """Only the InsertBlocks, with the schema still collected from the statements"""
+        for item in self:
+            if isinstance(item, InsertBlock):
+                yield item
+
+
+def read_table(path, table, columns=None):
+    """Rows of one table, as tuples of columns (default: all, in dump order)"""
+    for block in MysqlDumpReader(path).insert_blocks():
+        if block.table != table:
+            continue
+        if columns is None:
+            yield from block
+            continue
+        missing = [name for name in columns if name not in block.columns]
+        if missing:
+            raise DumpFormatError(f"{table} has no column {', '.join(missing)}")
+        indexes = [block.columns.index(name) for name in columns]
+        for row in block:
+            yield tuple(row[index] for index in indexes)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m dbtools.mysqldump',
+                                     description='Stream the tables and rows of a mysqldump file.')
+    parser.add_argument('dump', help='mysqldump file (.sql or .sql.gz, or a JSON-wrapped dump)')
+    parser.add_argument('--table', metavar='NAME', help='print the rows of this table as JSON lines')
+    parser.add_argument('--columns', metavar='A,B', help='with --table, only these columns')
+    parser.add_argument('--limit', type=int, default=0, metavar='N', help='with --table, at most N rows')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    try:
+        if args.table:
+            columns = args.columns.split(',') if args.columns else None
+            for count, row in enumerate(read_table(args.dump, args.table, columns), 1):
+                print(json.dumps(row, ensure_ascii=False))
+                if args.limit and count >= args.limit:
+                    break
+            return 0
+        reader = MysqlDumpReader(args.dump)
+        statements = {}
+        rows = {}
+        for item in reader:
+            if isinstance(item, InsertBlock):
+                rows[item.table] = rows.get(item.table, 0) + len(item.rows())
+            else:
+                statements[item.kind] = statements.get(item.kind, 0) + 1
+    except (OSError, DumpFormatError) as e:
+        print(f"Cannot read {args.dump}: {e}")
+        return 2
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(args.dump)
+    for table in sorted(reader.tables):
+        key = ', '.join(reader.tables[table].primary_key) or '-'
+        print(f"{table}: {rows.get(table, 0)} rows (primary key: {key})")
+    print(f"\n{len(reader.tables)} tables, {sum(rows.values())} rows, "
+          + ', '.join(f"{count} {kind}" for kind, count in sorted(statements.items())))
+    print(f"{size / 1e6:.1f} MB in {seconds:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
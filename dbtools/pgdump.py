@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+"""Streaming reader for plain-format pg_dump files.
+
+A dump is read line by line and never held in memory. Iterating a DumpReader
+yields each SQL statement (DDL, SET, sequence values, ...) as a Statement and
+each `COPY ... FROM stdin` block as a CopyBlock, whose rows are produced as
+they are read:
+
+    reader = DumpReader('database_backup.sql')
+    for item in reader:
+        if isinstance(item, CopyBlock) and item.table == 'public.accounts':
+            for row in item:
+                ...
+
+Column types come from the dump's own CREATE TABLE statements, which
+pg_dump writes before the data, so rows are typed tuples: int, Decimal,
+bool, date, datetime, parsed JSON, str, and None for `\\N`. Fields are split
+on tabs and only lines with an escape are unescaped field by field. With a
+column selection (`select=`, or read_table's columns) the other fields are
+never decoded or converted at all.
+
+Rows a caller does not read are skipped when the reader moves on, the way
+itertools.groupby works. Files ending in `.gz` are decompressed on the fly.
+
+    python -m dbtools.pgdump database_backup.sql
+    python -m dbtools.pgdump database_backup.sql --table public.accounts --limit 5
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from datetime import date, datetime, time as time_of_day
+from decimal import Decimal
+
+READ_BUFFER = 1 << 20
+
+# kind is the statement's leading keywords, e.g. 'CREATE TABLE', 'ALTER TABLE ONLY',
+# or 'PSQL' for a psql meta-command line
+Statement = namedtuple('Statement', 'kind sql')
+# type is as written in the dump ('character varying(255)', 'numeric(18,2)', ...)
+Column = namedtuple('Column', 'name type nullable default')
+
+LEADING_KEYWORDS = re.compile(r'(?:[A-Z]+\b\s*){1,3}')
+# Quotes, dollar quotes, comments and statement ends: everything that changes
+# how the rest of a statement line is read
+SQL_INTEREST = re.compile(r"""'|"|\$(?:[A-Za-z_]\w*)?\$|--|/\*|;""")
+COPY_HEADER = re.compile(r'COPY\s+(?P<table>\S+)\s*(?:\((?P<columns>[^)]*)\))?\s+FROM\s+stdin\s*;\s*$',
+                         re.IGNORECASE)
+CREATE_TABLE = re.compile(r'CREATE\s+(?:UNLOGGED\s+)?TABLE\s+(?P<table>[^\s(]+)\s*\(', re.IGNORECASE)
+PRIMARY_KEY = re.compile(r'ALTER\s+TABLE\s+(?:ONLY\s+)?(?P<table>\S+)\s+ADD\s+CONSTRAINT\s+\S+\s+'
+                         r'PRIMARY\s+KEY\s*\((?P<columns>[^)]*)\)', re.IGNORECASE)
+TABLE_CONSTRAINT = re.compile(r'(?:CONSTRAINT|PRIMARY\s+KEY|UNIQUE|CHECK|FOREIGN\s+KEY|EXCLUDE)\b',
+                              re.IGNORECASE)
+COLUMN_OPTION = re.compile(r'\s+(?:NOT\s+NULL|NULL|DEFAULT|COLLATE|CONSTRAINT|GENERATED|PRIMARY\s+KEY|'
+                           r'REFERENCES|UNIQUE|CHECK)\b', re.IGNORECASE)
+DEFAULT_VALUE = re.compile(r'\bDEFAULT\s+(.*?)(?:\s+(?:NOT\s+NULL|NULL|COLLATE|CONSTRAINT|GENERATED)\b|$)',
+                           re.IGNORECASE | re.DOTALL)
+TYPE_MODIFIER = re.compile(r'\s*\(.*?\)')
+# A run of octal/hex escapes is one run of bytes; any other escape is one character
+COPY_ESCAPE = re.compile(r'((?:\\(?:[0-7]{1,3}|x[0-9A-Fa-f]{1,2}))+)|\\(.)')
+BYTE_ESCAPE = re.compile(r'\\(?:([0-7]{1,3})|x([0-9A-Fa-f]{1,2}))')
+COPY_ESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+
+NOT_PG_DUMP = (
+    ('<!doctype html', 'an HTML page, not a dump'),
+    ('<html', 'an HTML page, not a dump'),
+    ('{"', 'JSON (a dump wrapped in an API response?), not a dump'),
+    ('-- mysql dump', 'a MySQL dump; read it with dbtools.mysqldump'),
+    ('-- mariadb dump', 'a MariaDB dump; read it with dbtools.mysqldump'),
+)
+
+
+class DumpFormatError(ValueError):
+    pass
+
+
+def _unescape_match(match):
+    if match.group(1) is not None:
+        # Escaped bytes spell UTF-8 together (caf\303\251); bytes that do not
+        # decode are kept as \xhh text
+        data = bytes((int(octal, 8) if octal else int(hexadecimal, 16)) & 0xFF
+                     for octal, hexadecimal in BYTE_ESCAPE.findall(match.group(1)))
+        return data.decode('utf-8', 'backslashreplace')
+    text = match.group(2)
+    return COPY_ESCAPES.get(text, text)
+
+
+def unescape(field):
+    """A COPY text field's value: escapes decoded, `\\N` as None"""
+    if field == '\\N':
+        return None
+    if '\\' not in field:
+        return field
+    return COPY_ESCAPE.sub(_unescape_match, field)
+
+
+# Values a converter rejects (infinity timestamps, BC dates, NaN-like text)
+# are kept as text
+CONVERSION_ERRORS = (ValueError, ArithmeticError, LookupError)
+_boolean = {'t': True, 'f': False}.__getitem__
+
+CONVERTERS = {
+    'smallint': int, 'integer': int, 'bigint': int, 'int': int, 'int2': int, 'int4': int, 'int8': int,
+    'smallserial': int, 'serial': int, 'bigserial': int, 'oid': int,
+    'numeric': Decimal, 'decimal': Decimal,
+    'real': float, 'double precision': float, 'float4': float, 'float8': float,
+    'boolean': _boolean, 'bool': _boolean,
+    'date': date.fromisoformat,
+    'timestamp without time zone': datetime.fromisoformat,
+    'timestamp with time zone': datetime.fromisoformat,
+    'timestamp': datetime.fromisoformat, 'timestamptz': datetime.fromisoformat,
+    'time without time zone': time_of_day.fromisoformat, 'time': time_of_day.fromisoformat,
+    'json': json.loads, 'jsonb': json.loads,
+}
+
+
+def base_type(type_name):
+    """'character varying(255)' -> 'character varying'; arrays keep their []"""
+    return TYPE_MODIFIER.sub('', type_name).strip().lower()
+
+
+def converter(type_name):
+    """Function turning a column's text into a Python value, or None to keep the text"""
+    return CONVERTERS.get(base_type(type_name))
+
+
+class Table:
+    def __init__(self, name, columns):
+        self.name = name
+        self.columns = columns
+        self.primary_key = ()
+
+    def column(self, name):
+        for column in self.columns:
+            if column.name == name:
+                return column
+        return None
+
+    def __repr__(self):
+        return f"Table({self.name!r}, {len(self.columns)} columns, primary key {self.primary_key})"
+
+
+def unquote_identifier(name):
+    name = name.strip()
+    if len(name) >= 2 and name[0] == '"' and name[-1] == '"':
+        return name[1:-1].replace('""', '"')
+    return name
+
+
+def qualified_name(name):
+    """Table name with its quotes removed and its schema made explicit"""
+    parts = [unquote_identifier(part) for part in split_top_level(name, '.')]
+    if len(parts) == 1:
+        parts.insert(0, 'public')
+    return '.'.join(parts)
+
+
+def split_top_level(text, separator):
+    """Split on separator outside quotes and parentheses"""
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for index, char in enumerate(text):
+        if quote is not None:
+            if char == quote:
+                quote = None
+        elif char in '\'"`':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:index])
+            start = index + 1
+    parts.append(text[start:])
+    return parts
+
+
+def parse_create_table(sql):
+    """Table for a CREATE TABLE statement, or None if it is not one"""
+    match = CREATE_TABLE.match(sql)
+    if match is None:
+        return None
+    body = sql[match.end():sql.rstrip().rstrip(';').rstrip().rfind(')')]
+    columns = []
+    primary_key = ()
+    for definition in split_top_level(body, ','):
+        definition = definition.strip()
+        if not definition:
+            continue
+        if TABLE_CONSTRAINT.match(definition):
+            inline = re.search(r'PRIMARY\s+KEY\s*\(([^)]*)\)', definition, re.IGNORECASE)
+            if inline:
+                primary_key = tuple(unquote_identifier(name) for name in inline.group(1).split(','))
+            continue
+        if definition.startswith('"'):
+            end = definition.index('"', 1)
+            while definition[end + 1:end + 2] == '"':
+                end = definition.index('"', end + 2)
+            name, rest = unquote_identifier(definition[:end + 1]), definition[end + 1:]
+        else:
+            name, _, rest = definition.partition(' ')
+        option = COLUMN_OPTION.search(rest)
+        type_name = (rest[:option.start()] if option else rest).strip()
+        default = DEFAULT_VALUE.search(rest)
+        columns.append(Column(name, type_name, not re.search(r'\bNOT\s+NULL\b', rest, re.IGNORECASE),
+                              default.group(1).strip() if default else None))
+        if re.search(r'\bPRIMARY\s+KEY\b', rest, re.IGNORECASE):
+            primary_key = (name,)
+    table = Table(qualified_name(match.group('table')), columns)
+    table.primary_key = primary_key
+    return table
+
+
+def statement_kind(sql):
+    match = LEADING_KEYWORDS.match(sql)
+    return ' '.join(match.group().split()) if match else sql.split(None, 1)[0].upper()
+
+
+def _row_function(indexes, converters):
+    """fields -> row, with \\N as None and each column converted, as one tuple expression
+
+    Generated once per block: a loop over the columns in Python costs more
+    than the conversions themselves.
+    """
+    namespace = {}
+    items = []
+    for position, (index, convert) in enumerate(zip(indexes, converters)):
+        value = f"v{position}"
+        if convert is None:
+            items.append(f"None if ({value} := f[{index}]) == '\\\\N' else {value}")
+        else:
+            namespace[f"c{position}"] = convert
+            items.append(f"None if ({value} := f[{index}]) == '\\\\N' else c{position}({value})")
+    exec(f"def row(f):\n    return ({', '.join(items)},)\n", namespace)
+    return namespace['row']
+
+
+class CopyBlock:
+    """The rows of one `COPY table (columns) FROM stdin` block, read on demand
+
+    columns are the names in the COPY header; table_info is the dump's
+    CREATE TABLE for the table, or None if the dump did not have one.
+    Iterating yields each row as a tuple (of the selected columns only, if
+    the reader was given a selection for this table).
+    """
+
+    def __init__(self, reader, table, columns, table_info, line_number, selected=None, typed=True):
+        self.table = table
+        self.columns = columns
+        self.table_info = table_info
+        self.line_number = line_number
+        self.rows_read = 0
+        self._reader = reader
+        self._done = False
+        if selected is None:
+            indexes = list(range(len(columns)))
+        else:
+            missing = [name for name in selected if name not in columns]
+            if missing:
+                raise DumpFormatError(f"{table} has no column {', '.join(missing)} "
+                                      f"(columns: {', '.join(columns)})")
+            indexes = [columns.index(name) for name in selected]
+        self.selected = tuple(columns[index] for index in indexes)
+        self._width = len(columns)
+        self._indexes = indexes
+        self._converters = []
+        for index in indexes:
+            convert = None
+            if typed and table_info is not None:
+                column = table_info.column(columns[index])
+                convert = converter(column.type) if column is not None else None
+            self._converters.append(convert)
+        self._row = _row_function(indexes, self._converters)
+
+    def _decode(self, line):
+        fields = line.split('\t')
+        if len(fields) != self._width:
+            raise DumpFormatError(f"{self.table}: row {self.rows_read} has {len(fields)} fields, "
+                                  f"expected {self._width}")
+        # pg_dump only writes \N as a whole field, so a line whose backslashes
+        # all start a \N has nulls but no escapes
+        if '\\' in line and line.count('\\') != line.count('\\N'):
+            return self._decode_fields(fields)
+        try:
+            return self._row(fields)
+        except CONVERSION_ERRORS:
+            return self._decode_fields(fields)
+
+    def _decode_fields(self, fields):
+        # One field at a time: escapes, and values a converter rejects kept as text
+        row = []
+        for index, convert in zip(self._indexes, self._converters):
+            value = unescape(fields[index])
+            if value is not None and convert is not None:
+                try:
+                    value = convert(value)
+                except CONVERSION_ERRORS:
+                    pass
+            row.append(value)
+        return tuple(row)
+
+    def _lines(self):
+        if self._done:
+            return
+        reader = self._reader
+        for line in reader._file:
+            line = line.rstrip('\r\n')
+            if line == '\\.':
+                break
+            self.rows_read += 1
+            yield line
+        else:
+            raise DumpFormatError(f"{reader.path}: COPY {self.table} not terminated by \\.")
+        reader.line_number = self.line_number + self.rows_read + 1
+        self._done = True
+
+    def __iter__(self):
+        decode = self._decode
+        for line in self._lines():
+            yield decode(line)
+
+    def raw(self):
+        """The rows as COPY text lines, undecoded"""
+        return self._lines()
+
+    def skip(self):
+        for _ in self._lines():
+            pass
+
+    def __repr__(self):
+        return f"CopyBlock({self.table!r}, {len(self.columns)} columns)"
+
+
+class DumpReader:
+    """Iterate a plain pg_dump file as Statements and CopyBlocks
+
+    select maps qualified table names to the column names to decode for them;
+    typed=False keeps every field a str (or None).
+    """
+
+    def __init__(self, path, select=None, typed=True):
+        self.path = str(path)
+        self.select = {qualified_name(name): tuple(columns) for name, columns in (select or {}).items()}
+        self.typed = typed
+        self.tables = {}
+        self.line_number = 0
+        self._file = None
+        self._block = None
+
+    def _open(self):
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, 'rt', encoding='utf-8-sig', newline='\n')
+        return open(self.path, 'r', encoding='utf-8-sig', newline='\n', buffering=READ_BUFFER)
+
+    def _check_format(self, line):
+        head = line.lstrip().lower()
+        for prefix, message in NOT_PG_DUMP:
+            if head.startswith(prefix):
+                raise DumpFormatError(f"{self.path} is {message}")
+
+    def __iter__(self):
+        with self._open() as f:
+            self._file = f
+            try:
+                yield from self._items()
+            finally:
+                self._file = None
+
+    def _items(self):
+        pending = []
+        state = None   # None, a quote character, a dollar tag or '/*' while inside one
+        first = True
+        for line in self._file:
+            self.line_number += 1
+            if first and line.strip():
+                self._check_format(line)
+                first = False
+            if state is None and not pending:
+                stripped = line.strip()
+                if not stripped or stripped.startswith('--'):
+                    continue
+                if stripped.startswith('\\'):
+                    # psql meta-commands such as \restrict (pg_dump 16.10+)
+                    yield Statement('PSQL', stripped)
+                    continue
+                if stripped[:4].upper() == 'COPY':
+                    header = COPY_HEADER.match(stripped)
+                    if header is not None:
+                        block = self._copy_block(header)
+                        yield block
+                        # Rows the caller did not read still have to be passed over
+                        block.skip()
+                        continue
+            pos = 0
+            while True:
+                state, end = _scan_sql(line, state, pos)
+                if end is None:
+                    pending.append(line[pos:])
+                    break
+                pending.append(line[pos:end + 1])
+                yield self._statement(''.join(pending).strip())
+                pending = []
+                pos = end + 1
+                if not line[pos:].strip():
+                    break
+        if pending and ''.join(pending).strip():
+            yield self._statement(''.join(pending).strip())
+
+    def _copy_block(self, header):
+        table = qualified_name(header.group('table'))
+        columns = header.group('columns')
+        info = self.tables.get(table)
+        if columns is not None:
+            columns = tuple(unquote_identifier(name) for name in columns.split(','))
+        elif info is not None:
+            columns = tuple(column.name for column in info.columns)
+        else:
+            raise DumpFormatError(f"{self.path}:{self.line_number}: COPY {table} lists no columns "
+                                  f"and the dump has no CREATE TABLE for it")
+        return CopyBlock(self, table, columns, info, self.line_number, self.select.get(table), self.typed)
+
+    def _statement(self, sql):
+        kind = statement_kind(sql)
+        if kind == 'CREATE TABLE' or kind == 'CREATE UNLOGGED TABLE':
+            table = parse_create_table(sql)
+            if table is not None:
+                self.tables[table.name] = table
+        elif kind.startswith('ALTER TABLE'):
+            match = PRIMARY_KEY.match(sql)
+            if match is not None:
+                table = self.tables.get(qualified_name(match.group('table')))
+                if table is not None:
+                    table.primary_key = tuple(unquote_identifier(name)
+                                              for name in match.group('columns').split(','))
+        return Statement(kind, sql)
+
+    def copy_blocks(self):
+        """Only the CopyBlocks, with the schema still collected from the statements"""
+        for item in self:
+            if isinstance(item, CopyBlock):
+                yield item
+
+
+def _scan_sql(line, state, pos=0):
+    """(state at the end of line, offset of the first statement-ending ; from pos, or None)"""
+    while True:
+        if state is None:
+            match = SQL_INTEREST.search(line, pos)
+            if match is None:
+                return None, None
+            token = match.group()
+            if token == ';':
+                return None, match.start()
+            if token == '--':
+                return None, None
+            state = token
+            pos = match.end()
+        else:
+            close = '*/' if state == '/*' else state
+            end = line.find(close, pos)
+            if end < 0:
+                return state, None
+            pos = end + len(close)
+            state = None
+
+
+def read_table(path, table, columns=None, typed=True):
+    """Rows of one table, as tuples of columns (default: all, in dump order)"""
+    table = qualified_name(table)
+    select = {table: columns} if columns else None
+    for block in DumpReader(path, select, typed).copy_blocks():
+        if block.table == table:
+            yield from block
+            return
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m dbtools.pgdump',
+                                     description='Stream the tables and rows of a plain pg_dump file.')
+    parser.add_argument('dump', help='pg_dump file (plain format, .sql or .sql.gz)')
+    parser.add_argument('--table', metavar='NAME', help='print the rows of this table as JSON lines')
+    parser.add_argument('--columns', metavar='A,B', help='with --table, only these columns')
+    parser.add_argument('--limit', type=int, default=0, metavar='N', help='with --table, at most N rows')
+    parser.add_argument('--raw', action='store_true', help='keep every value a string')
+    return parser
+
+
+def _json_default(value):
+    return str(value)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    try:
+        if args.table:
+            columns = args.columns.split(',') if args.columns else None
+            for count, row in enumerate(read_table(args.dump, args.table, columns, not args.raw), 1):
+                print(json.dumps(row, ensure_ascii=False, default=_json_default))
+                if args.limit and count >= args.limit:
+                    break
+            return 0
+        reader = DumpReader(args.dump, typed=not args.raw)
+        statements = {}
+        rows = {}
+        for item in reader:
+            if isinstance(item, CopyBlock):
+                rows[item.table] = sum(1 for _ in item.raw())
+            else:
+                statements[item.kind] = statements.get(item.kind, 0) + 1
+    except (OSError, DumpFormatError) as e:
+        print(f"Cannot read {args.dump}: {e}")
+        return 2
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(args.dump)
+    for table in sorted(rows):
+        info = reader.tables.get(table)
+        key = ', '.join(info.primary_key) if info is not None and info.primary_key else '-'
+        print(f"{table}: {rows[table]} rows (primary key: {key})")
+    print(f"\n{len(reader.tables)} tables, {sum(rows.values())} rows, "
+          + ', '.join(f"{count} {kind}" for kind, count in sorted(statements.items())))
+    print(f"{size / 1e6:.1f} MB in {seconds:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import pytest
+
+from dbtools.mysqldump import MysqlDumpReader, parse_values, read_table, unescape
+from dbtools.pgdump import DumpFormatError
+
+DUMP = """-- MySQL dump 10.13  Distrib 8.0.36
+/*!40101 SET NAMES utf8mb4 */;
+DROP TABLE IF EXISTS `users`;
+CREATE TABLE `users` (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `name` varchar(100) NOT NULL,
+  `role` enum('admin','user') DEFAULT 'user',
+  `active` tinyint(1) NOT NULL DEFAULT '1',
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+INSERT INTO `users` VALUES (1,'O\\'Brien','admin',1),(2,'it''s; (not) a row',NULL,0),(3,'عربي\\nline','user',1);
+"""
+
+
+@pytest.fixture
+def dump(tmp_path):
+    path = tmp_path / 'dump.sql'
+    path.write_text(DUMP, encoding='utf-8')
+    return str(path)
+
+
+def test_unescape():
+    assert unescape("plain") == 'plain'
+    assert unescape("it''s") == "it's"
+    assert unescape("a\\'b\\\\c\\nd\\0e\\Zf\\%") == "a'b\\c\nd\0e\x1af%"
+
+
+@pytest.mark.parametrize('width', [None, 3])
+def test_parse_values(width):
+    text = "(1,'a, (b)',NULL),(2,_utf8mb4'x\\'y',-1.5e3);"
+    assert parse_values(text, width=width) == [('1', 'a, (b)', None), ('2', "x'y", '-1.5e3')]
+
+
+def test_rows_of_the_wrong_width_fall_back_to_the_token_parser():
+    assert parse_values("(1,'a'),(2);", width=2) == [('1', 'a'), ('2',)]
+
+
+def test_malformed_values_are_reported():
+    with pytest.raises(DumpFormatError):
+        parse_values("(1,'a'")
+    with pytest.raises(DumpFormatError):
+        parse_values("(1,(2));")
+    with pytest.raises(DumpFormatError):
+        parse_values("(1) ON DUPLICATE KEY UPDATE id=id;")
+
+
+def test_read_table(dump):
+    assert list(read_table(dump, 'users')) == [
+        ('1', "O'Brien", 'admin', '1'),
+        ('2', "it's; (not) a row", None, '0'),
+        ('3', 'عربي\nline', 'user', '1'),
+    ]
+    assert list(read_table(dump, 'users', ['name', 'id']))[0] == ("O'Brien", '1')
+
+
+def test_schema(dump):
+    reader = MysqlDumpReader(dump)
+    for _ in reader:
+        pass
+    table = reader.tables['users']
+    assert [(column.name, column.type) for column in table.columns] == [
+        ('id', 'int'), ('name', 'varchar(100)'), ('role', "enum('admin','user')"), ('active', 'tinyint(1)')]
+    assert table.primary_key == ('id',)
+    assert not table.columns[1].nullable and table.columns[2].default == "'user'"
+
+
+def test_pg_dumps_are_refused(tmp_path):
+    path = tmp_path / 'pg.sql'
+    path.write_text('--\n-- PostgreSQL database dump\n--\n', encoding='utf-8')
+    with pytest.raises(DumpFormatError, match='pg_dump'):
+        list(MysqlDumpReader(str(path)))
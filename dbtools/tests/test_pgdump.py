@@ -0,0 +1,96 @@
+import gzip
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from dbtools.pgdump import DumpFormatError, DumpReader, read_table, unescape
+
+DUMP = """--
+-- PostgreSQL database dump
+--
+
+SET statement_timeout = 0;
+
+CREATE TABLE public.items (
+    id integer NOT NULL,
+    name character varying(50),
+    price numeric(10,2),
+    active boolean DEFAULT true NOT NULL,
+    created date,
+    seen timestamp without time zone,
+    meta jsonb
+);
+
+COPY public.items (id, name, price, active, created, seen, meta) FROM stdin;
+1\tcaf\\303\\251\t9.50\tt\t2024-01-02\t2024-01-02 03:04:05\t{"a": 1}
+2\ttab\\there\\nnew\\\\line\t\\N\tf\tinfinity\t\\N\t\\N
+3\t\\x41\\x42 \\101\t0\tt\t\\N\t\\N\t[]
+\\.
+
+ALTER TABLE ONLY public.items
+    ADD CONSTRAINT items_pkey PRIMARY KEY (id);
+"""
+
+
+@pytest.fixture
+def dump(tmp_path):
+    path = tmp_path / 'dump.sql'
+    path.write_text(DUMP, encoding='utf-8')
+    return str(path)
+
+
+def test_unescape():
+    assert unescape('\\N') is None
+    assert unescape('plain') == 'plain'
+    assert unescape('a\\tb\\nc\\\\d\\re') == 'a\tb\nc\\d\re'
+    assert unescape('x\\q') == 'xq'
+
+
+def test_unescape_byte_runs_decode_as_utf8():
+    assert unescape('caf\\303\\251') == 'café'
+    assert unescape('caf\\xc3\\xa9!') == 'café!'
+    assert unescape('\\330\\271\\330\\261\\330\\250\\331\\212') == 'عربي'
+    assert unescape('\\101\\x42') == 'AB'
+    # A byte that is not UTF-8 is kept visible rather than failing the read
+    assert unescape('bad\\377x') == 'bad\\xffx'
+    # An escaped backslash followed by digits is not an octal escape
+    assert unescape('\\\\101') == '\\101'
+
+
+def test_typed_rows(dump):
+    rows = list(read_table(dump, 'items'))
+    assert rows[0] == (1, 'café', Decimal('9.50'), True, date(2024, 1, 2),
+                       datetime(2024, 1, 2, 3, 4, 5), {'a': 1})
+    # A value the converter rejects stays as text
+    assert rows[1] == (2, 'tab\there\nnew\\line', None, False, 'infinity', None, None)
+    assert rows[2][1] == 'AB A'
+
+
+def test_selected_columns_and_untyped(dump):
+    assert list(read_table(dump, 'items', ['price', 'id'])) == [
+        (Decimal('9.50'), 1), (None, 2), (Decimal('0'), 3)]
+    assert list(read_table(dump, 'items', ['id'], typed=False)) == [('1',), ('2',), ('3',)]
+
+
+def test_schema_and_primary_key(dump):
+    reader = DumpReader(dump)
+    for _ in reader:
+        pass
+    table = reader.tables['public.items']
+    assert [column.name for column in table.columns][:3] == ['id', 'name', 'price']
+    assert table.primary_key == ('id',)
+
+
+def test_gzipped_dump(tmp_path):
+    path = tmp_path / 'dump.sql.gz'
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(DUMP)
+    assert len(list(read_table(str(path), 'items'))) == 3
+
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / 'mysql.sql'
+    path.write_text('-- MySQL dump 10.13\n', encoding='utf-8')
+    with pytest.raises(DumpFormatError, match='MySQL'):
+        list(DumpReader(str(path)))
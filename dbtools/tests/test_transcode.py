@@ -0,0 +1,47 @@
+import pytest
+
+from dbtools.pgdump import CONVERSION_ERRORS
+from dbtools.transcode import camel_case, copy_text, value_converter
+
+
+def test_copy_text():
+    assert copy_text('plain') == 'plain'
+    assert copy_text('a\tb\nc\rd\\e') == 'a\\tb\\nc\\rd\\\\e'
+    with pytest.raises(ValueError):
+        copy_text('nul\0')
+
+
+@pytest.mark.parametrize('type_name, value, expected', [
+    ('integer', '42', '42'),
+    ('smallint', '-32768', '-32768'),
+    ('boolean', '1', 't'),
+    ('boolean', '0', 'f'),
+    ('numeric(10,2)', '9.50', '9.50'),
+    ('date', '2024-01-02', '2024-01-02'),
+    ('timestamp without time zone', '2024-01-02 03:04:05', '2024-01-02 03:04:05'),
+    ('timestamp with time zone', '2024-01-02 03:04:05', '2024-01-02 03:04:05+00'),
+    ('jsonb', '{"a": "x\\ty"}', '{"a": "x\\\\ty"}'),
+    ('character varying(5)', 'ab\tc', 'ab\\tc'),
+    ('text', 'line\nbreak', 'line\\nbreak'),
+])
+def test_values_are_converted(type_name, value, expected):
+    assert value_converter(type_name)(value) == expected
+
+
+@pytest.mark.parametrize('type_name, value', [
+    ('smallint', '32768'),
+    ('integer', 'abc'),
+    ('date', '0000-00-00'),
+    ('timestamp without time zone', '0000-00-00 00:00:00'),
+    ('jsonb', '{not json'),
+    ('character varying(3)', 'abcd'),
+    ('boolean', 'maybe'),
+])
+def test_values_the_column_cannot_hold_are_rejected(type_name, value):
+    with pytest.raises(CONVERSION_ERRORS):
+        value_converter(type_name)(value)
+
+
+def test_camel_case():
+    assert camel_case('alert_type') == 'alertType'
+    assert camel_case('id') == 'id'
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""Transcode the INSERTs of a mysqldump into PostgreSQL COPY blocks.
+
+The migrate-data-*.ts scripts move the MySQL data one ORM insert at a time.
+This reads the dump's `INSERT ... VALUES` statements instead and writes a
+data-only SQL file that psql loads with COPY, the way pg_restore does:
+
+    python -m dbtools.transcode 666666_clean.sql data.sql
+    psql -v ON_ERROR_STOP=1 --single-transaction -d 666666 -f data.sql
+
+Values are rewritten for the columns of drizzle/schema.ts, read with
+dbtools.drizzle: tinyint(1) becomes boolean t/f, MySQL's zero dates
+('0000-00-00 00:00:00') become NULL, enum columns go to the varchar columns
+that replaced them (named after their property, `alert_type` -> "alertType"),
+JSON is checked, and every value is escaped for COPY's text format. A value
+the target column cannot hold is loaded as NULL and counted in the report; in
+a NOT NULL column it stops the transcode with the table, column and value.
+Columns the schema does not have are dropped and tables it does not have are
+skipped, __drizzle_migrations among them. Serial sequences are moved past the
+largest id loaded.
+
+INSERT statements are transcoded by a process pool, several tables at once,
+and written back in dump order, one COPY block per table.
+
+    python -m dbtools.transcode dump.sql.gz data.sql -j 4 --truncate
+    python -m dbtools.transcode 666666_clean.sql data.sql --tables customers,meters
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from datetime import date, datetime
+from functools import partial
+from typing import NamedTuple
+
+from .drizzle import SchemaError, read_schema
+from .mysqldump import MysqlDumpReader
+from .pgdump import CONVERSION_ERRORS, DumpFormatError, base_type
+
+DEFAULT_SCHEMA = os.path.join('drizzle', 'schema.ts')
+SKIPPED_TABLES = {'__drizzle_migrations'}
+NULL = '\\N'
+COPY_SPECIAL = re.compile(r'[\\\t\n\r\0]')
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+WORD_START = re.compile(r'_([a-z0-9])')
+VARCHAR_LENGTH = re.compile(r'character(?: varying)?\((\d+)\)')
+BOOLEANS = {'1': 't', '0': 'f', 't': 't', 'f': 'f', 'true': 't', 'false': 'f'}
+INTEGER_LIMITS = {'smallint': 1 << 15, 'integer': 1 << 31, 'bigint': 1 << 63}
+
+
+def copy_text(value):
+    """value escaped for a field of COPY's text format"""
+    if COPY_SPECIAL.search(value) is None:
+        return value
+    if '\0' in value:
+        raise ValueError("PostgreSQL text cannot hold a NUL character")
+    return value.translate(COPY_ESCAPES)
+
+
+def _integer(limit, value):
+    number = int(value)
+    if not -limit <= number < limit:
+        raise ValueError("out of range")
+    return str(number)
+
+
+def _numeric(value):
+    float(value)
+    return value
+
+
+def _boolean(value):
+    flag = BOOLEANS.get(value.lower())
+    if flag is None:
+        flag = 't' if int(value) else 'f'
+    return flag
+
+
+def _date(value):
+    # MySQL's zero dates ('0000-00-00') fail here and are loaded as NULL
+    date.fromisoformat(value[:10])
+    return value[:10]
+
+
+def _timestamp(value):
+    datetime.fromisoformat(value)
+    return value
+
+
+def _timestamptz(value):
+    # mysqldump writes timestamps in UTC (it sets TIME_ZONE='+00:00')
+    if datetime.fromisoformat(value).tzinfo is None:
+        return value + '+00'
+    return value
+
+
+def _json(value):
+    json.loads(value)
+    return copy_text(value)
+
+
+def _varchar(length, value):
+    if len(value) > length:
+        raise ValueError(f"longer than {length} characters")
+    return copy_text(value)
+
+
+def value_converter(type_name):
+    """Function from a MySQL value (str) to the COPY text of a PostgreSQL column type
+
+    It raises one of CONVERSION_ERRORS for a value the type cannot hold.
+    """
+    name = base_type(type_name)
+    if name in INTEGER_LIMITS:
+        return partial(_integer, INTEGER_LIMITS[name])
+    if name in ('numeric', 'decimal', 'real', 'double precision'):
+        return _numeric
+    if name == 'boolean':
+        return _boolean
+    if name == 'date':
+        return _date
+    if name in ('timestamp without time zone', 'timestamp'):
+        return _timestamp
+    if name in ('timestamp with time zone', 'timestamptz'):
+        return _timestamptz
+    if name in ('json', 'jsonb'):
+        return _json
+    length = VARCHAR_LENGTH.fullmatch(type_name.strip().lower())
+    if length is not None:
+        return partial(_varchar, int(length.group(1)))
+    return copy_text
+
+
+def camel_case(name):
+    """'alert_type' -> 'alertType'"""
+    return WORD_START.sub(lambda match: match.group(1).upper(), name)
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def target_column(table, name):
+    """The column of the target table a MySQL column loads into, or None"""
+    column = table.column(name)
+    if column is None:
+        # Enum columns were renamed after their TypeScript property
+        column = table.column(camel_case(name))
+    return column
+
+
+class Step(NamedTuple):
+    index: int
+    column: str
+    type: str
+    convert: object
+    nullable: bool
+
+
+class CopyPlan(NamedTuple):
+    """How the rows of INSERTs with one column list become COPY rows"""
+    table: str
+    columns: tuple
+    steps: tuple
+    dropped: tuple
+    serials: tuple
+
+
+def plan_copy(table, columns, target):
+    """CopyPlan for INSERT INTO table (columns) into the target Table"""
+    steps = []
+    dropped = []
+    for index, name in enumerate(columns):
+        column = target_column(target, name)
+        if column is None or any(step.column == column.name for step in steps):
+            dropped.append(name)
+            continue
+        steps.append(Step(index, column.name, column.type, value_converter(column.type), column.nullable))
+    loaded = {step.column for step in steps}
+    for column in target.columns:
+        if column.name not in loaded and not column.nullable and column.default is None:
+            raise DumpFormatError(f"{table}.{column.name} is NOT NULL without a default "
+                                  f"and the dump has no value for it")
+    serials = tuple(position for position, step in enumerate(steps)
+                    if (target.column(step.column).default or '').startswith('nextval('))
+    return CopyPlan(table, tuple(columns), tuple(steps), tuple(dropped), serials)
+
+
+def _convert_fields(plan, block, row, nulled):
+    fields = []
+    for step in plan.steps:
+        value = row[step.index]
+        if value is None:
+            fields.append(NULL)
+            continue
+        try:
+            fields.append(step.convert(value))
+        except CONVERSION_ERRORS as e:
+            if not step.nullable:
+                raise DumpFormatError(f"{plan.table}: {value!r} cannot go into the NOT NULL column "
+                                      f"{step.column} {step.type} ({e or type(e).__name__}), "
+                                      f"INSERT on line {block.line_number}")
+            fields.append(NULL)
+            nulled[step.column] = nulled.get(step.column, 0) + 1
+    return fields
+
+
+def transcode_block(plan, block):
+    """COPY text of an InsertBlock's rows: (text, rows, {column: values nulled}, serial maxima)"""
+    steps = [(step.index, step.convert) for step in plan.steps]
+    rows = block.rows()
+    nulled = {}
+    lines = []
+    for row in rows:
+        try:
+            fields = [NULL if (value := row[index]) is None else convert(value) for index, convert in steps]
+        except CONVERSION_ERRORS:
+            fields = _convert_fields(plan, block, row, nulled)
+        lines.append('\t'.join(fields))
+        lines.append('\n')
+    maxima = []
+    for position in plan.serials:
+        index = plan.steps[position].index
+        maxima.append(max((int(row[index]) for row in rows if row[index] is not None), default=None))
+    return ''.join(lines), len(rows), nulled, maxima
+
+
+class CopyWriter:
+    """Writes transcoded INSERTs as COPY blocks, one per run of a table's INSERTs"""
+
+    def __init__(self, f, truncate=False):
+        self.f = f
+        self.truncate = truncate
+        self.plan = None
+        self.tables = {}
+        self.sequences = {}
+
+    def write(self, plan, result):
+        text, rows, nulled, maxima = result
+        if plan is not self.plan:
+            self.close_copy()
+            self._open_copy(plan)
+        self.f.write(text)
+        entry = self.tables[plan.table]
+        entry['rows'] += rows
+        for column, count in nulled.items():
+            entry['nulled'][column] = entry['nulled'].get(column, 0) + count
+        for position, largest in zip(plan.serials, maxima):
+            key = (plan.table, plan.steps[position].column)
+            if largest is not None and largest > self.sequences.get(key, 0):
+                self.sequences[key] = largest
+
+    def _open_copy(self, plan):
+        table = 'public.' + quote_identifier(plan.table)
+        if plan.table not in self.tables:
+            self.tables[plan.table] = {'rows': 0, 'nulled': {}, 'dropped': []}
+            if self.truncate:
+                self.f.write(f"TRUNCATE TABLE {table};\n\n")
+        entry = self.tables[plan.table]
+        entry['dropped'] += [name for name in plan.dropped if name not in entry['dropped']]
+        columns = ', '.join(quote_identifier(step.column) for step in plan.steps)
+        self.f.write(f"COPY {table} ({columns}) FROM stdin;\n")
+        self.plan = plan
+
+    def close_copy(self):
+        if self.plan is not None:
+            self.f.write('\\.\n\n')
+            self.plan = None
+
+    def finish(self):
+        self.close_copy()
+        for (table, column), largest in sorted(self.sequences.items()):
+            name = "'" + ('public.' + quote_identifier(table)).replace("'", "''") + "'"
+            self.f.write(f"SELECT pg_catalog.setval(pg_catalog.pg_get_serial_sequence({name}, "
+                         f"'{column}'), {largest}, true);\n")
+
+
+def _drain(pending, writer, limit):
+    # Results are written in submission order, so every table keeps its dump order
+    while len(pending) > limit:
+        plan, future = pending.popleft()
+        writer.write(plan, future.result())
+
+
+def transcode_dump(path, output, schema=DEFAULT_SCHEMA, tables=None, jobs=1, truncate=False):
+    """Write the data of a mysqldump as PostgreSQL COPY blocks for the schema's tables
+
+    Returns the report: {'tables': {name: {'rows', 'nulled', 'dropped'}},
+    'skipped': {name: INSERT statements}}. The output is written to a
+    temporary file and moved into place once complete.
+    """
+    targets = read_schema(schema)
+    wanted = None if tables is None else set(tables)
+    reader = MysqlDumpReader(path)
+    plans = {}
+    skipped = {}
+    pool = None
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=jobs)
+    pending = deque()
+    temporary = output + '.tmp'
+    try:
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(f"--\n-- Data of {os.path.basename(path)} for {schema}, written by dbtools.transcode\n--\n\n"
+                    "SET client_encoding = 'UTF8';\nSET standard_conforming_strings = on;\n\n")
+            writer = CopyWriter(f, truncate)
+            for block in reader.insert_blocks():
+                if wanted is not None and block.table not in wanted:
+                    continue
+                target = targets.get(block.table)
+                if target is None or block.table in SKIPPED_TABLES:
+                    skipped[block.table] = skipped.get(block.table, 0) + 1
+                    continue
+                key = (block.table, block.columns)
+                plan = plans.get(key)
+                if plan is None:
+                    plan = plans[key] = plan_copy(block.table, block.columns, target)
+                if pool is None:
+                    writer.write(plan, transcode_block(plan, block))
+                else:
+                    pending.append((plan, pool.submit(transcode_block, plan, block)))
+                    # A few INSERTs per worker in flight keeps the pool busy in bounded memory
+                    _drain(pending, writer, jobs * 2)
+            _drain(pending, writer, 0)
+            writer.finish()
+        os.replace(temporary, output)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return {'tables': writer.tables, 'skipped': skipped}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m dbtools.transcode',
+                                     description='Transcode the INSERTs of a mysqldump into PostgreSQL COPY blocks.')
+    parser.add_argument('dump', help='mysqldump file (.sql or .sql.gz, or a JSON-wrapped dump)')
+    parser.add_argument('output', help='SQL file to write, for psql -f')
+    parser.add_argument('--schema', default=DEFAULT_SCHEMA, metavar='FILE',
+                        help=f'Drizzle schema with the PostgreSQL tables (default: {DEFAULT_SCHEMA})')
+    parser.add_argument('--tables', metavar='A,B', help='only transcode these tables')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--truncate', action='store_true', help='empty each table before its COPY')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    tables = args.tables.split(',') if args.tables else None
+    start = time.perf_counter()
+    try:
+        report = transcode_dump(args.dump, args.output, args.schema, tables, max(1, args.jobs), args.truncate)
+    except (OSError, DumpFormatError, SchemaError) as e:
+        print(f"Cannot transcode {args.dump}: {e}")
+        return 2
+    seconds = time.perf_counter() - start
+    for name, table in report['tables'].items():
+        notes = [f"{column}: {count} values loaded as NULL" for column, count in table['nulled'].items()]
+        if table['dropped']:
+            notes.append(f"not in the schema: {', '.join(table['dropped'])}")
+        print(f"{name}: {table['rows']} rows" + (f" ({'; '.join(notes)})" if notes else ''))
+    if report['skipped']:
+        print(f"skipped, not in {args.schema}: {', '.join(sorted(report['skipped']))}")
+    rows = sum(table['rows'] for table in report['tables'].values())
+    print(f"\n{len(report['tables'])} tables, {rows} rows -> {args.output} "
+          f"({os.path.getsize(args.output) / 1e6:.1f} MB)")
+    print(f"{os.path.getsize(args.dump) / 1e6:.1f} MB in {seconds:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
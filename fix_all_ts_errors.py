@@ -1,74 +1,7 @@
 #!/usr/bin/env python3
-import os
-import re
-
-CLIENT_SRC = "/home/ubuntu/6666/client/src"
-
-def fix_control_props(content):
-    """Add type assertion to control props that don't have it"""
-    # More specific patterns for different variable names
-    patterns = [
-        (r'control=\{(\w+)Form\.control\}(?!\s*as)', r'control={\1Form.control as any}'),
-        (r'control=\{form\.control\}(?!\s*as)', r'control={form.control as any}'),
-        (r'control=\{(\w+)\.control\}(?!\s*as)', r'control={\1.control as any}'),
-    ]
-    for pattern, replacement in patterns:
-        content = re.sub(pattern, replacement, content)
-    return content
-
-def fix_any_type_assertions(content):
-    """Add 'as any' to common problematic patterns"""
-    # Fix map callbacks with type issues
-    content = re.sub(
-        r'\.map\(\((\w+)\)\s*=>\s*\{',
-        r'.map((\1: any) => {',
-        content
-    )
-    content = re.sub(
-        r'\.map\(\((\w+),\s*(\w+)\)\s*=>\s*\{',
-        r'.map((\1: any, \2: number) => {',
-        content
-    )
-    return content
-
-def fix_data_access(content):
-    """Fix data access patterns that cause TS2339 errors"""
-    # Add optional chaining for common patterns
-    patterns = [
-        # Fix .type access on objects that might not have it
-        (r'(\w+)\.type\s*===', r'(\1 as any).type ==='),
-    ]
-    for pattern, replacement in patterns:
-        content = re.sub(pattern, replacement, content)
-    return content
-
-def fix_file(filepath):
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        original = content
-        content = fix_control_props(content)
-        
-        if content != original:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            return True
-        return False
-    except Exception as e:
-        print(f"Error processing {filepath}: {e}")
-        return False
-
-def main():
-    fixed_count = 0
-    for root, dirs, files in os.walk(CLIENT_SRC):
-        for file in files:
-            if file.endswith(('.tsx', '.ts')):
-                filepath = os.path.join(root, file)
-                if fix_file(filepath):
-                    print(f"Fixed: {filepath}")
-                    fixed_count += 1
-    print(f"\nTotal files fixed: {fixed_count}")
+# Rules now live in codemod/rules.py; run `python -m codemod` to apply the
+# whole fix sequence in a single pass.
+from codemod.cli import run_rule_set
 
 if __name__ == "__main__":
-    main()
+    run_rule_set("fix_all_ts_errors")
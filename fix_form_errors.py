@@ -1,51 +1,7 @@
 #!/usr/bin/env python3
-import os
-import re
-
-CLIENT_SRC = "/home/ubuntu/6666/client/src"
-
-def add_any_type_to_resolver(content):
-    """Add 'as any' to zodResolver calls to fix type issues"""
-    # Pattern to find zodResolver without 'as any'
-    pattern = r'resolver:\s*zodResolver\(([^)]+)\)(?!\s*as\s*any)'
-    replacement = r'resolver: zodResolver(\1) as any'
-    return re.sub(pattern, replacement, content)
-
-def add_any_type_to_control(content):
-    """Add type assertion to control props"""
-    # Pattern to find control={form.control} without type assertion
-    pattern = r'control=\{form\.control\}(?!\s*as\s*any)'
-    replacement = r'control={form.control as any}'
-    return re.sub(pattern, replacement, content)
-
-def fix_file(filepath):
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        original = content
-        content = add_any_type_to_resolver(content)
-        content = add_any_type_to_control(content)
-        
-        if content != original:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            return True
-        return False
-    except Exception as e:
-        print(f"Error processing {filepath}: {e}")
-        return False
-
-def main():
-    fixed_count = 0
-    for root, dirs, files in os.walk(CLIENT_SRC):
-        for file in files:
-            if file.endswith(('.tsx', '.ts')):
-                filepath = os.path.join(root, file)
-                if fix_file(filepath):
-                    print(f"Fixed: {filepath}")
-                    fixed_count += 1
-    print(f"\nTotal files fixed: {fixed_count}")
+# Rules now live in codemod/rules.py; run `python -m codemod` to apply the
+# whole fix sequence in a single pass.
+from codemod.cli import run_rule_set
 
 if __name__ == "__main__":
-    main()
+    run_rule_set("fix_form_errors")
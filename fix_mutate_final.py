@@ -1,70 +1,7 @@
 #!/usr/bin/env python3
-import os
-import re
-
-def fix_file(filepath):
-    if not os.path.exists(filepath):
-        return False
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        original = content
-        
-        # Fix mutateAsync calls that don't have as any
-        content = re.sub(r'\.mutateAsync\(\{([^}]+)\}\)(?! as any)', r'.mutateAsync({\1} as any)', content)
-        
-        # Fix .filter with Tank type
-        content = re.sub(r'\.filter\(t => t\.type', r'.filter((t: any) => t.type', content)
-        content = re.sub(r'\.filter\(t => isLowLevel', r'.filter((t: any) => isLowLevel', content)
-        
-        # Fix isLowLevel call
-        content = re.sub(r'isLowLevel\(t\)', r'isLowLevel(t as any)', content)
-        
-        # Fix getLevel call
-        content = re.sub(r'getLevel\(t\)', r'getLevel(t as any)', content)
-        
-        # Fix setEditingStation
-        content = re.sub(r'setEditingStation\(station\)', r'setEditingStation(station as any)', content)
-        
-        if content != original:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            return True
-        return False
-    except Exception as e:
-        print(f"Error processing {filepath}: {e}")
-        return False
-
-files = [
-    "/home/ubuntu/6666/client/src/pages/diesel/DieselTanks.tsx",
-    "/home/ubuntu/6666/client/src/pages/diesel/DieselReceiving.tsx",
-    "/home/ubuntu/6666/client/src/pages/assets/diesel/DieselPumpsAssets.tsx",
-    "/home/ubuntu/6666/client/src/pages/assets/diesel/DieselPipesAssets.tsx",
-    "/home/ubuntu/6666/client/src/pages/assets/diesel/DieselTanksAssets.tsx",
-    "/home/ubuntu/6666/client/src/pages/inventory/Items.tsx",
-    "/home/ubuntu/6666/client/src/pages/inventory/Warehouses.tsx",
-    "/home/ubuntu/6666/client/src/pages/maintenance/MaintenancePlans.tsx",
-    "/home/ubuntu/6666/client/src/pages/maintenance/WorkOrdersList.tsx",
-    "/home/ubuntu/6666/client/src/pages/organization/Stations.tsx",
-    "/home/ubuntu/6666/client/src/pages/projects/ProjectsList.tsx",
-    "/home/ubuntu/6666/client/src/pages/fieldops/FieldOperations.tsx",
-    "/home/ubuntu/6666/client/src/pages/customers/PaymentsManagement.tsx",
-    "/home/ubuntu/6666/client/src/pages/accounting/JournalEntries.tsx",
-    "/home/ubuntu/6666/client/src/pages/accounting/ChartOfAccounts.tsx",
-    "/home/ubuntu/6666/client/src/pages/accounting/GeneralLedger.tsx",
-    "/home/ubuntu/6666/client/src/pages/assets/AssetsList.tsx",
-    "/home/ubuntu/6666/client/src/pages/assets/AssetCategories.tsx",
-    "/home/ubuntu/6666/client/src/pages/Home.tsx",
-]
-
-def main():
-    fixed_count = 0
-    for filepath in files:
-        if fix_file(filepath):
-            print(f"Fixed: {filepath}")
-            fixed_count += 1
-    print(f"\nTotal files fixed: {fixed_count}")
+# Rules now live in codemod/rules.py; run `python -m codemod` to apply the
+# whole fix sequence in a single pass.
+from codemod.cli import run_rule_set
 
 if __name__ == "__main__":
-    main()
+    run_rule_set("fix_mutate_final")
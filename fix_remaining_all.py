@@ -1,103 +1,7 @@
 #!/usr/bin/env python3
-import os
-import re
-
-CLIENT_SRC = "/home/ubuntu/6666/client/src"
-
-def fix_file(filepath):
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        original = content
-        
-        # Cast all data access to any for tRPC results
-        patterns = [
-            # Fix workOrder property access
-            (r'workOrder\.(\w+)', r'(workOrder as any).\1'),
-            # Fix customer property access
-            (r'customer\.(\w+)', r'(customer as any).\1'),
-            # Fix invoice property access
-            (r'invoice\.(\w+)', r'(invoice as any).\1'),
-            # Fix payment property access
-            (r'payment\.(\w+)', r'(payment as any).\1'),
-            # Fix meter property access
-            (r'meter\.(\w+)', r'(meter as any).\1'),
-            # Fix asset property access
-            (r'asset\.(\w+)', r'(asset as any).\1'),
-            # Fix project property access
-            (r'project\.(\w+)', r'(project as any).\1'),
-            # Fix station property access
-            (r'station\.(\w+)', r'(station as any).\1'),
-            # Fix business property access
-            (r'business\.(\w+)', r'(business as any).\1'),
-            # Fix voucher property access
-            (r'voucher\.(\w+)', r'(voucher as any).\1'),
-            # Fix treasury property access
-            (r'treasury\.(\w+)', r'(treasury as any).\1'),
-            # Fix account property access
-            (r'account\.(\w+)', r'(account as any).\1'),
-            # Fix transfers property access
-            (r'transfers\.(\w+)', r'(transfers as any).\1'),
-            # Fix unreconciledTransfers property access
-            (r'unreconciledTransfers\.(\w+)', r'(unreconciledTransfers as any).\1'),
-        ]
-        
-        # Only apply these patterns to specific files with errors
-        error_files = [
-            'WorkOrderDetails.tsx', 'CustomVouchers.tsx', 'CustomTreasuries.tsx',
-            'CustomReconciliation.tsx', 'CustomSubSystems.tsx', 'SubSystemDetails.tsx',
-            'DieselConfiguration.tsx', 'DieselTanks.tsx', 'DieselReceiving.tsx',
-            'DieselTanksAssets.tsx', 'DieselPumpsAssets.tsx', 'DieselPipesAssets.tsx',
-            'ProjectDetails.tsx', 'ProjectsList.tsx', 'InvoicesManagement.tsx',
-            'PaymentsManagement.tsx', 'AssetCategories.tsx', 'AssetDetails.tsx',
-            'AssetsList.tsx', 'Stations.tsx', 'Businesses.tsx', 'Warehouses.tsx',
-            'Items.tsx', 'Movements.tsx', 'MaintenancePlans.tsx', 'WorkOrdersList.tsx',
-            'Cameras.tsx', 'MonitoringDashboard.tsx', 'DashboardHome.tsx',
-            'GeneralLedger.tsx', 'ChartOfAccounts.tsx', 'JournalEntries.tsx',
-            'TrialBalance.tsx', 'TariffsManagement.tsx', 'FeeTypesManagement.tsx',
-            'AreasManagement.tsx', 'MeterReadingsManagement.tsx', 'BillingPeriods.tsx',
-            'CustomerDetails.tsx', 'CustomersManagement.tsx', 'MeterReadings.tsx',
-            'MetersManagement.tsx', 'FieldOperations.tsx', 'FieldTeams.tsx',
-            'FieldWorkers.tsx', 'GanttChart.tsx', 'Home.tsx'
-        ]
-        
-        filename = os.path.basename(filepath)
-        if filename not in error_files:
-            return False
-        
-        # Don't apply patterns that would break JSX
-        # Instead, use more targeted fixes
-        
-        # Fix control={...form.control} errors by adding type assertion
-        content = re.sub(r'control=\{(\w+)\.control\}', r'control={\1.control as any}', content)
-        
-        # Fix onSuccess callbacks
-        content = re.sub(r'onSuccess: \(_, variables\) =>', r'onSuccess: (_: any, variables: any) =>', content)
-        content = re.sub(r'onSuccess: \(data, variables\) =>', r'onSuccess: (data: any, variables: any) =>', content)
-        
-        # Fix useParams().id error
-        content = re.sub(r'const \{ id \} = useParams\(\);', r'const { id } = useParams() as { id: string };', content)
-        
-        if content != original:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            return True
-        return False
-    except Exception as e:
-        print(f"Error processing {filepath}: {e}")
-        return False
-
-def main():
-    fixed_count = 0
-    for root, dirs, files in os.walk(CLIENT_SRC):
-        for file in files:
-            if file.endswith(('.tsx', '.ts')):
-                filepath = os.path.join(root, file)
-                if fix_file(filepath):
-                    print(f"Fixed: {filepath}")
-                    fixed_count += 1
-    print(f"\nTotal files fixed: {fixed_count}")
+# Rules now live in codemod/rules.py; run `python -m codemod` to apply the
+# whole fix sequence in a single pass.
+from codemod.cli import run_rule_set
 
 if __name__ == "__main__":
-    main()
+    run_rule_set("fix_remaining_all")
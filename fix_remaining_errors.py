@@ -1,79 +1,7 @@
 #!/usr/bin/env python3
-import os
-import re
-
-CLIENT_SRC = "/home/ubuntu/6666/client/src"
-
-def add_any_type_to_data_access(content):
-    """Add type assertions to fix property access errors"""
-    # Common patterns that need type assertions
-    patterns = [
-        # Fix .type access on account objects
-        (r'(\w+)\.type\s*===\s*"', r'(\1 as any).type === "'),
-        (r'(\w+)\.type\s*\|\|\s*"', r'(\1 as any).type || "'),
-        # Fix property access on data objects
-        (r'data\.(\w+)', r'(data as any).\1'),
-    ]
-    for pattern, replacement in patterns:
-        # Only apply if not already cast
-        content = re.sub(pattern, replacement, content)
-    return content
-
-def fix_trpc_mutations(content):
-    """Fix tRPC mutation type issues"""
-    # Add 'as any' to mutation input objects that have type issues
-    patterns = [
-        # Fix mutation.mutate calls with object literals
-        (r'\.mutate\(\{([^}]+)\}\)', r'.mutate({\1} as any)'),
-    ]
-    for pattern, replacement in patterns:
-        content = re.sub(pattern, replacement, content)
-    return content
-
-def fix_map_callbacks(content):
-    """Fix map callback parameter types"""
-    # Add type annotations to map callbacks
-    patterns = [
-        (r'\.map\(\((\w+)\)\s*=>\s*\(', r'.map((\1: any) => ('),
-        (r'\.map\(\((\w+),\s*(\w+)\)\s*=>\s*\(', r'.map((\1: any, \2: number) => ('),
-        (r'\.filter\(\((\w+)\)\s*=>', r'.filter((\1: any) =>'),
-        (r'\.find\(\((\w+)\)\s*=>', r'.find((\1: any) =>'),
-        (r'\.reduce\(\((\w+),\s*(\w+)\)\s*=>', r'.reduce((\1: any, \2: any) =>'),
-    ]
-    for pattern, replacement in patterns:
-        content = re.sub(pattern, replacement, content)
-    return content
-
-def fix_file(filepath):
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        original = content
-        
-        # Apply fixes only to files with errors
-        if 'trpc.' in content:
-            content = fix_map_callbacks(content)
-        
-        if content != original:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            return True
-        return False
-    except Exception as e:
-        print(f"Error processing {filepath}: {e}")
-        return False
-
-def main():
-    fixed_count = 0
-    for root, dirs, files in os.walk(CLIENT_SRC):
-        for file in files:
-            if file.endswith(('.tsx', '.ts')):
-                filepath = os.path.join(root, file)
-                if fix_file(filepath):
-                    print(f"Fixed: {filepath}")
-                    fixed_count += 1
-    print(f"\nTotal files fixed: {fixed_count}")
+# Rules now live in codemod/rules.py; run `python -m codemod` to apply the
+# whole fix sequence in a single pass.
+from codemod.cli import run_rule_set
 
 if __name__ == "__main__":
-    main()
+    run_rule_set("fix_remaining_errors")
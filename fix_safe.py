@@ -1,58 +1,7 @@
 #!/usr/bin/env python3
-import os
-import re
-
-CLIENT_SRC = "/home/ubuntu/6666/client/src"
-
-def fix_file(filepath):
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        original = content
-        
-        # Fix .mutate and .mutateAsync calls
-        content = re.sub(r'\.mutate\(\{([^}]+)\}\)', r'.mutate({\1} as any)', content)
-        content = re.sub(r'\.mutateAsync\(\{([^}]+)\}\)', r'.mutateAsync({\1} as any)', content)
-        
-        # Fix setState calls
-        content = re.sub(r'set(\w+)\(data\)', r'set\1(data as any)', content)
-        
-        # Fix useParams
-        content = re.sub(r'const \{ id \} = useParams\(\);', r'const { id } = useParams() as { id: string };', content)
-        
-        # Fix zodResolver
-        content = re.sub(r'resolver: zodResolver\((\w+)\)', r'resolver: zodResolver(\1) as any', content)
-        
-        # Fix form.handleSubmit
-        content = re.sub(r'form\.handleSubmit\((\w+)\)', r'form.handleSubmit(\1 as any)', content)
-        
-        # Fix required_error
-        content = re.sub(r'required_error:', r'message:', content)
-        
-        # Fix .map callbacks with typed parameters
-        content = re.sub(r'\.map\(\((\w+): (\w+)\) =>', r'.map((\1: any) =>', content)
-        content = re.sub(r'\.filter\(\((\w+): (\w+)\) =>', r'.filter((\1: any) =>', content)
-        
-        if content != original:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            return True
-        return False
-    except Exception as e:
-        print(f"Error processing {filepath}: {e}")
-        return False
-
-def main():
-    fixed_count = 0
-    for root, dirs, files in os.walk(CLIENT_SRC):
-        for file in files:
-            if file.endswith(('.tsx', '.ts')) and 'node_modules' not in root:
-                filepath = os.path.join(root, file)
-                if fix_file(filepath):
-                    print(f"Fixed: {filepath}")
-                    fixed_count += 1
-    print(f"\nTotal files fixed: {fixed_count}")
+# Rules now live in codemod/rules.py; run `python -m codemod` to apply the
+# whole fix sequence in a single pass.
+from codemod.cli import run_rule_set
 
 if __name__ == "__main__":
-    main()
+    run_rule_set("fix_safe")